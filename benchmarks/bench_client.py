@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Benchmark the client's hot paths offline: decoding a Collection+JSON response, paging
+through a resource (against a local stand-in server and replayed from a record/replay
+cassette), computing a workflow's nodes info, filtering search results and streaming
+uploads. The best time of each benchmark can be saved as a baseline and later runs
+compared to it, failing when any benchmark got slower than the tolerance.
+
+    python benchmarks/bench_client.py [--repeat N] [--save FILE] [--compare FILE]
+                                      [--tolerance FRACTION]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+from argparse import ArgumentParser, Namespace
+
+import requests
+
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+
+from chrisclient.client import Client
+from chrisclient.request import Request
+from chrisclient.cassette import Cassette
+from chrisclient.search import PluginSearch, CUBEConfig
+from chrisclient.tests.standin import StandInCUBE
+
+
+N_INSTANCES = 5000
+PAGE_SIZE = 100
+UPLOAD_SIZE = 4 * 2 ** 20
+
+
+def make_instance(base, i):
+    return {'href': f'{base}plugins/instances/{i}/',
+            'data': [{'name': 'id', 'value': i},
+                     {'name': 'title', 'value': f'instance {i}'},
+                     {'name': 'status', 'value': 'finishedSuccessfully' if i % 3
+                      else 'started'},
+                     {'name': 'previous_id', 'value': i - 1 or None},
+                     {'name': 'plugin_name', 'value': f'pl-{i % 7}'},
+                     {'name': 'start_date', 'value': '2024-01-01T00:00:00Z'}],
+            'links': [{'rel': 'feed', 'href': f'{base}feeds/1/'},
+                      {'rel': 'plugin', 'href': f'{base}plugins/{i % 7}/'},
+                      {'rel': 'files', 'href': f'{base}plugins/instances/{i}/files/'}]}
+
+
+def make_page(base, path, items, offset, limit, total):
+    links = []
+    if offset + limit < total:
+        links.append({'rel': 'next',
+                      'href': f'{base}{path}?limit={limit}&offset={offset + limit}'})
+    if offset > 0:
+        links.append({'rel': 'previous', 'href': f'{base}{path}?limit={limit}&'
+                                                 f'offset={max(offset - limit, 0)}'})
+    return json.dumps({'collection': {
+        'version': '1.0', 'href': f'{base}{path}', 'items': items, 'links': links,
+        'total': total}}).encode()
+
+
+def bench_decode(url):
+    page = make_page('http://127.0.0.1/api/v1/', 'plugins/instances/',
+                     [make_instance('http://127.0.0.1/api/v1/', i)
+                      for i in range(1, 1001)], 0, 1000, N_INSTANCES)
+    response = requests.Response()
+    response._content = page
+    return lambda: Request.get_data_from_collection(
+        Request.get_collection_from_response(response))
+
+
+def count_instances(cl, prefetch=False):
+    n = sum(1 for _ in cl.iter_plugin_instances({'limit': PAGE_SIZE},
+                                                prefetch=prefetch))
+    assert n == N_INSTANCES
+    return n
+
+
+def bench_pagination(url):
+    cl = Client(url, 'cube', 'cube1234')
+    return lambda: count_instances(cl)
+
+
+def bench_pagination_prefetch(url):
+    cl = Client(url, 'cube', 'cube1234')
+    return lambda: count_instances(cl, prefetch=True)
+
+
+def bench_pagination_replay(url):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'plugin_instances.json')
+        recorder = Client(url, 'cube', 'cube1234', session=Request.create_session(
+            transport=Cassette(path, mode='record')))
+        count_instances(recorder)
+        recorder.close()
+        cl = Client(url, 'cube', 'cube1234', session=Request.create_session(
+            transport=Cassette(path)))
+    return lambda: count_instances(cl)
+
+
+def bench_workflow_nodes_info(url):
+    defaults = [{'plugin_piping_id': p, 'previous_plugin_piping_id': p - 1 or None,
+                 'plugin_piping_title': f'piping {p}', 'param_name': f'param{n}',
+                 'value': None if n % 2 else n}
+                for p in range(1, 501) for n in range(20)]
+    cl = Client(url)
+    return lambda: cl.compute_workflow_nodes_info(defaults, include_all_defaults=True)
+
+
+def bench_search_filter(url):
+    base = 'http://127.0.0.1/api/v1/'
+    items = [make_instance(base, i) for i in range(1, 50001)]
+    pages = [{'data': [{d['name']: d['value'] for d in item['data']}
+                       for item in items[offset:offset + PAGE_SIZE]],
+              'links': [{} for _ in items[offset:offset + PAGE_SIZE]],
+              'total': len(items)} for offset in range(0, len(items), PAGE_SIZE)]
+    args = Namespace(str_for='id,status,plugin_name', str_filterFor='pl-3',
+                     str_across='plugininstances', str_using='', verbosity=0)
+    query = PluginSearch({'name': 'chrispl-search'}, args,
+                         config=CUBEConfig(address='localhost'))
+    return lambda: query.search_desiredReturnFind(
+        {'status': True, 'response': {'collection': {'total': len(items),
+                                                     'pages': iter(pages)}}})
+
+
+def bench_upload(url):
+    cl = Client(url, 'cube', 'cube1234')
+    contents = b'x' * UPLOAD_SIZE
+    return lambda: cl.upload_file('bench/data.bin', io.BytesIO(contents))
+
+
+BENCHMARKS = [
+    ('decode 1k items response', bench_decode),
+    (f'paginate {N_INSTANCES} instances', bench_pagination),
+    (f'paginate {N_INSTANCES} instances (prefetch)', bench_pagination_prefetch),
+    (f'paginate {N_INSTANCES} instances (cassette)', bench_pagination_replay),
+    ('compute 500 workflow nodes info', bench_workflow_nodes_info),
+    ('filter 50k search results', bench_search_filter),
+    (f'upload {UPLOAD_SIZE // 2 ** 20} MiB file', bench_upload),
+]
+
+
+def measure(func, repeat):
+    func()  # warm up connections and caches
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = ArgumentParser(description='Offline client hot paths benchmark')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per benchmark')
+    parser.add_argument('--save', help='save the results as a baseline JSON file')
+    parser.add_argument('--compare', help='compare the results to a baseline JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown over the baseline (default 0.25)')
+    args = parser.parse_args()
+
+    cube = StandInCUBE(sizes={'plugin_instances': N_INSTANCES})
+    cube.start()
+    url = cube.url
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    for label, setup in BENCHMARKS:
+        results[label] = best = measure(setup(url), args.repeat)
+        line = f'{label:<44} {best * 1000:10.2f} ms'
+        if label in baseline:
+            change = best / baseline[label] - 1
+            line += f' {change:+8.1%}'
+            if change > args.tolerance:
+                regressions.append(label)
+                line += ' REGRESSION'
+        print(line)
+    cube.stop()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        print(f'{len(regressions)} benchmark(s) slower than the baseline by more than '
+              f'{args.tolerance:.0%}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
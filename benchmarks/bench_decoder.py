@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark the CPU time and peak allocations of decoding Collection+JSON pages of 1k and
+10k items with the previous collection_json object model path and the fast decoder
+(with the json and orjson backends). The previous path is only run when the
+collection-json package is installed.
+
+    python benchmarks/bench_decoder.py [--repeat N]
+"""
+
+import os
+import sys
+import json
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+try:
+    from collection_json import Collection
+except ImportError:
+    Collection = None
+
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+
+from chrisclient import decoder
+from chrisclient.request import Request
+
+
+def make_page(n):
+    base = 'http://127.0.0.1:8000/api/v1/plugins/instances/'
+    items = [{'href': f'{base}{i}/',
+              'data': [{'name': 'id', 'value': i},
+                       {'name': 'title', 'value': f'instance {i}'},
+                       {'name': 'status', 'value': 'finishedSuccessfully'},
+                       {'name': 'previous_id', 'value': i - 1 or None},
+                       {'name': 'plugin_name', 'value': 'pl-dircopy'},
+                       {'name': 'start_date', 'value': '2024-01-01T00:00:00Z'}],
+              'links': [{'rel': 'feed', 'href': f'{base}feeds/1/'},
+                        {'rel': 'plugin', 'href': f'{base}plugins/1/'},
+                        {'rel': 'parameters', 'href': f'{base}{i}/parameters/'}]}
+             for i in range(1, n + 1)]
+    return json.dumps({'collection': {
+        'version': '1.0', 'href': base, 'items': items, 'total': 10 * n,
+        'links': [{'rel': 'next', 'href': f'{base}?limit={n}&offset={n}'}]}}).encode()
+
+
+def object_model_path(body):
+    # the previous Request.get_collection_from_response + get_data_from_collection
+    content = json.loads(body)
+    total = content['collection'].pop('total', None)
+    collection = Collection.from_json(json.dumps(content))
+    collection.total = total
+    result = {'data': [], 'hasNextPage': False, 'hasPreviousPage': False, 'total': 0}
+    for item in collection.items:
+        result['data'].append({d.name: d.value for d in item.data})
+    result['hasNextPage'] = bool([l for l in collection.links if l.rel == 'next'])
+    result['total'] = collection.total
+    return result
+
+
+def decoder_path(body):
+    return Request.get_data_from_collection(decoder.decode_collection(body))
+
+
+def measure(func, body, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        result = func(body)
+    cpu = (time.process_time() - start) / repeat
+
+    tracemalloc.start()
+    func(body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, cpu, peak
+
+
+def main():
+    parser = ArgumentParser(description='Collection+JSON decoder benchmark')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per measurement')
+    args = parser.parse_args()
+
+    orjson = decoder.orjson
+    paths = [('fast decoder (json)', decoder_path)]
+    if Collection is not None:
+        paths.insert(0, ('collection_json object model', object_model_path))
+    if orjson is not None:
+        paths.append(('fast decoder (orjson)', decoder_path))
+
+    for n in (1000, 10000):
+        body = make_page(n)
+        expected = None
+        print(f'\n{n} items, {len(body) / 1024:.0f} KiB page')
+        for label, func in paths:
+            decoder.orjson = orjson if 'orjson' in label else None
+            result, cpu, peak = measure(func, body, args.repeat)
+            if expected is None:
+                expected = result
+            assert result == expected
+            print(f'{label:<32} {cpu * 1000:9.2f} ms CPU {peak / 2 ** 20:9.2f} MiB peak')
+    decoder.orjson = orjson
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Benchmark the number of GET requests per second the client can make against a local
+stand-in CUBE with and without the pooled keep-alive session.
+
+    python benchmarks/bench_request.py [--requests N]
+"""
+
+import os
+import sys
+import time
+from argparse import ArgumentParser
+
+import requests
+
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+
+from chrisclient.request import Request
+from chrisclient.tests.standin import StandInCUBE
+
+
+def run(label, get, url, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        get(url)
+    elapsed = time.perf_counter() - start
+    print(f'{label:<40} {n / elapsed:10.1f} req/s')
+
+
+def main():
+    parser = ArgumentParser(description='Request pooling benchmark')
+    parser.add_argument('--requests', type=int, default=2000,
+                        help='number of requests per run')
+    args = parser.parse_args()
+
+    cube = StandInCUBE().start()
+    url = cube.url + 'plugins/search/?name_exact=pl-1'
+    headers = {'Accept': 'application/vnd.collection+json'}
+
+    # a new connection per call as with the module-level requests functions
+    run('module-level requests.get (no pooling)',
+        lambda u: Request.get_collection_from_response(
+            requests.get(u, headers=headers, timeout=30)), url, args.requests)
+
+    req = Request(auth={'username': 'cube', 'password': 'cube1234'})
+    run('Request.get (pooled session)', req.get, url, args.requests)
+    req.close()
+    cube.stop()
+
+
+if __name__ == '__main__':
+    main()
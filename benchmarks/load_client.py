@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Drive Client methods concurrently against a stand-in CUBE (or any CUBE) and report the
+p50/p99 latency and throughput of each operation. By default an in-process stand-in
+CUBE is started; for more realistic numbers on one box run the stand-in in its own
+process and point --url at it:
+
+    python -m chrisclient.tests.standin --port 8010 --instances 100000 &
+    python benchmarks/load_client.py --url http://127.0.0.1:8010/api/v1/ \
+        --workers 32 --duration 20 --mix list:4,by_id:4,search:2,create:1
+
+    python benchmarks/load_client.py [--instances N] [--latency S] [--error-rate F]
+                                     [--workers N] [--duration S | --operations N]
+                                     [--mix OP:WEIGHT,...] [--retries N]
+"""
+
+import io
+import os
+import sys
+import math
+import time
+import random
+import tempfile
+import threading
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+
+from chrisclient.client import Client
+from chrisclient.request import Request
+from chrisclient.resilience import RetryPolicy
+from chrisclient.exceptions import ChrisException
+from chrisclient.tests.standin import StandInCUBE
+
+
+PAGE_SIZE = 100
+
+
+def list_page(cl, rnd, ctx):
+    offset = rnd.randrange(0, max(ctx['instances'] - PAGE_SIZE, 1))
+    cl.get_plugin_instances({'limit': PAGE_SIZE, 'offset': offset})
+
+
+def get_by_id(cl, rnd, ctx):
+    cl.get_plugin_instance_by_id(rnd.randint(1, ctx['instances']))
+
+
+def search(cl, rnd, ctx):
+    cl.get_plugin_instances({'plugin_name_exact': f'pl-{rnd.randint(1, 50)}',
+                             'status': 'finishedSuccessfully', 'limit': PAGE_SIZE})
+
+
+def create(cl, rnd, ctx):
+    cl.create_plugin_instance(rnd.randint(2, 50), {'title': 'load test'})
+
+
+def upload(cl, rnd, ctx):
+    cl.upload_file(f'cube/load/{rnd.getrandbits(32):08x}.dat',
+                   io.BytesIO(ctx['upload_contents']))
+
+
+def download(cl, rnd, ctx):
+    local_path = os.path.join(ctx['tmp_dir'], f'{threading.get_ident()}.dat')
+    cl.download_file(rnd.randint(1, ctx['files']), local_path, resume=False)
+
+
+OPERATIONS = {'list': list_page, 'by_id': get_by_id, 'search': search,
+              'create': create, 'upload': upload, 'download': download}
+
+
+def parse_mix(mix):
+    weights = {}
+    for entry in mix.split(','):
+        name, _, weight = entry.partition(':')
+        if name not in OPERATIONS:
+            raise ValueError(f'Unknown operation {name!r}, must be one of '
+                             f'{", ".join(OPERATIONS)}')
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0
+    return sorted_values[max(math.ceil(p * len(sorted_values)) - 1, 0)]
+
+
+def run(cl, weights, workers, duration, operations, seed, ctx):
+    names = list(weights)
+    cum_weights = []
+    total = 0
+    for name in names:
+        total += weights[name]
+        cum_weights.append(total)
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    counter = iter(range(operations)) if operations else None
+    deadline = time.monotonic() + duration
+
+    def worker(i):
+        rnd = random.Random(seed + i)
+        while True:
+            if counter is not None:
+                with lock:
+                    if next(counter, None) is None:
+                        return
+            elif time.monotonic() >= deadline:
+                return
+            name = rnd.choices(names, cum_weights=cum_weights)[0]
+            start = time.perf_counter()
+            try:
+                OPERATIONS[name](cl, rnd, ctx)
+            except (ChrisException, ValueError) as e:
+                with lock:
+                    errors[name] += 1
+                    if errors[name] == 1:
+                        print(f'{name}: {e}', file=sys.stderr)
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies[name].append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(worker, range(workers)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def report(latencies, errors, elapsed):
+    print(f'\n{"operation":<10} {"ok":>8} {"errors":>7} {"p50 ms":>9} {"p99 ms":>9} '
+          f'{"max ms":>9} {"ops/s":>9}')
+    all_latencies = []
+    for name in latencies:
+        values = sorted(latencies[name])
+        all_latencies.extend(values)
+        print(f'{name:<10} {len(values):>8} {errors[name]:>7} '
+              f'{percentile(values, 0.5) * 1000:>9.2f} '
+              f'{percentile(values, 0.99) * 1000:>9.2f} '
+              f'{(values[-1] if values else 0) * 1000:>9.2f} '
+              f'{len(values) / elapsed:>9.1f}')
+    all_latencies.sort()
+    print(f'{"total":<10} {len(all_latencies):>8} {sum(errors.values()):>7} '
+          f'{percentile(all_latencies, 0.5) * 1000:>9.2f} '
+          f'{percentile(all_latencies, 0.99) * 1000:>9.2f} '
+          f'{(all_latencies[-1] if all_latencies else 0) * 1000:>9.2f} '
+          f'{len(all_latencies) / elapsed:>9.1f}')
+    print(f'\n{elapsed:.1f} s elapsed')
+
+
+def main():
+    parser = ArgumentParser(description='Client load generator')
+    parser.add_argument('--url', help='CUBE API url (by default an in-process '
+                                      'stand-in CUBE is started)')
+    parser.add_argument('--username', default='cube', help='CUBE username')
+    parser.add_argument('--password', default='cube1234', help='CUBE password')
+    parser.add_argument('--instances', type=int, default=100000,
+                        help='number of plugin instances of the stand-in CUBE')
+    parser.add_argument('--files', type=int, default=1000,
+                        help='number of user files of the stand-in CUBE')
+    parser.add_argument('--file-size', type=int, default=64 * 1024,
+                        help='size in bytes of the uploaded and downloaded files')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='seconds the stand-in CUBE delays every request')
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='fraction of requests the stand-in CUBE fails with 503')
+    parser.add_argument('--workers', type=int, default=16,
+                        help='number of concurrent workers')
+    parser.add_argument('--duration', type=float, default=10,
+                        help='seconds to run for')
+    parser.add_argument('--operations', type=int,
+                        help='number of operations to run (instead of --duration)')
+    parser.add_argument('--mix', default='list:4,by_id:4,search:2,create:1,'
+                                         'upload:1,download:1',
+                        help='weighted operations (%(default)s)')
+    parser.add_argument('--retries', type=int, default=0,
+                        help='retries of transient failures')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    cube = None
+    url = args.url
+    if url is None:
+        print(f'Starting a stand-in CUBE with {args.instances} plugin instances...')
+        cube = StandInCUBE(sizes={'plugin_instances': args.instances,
+                                  'userfiles': args.files},
+                           file_size=args.file_size, latency=args.latency,
+                           error_rate=args.error_rate, seed=args.seed)
+        cube.start()
+        url = cube.url
+
+    session = Request.create_session(pool_maxsize=args.workers)
+    retry = RetryPolicy(retries=args.retries) if args.retries else None
+    cl = Client(url, args.username, args.password, session=session, retry=retry)
+    instances = cl.get_plugin_instances({'limit': 1})['total']
+    files = cl.get_user_files({'limit': 1})['total']
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ctx = {'instances': instances, 'files': files, 'tmp_dir': tmp_dir,
+               'upload_contents': os.urandom(args.file_size)}
+        print(f'Running {args.operations or f"{args.duration:g} s of"} operations with '
+              f'{args.workers} workers against {url}')
+        latencies, errors, elapsed = run(cl, weights, args.workers, args.duration,
+                                         args.operations, args.seed, ctx)
+    report(latencies, errors, elapsed)
+    cl.close()
+    if cube is not None:
+        print(f'stand-in CUBE: {dict(cube.requests)} requests, {cube.faults} faults')
+        cube.stop()
+
+
+if __name__ == '__main__':
+    main()
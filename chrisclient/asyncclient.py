@@ -0,0 +1,825 @@
+"""
+ChRIS API asyncio client module.
+An item in a collection is represented by a dictionary. A collection of items is
+represented by a list of dictionaries.
+"""
+
+import json
+import time
+import asyncio
+import threading
+
+from .request import Request
+from .asyncrequest import AsyncRequest
+from .resources import ResourcesMixin
+from .watch import StatusTracker
+from .exceptions import ChrisRequestException, ChrisNotFoundException
+
+
+class AsyncClient(ResourcesMixin):
+    """
+    A ChRIS API asyncio client with the same resource methods as Client.
+    """
+
+    def __init__(self, url, username=None, password=None, token=None, session=None,
+                 url_cache=None):
+        self.url = url
+        self.query_url_sufix = 'search/'
+        self.content_type = 'application/vnd.collection+json'
+        self.auth = None
+
+        if (username is not None and password is None) or (
+                username is None and password is not None):
+            raise ValueError('Both username and password must be provided together.')
+
+        if username is not None and password is not None:
+            # username/password have priority
+            self.auth = {'username': username, 'password': password}
+        elif token is not None:
+            self.auth = {'token': token}
+
+        # all the client's requests share the session's pool of keep-alive connections
+        self._request = AsyncRequest(self.auth, self.content_type, session)
+        self._set_urls_lock = None
+
+        # the urls of the high level API resources (optionally cached on disk by
+        # url_cache) and the urls and link relations of the items already seen. A
+        # thread lock is safe in coroutines here because it's only taken by the
+        # mixin's synchronous methods, which never await while holding it, so it's
+        # never held across a suspension point and never contended within the loop
+        self._init_resources(url_cache, threading.Lock())
+        self._rediscover_lock = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def set_urls(self, timeout=30):
+        """
+        Set the urls of the high level API resources. If the client has a url cache
+        then the urls are taken from it when there is a fresh entry for the CUBE url and
+        user, otherwise they are discovered from the API root and cached.
+        """
+        if self._set_urls_lock is None:
+            self._set_urls_lock = asyncio.Lock()
+
+        # concurrent callers on a fresh client share a single API root request
+        async with self._set_urls_lock:
+            if self.plugins_url:
+                return
+
+            if self._set_urls_from_cache():
+                return
+
+            coll = await self._request.get(self.url, None, timeout)
+            self.set_urls_from_collection(coll)
+            self._cache_urls()
+
+    async def close(self):
+        """
+        Close the client's connections to CUBE.
+        """
+        await self._request.close()
+
+    async def gather_by_id(self, method, ids, concurrency=50, return_exceptions=False,
+                           timeout=30):
+        """
+        Concurrently call one of the client's *_by_id coroutine methods (e.g.
+        self.get_plugin_instance_by_id) for every id in ids with at most concurrency
+        requests in flight. The results are returned in the same order as ids. If
+        return_exceptions is True then failed lookups are returned as exceptions in
+        the result list instead of being raised.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(id):
+            async with semaphore:
+                return await method(id, timeout)
+
+        return await asyncio.gather(*[fetch(id) for id in ids],
+                                    return_exceptions=return_exceptions)
+
+    async def get_chris_instance(self, timeout=30):
+        """
+        Get a ChRIS's instance data (descriptors).
+        """
+        coll = await self._fetch_resource('chris_instance_url', None, timeout)
+        result = Request.get_data_from_collection(coll)
+        return result['data'][0]
+
+    async def get_feeds(self, search_params=None, timeout=30):
+        """
+        Get a paginated list of feeds (data descriptors) given query search parameters.
+        If no search parameters is given then get the default first page.
+        """
+        coll = await self._fetch_resource('feeds_url', search_params, timeout)
+        return Request.get_data_from_collection(coll)
+
+    async def get_public_feeds(self, search_params=None, timeout=30):
+        """
+        Get a paginated list of public feeds (data descriptors) given query search
+        parameters. If no search parameters is given then get the default first page.
+        """
+        coll = await self._fetch_resource('public_feeds_url', search_params, timeout)
+        return Request.get_data_from_collection(coll)
+
+    async def get_feed_by_id(self, id, timeout=30):
+        """
+        Get a feed's data (descriptors) given its ChRIS id.
+        """
+        return await self._get_by_id('feeds_url', 'feed', id, timeout)
+
+    async def get_plugins(self, search_params=None, timeout=30):
+        """
+        Get a paginated list of plugins (data descriptors) given query search
+        parameters. If no search parameters is given then get the default first page.
+        """
+        coll = await self._fetch_resource('plugins_url', search_params, timeout)
+        return Request.get_data_from_collection(coll)
+
+    async def get_plugin_by_id(self, id, timeout=30):
+        """
+        Get a plugin's data (descriptors) given its ChRIS id.
+        """
+        return await self._get_by_id('plugins_url', 'plugin', id, timeout)
+
+    async def get_plugin_parameters(self, plugin_id, params=None, timeout=30):
+        """
+        Get a plugin's paginated parameters given its ChRIS id.
+        """
+        return await self._get_related('plugins_url', 'plugin', plugin_id,
+                                       'parameters', params, timeout)
+
+    async def get_plugin_metas(self, search_params=None, timeout=30):
+        """
+        Get a paginated list of plugin metas (data descriptors) given query search
+        parameters. If no search parameters is given then get the default first page.
+        """
+        coll = await self._fetch_resource('plugin_metas_url', search_params, timeout)
+        return Request.get_data_from_collection(coll)
+
+    async def get_plugin_meta_by_id(self, id, timeout=30):
+        """
+        Get a plugin meta's data (descriptors) given its ChRIS id.
+        """
+        return await self._get_by_id('plugin_metas_url', 'plugin meta', id, timeout)
+
+    async def get_compute_resources(self, search_params=None, timeout=30):
+        """
+        Get a paginated list of compute resources (data descriptors) given query search
+        parameters. If no search parameters is given then get the default first page.
+        """
+        coll = await self._fetch_resource('compute_resources_url', search_params,
+                                          timeout)
+        return Request.get_data_from_collection(coll)
+
+    async def get_compute_resource_by_id(self, id, timeout=30):
+        """
+        Get a compute_resource's data (descriptors) given its ChRIS id.
+        """
+        return await self._get_by_id('compute_resources_url', 'compute resource', id,
+                                     timeout)
+
+    async def admin_upload_plugin(self, compute_names, data, timeout=30):
+        """
+        Upload a plugin representation file and create a new plugin. The data argument
+        can be:
+            * a string indicating a local file path, or
+            * a file handler, or
+            * a python dictionary representation.
+        """
+        if not self.admin_url: await self.set_urls(timeout)
+        if not self.admin_url:
+            raise ChrisRequestException(f"User is not a ChRIS admin.")
+
+        if type(data) is dict:
+            file_contents = json.dumps(data, indent = 4).encode('utf-8')
+        else:
+            file_contents = self._read_file(data)
+
+        return await self._create('admin_url', {'compute_names': compute_names},
+                                  file_contents, timeout)
+
+    async def admin_register_plugin_with_computes(self, plugin_id, compute_names,
+                                                  timeout=30):
+        """
+        Register an existing plugin with a set of existing compute resources.
+        """
+        if not self.admin_url: await self.set_urls(timeout)
+        if not self.admin_url:
+            raise ChrisRequestException(f"User is not a ChRIS admin.")
+
+        data = {'compute_names': compute_names}
+
+        coll = await self._send_to_resource(self._request.put,
+                                            self.admin_url + f'{plugin_id}/', data, None,
+                                            timeout)
+        result = Request.get_data_from_collection(coll)
+        return result['data'][0]
+
+    async def get_plugin_instances(self, search_params=None, timeout=30):
+        """
+        Get a paginated list of plugin instances (data descriptors) given query search
+        parameters. If no search parameters is given then get the default first page.
+        """
+        coll = await self._fetch_resource('plugin_instances_url', search_params,
+                                          timeout)
+        return Request.get_data_from_collection(coll)
+
+    async def get_plugin_instance_by_id(self, id, timeout=30):
+        """
+        Get a plugin instance's data (descriptors) given its ChRIS id.
+        """
+        return await self._get_by_id('plugin_instances_url', 'plugin instance', id,
+                                     timeout)
+
+    async def create_plugin_instance(self, plugin_id, data, timeout=30):
+        """
+        Create a plugin instance given the corresponding plugin id and plugin-specific
+        data dictionary.
+        """
+        return await self._create_related('plugins_url', 'plugin', plugin_id,
+                                          'instances', data, timeout)
+
+    async def create_plugin_instance_split(self, plg_inst_id, filter='', cr_name='',
+                                           timeout=30):
+        """
+        Create a plugin instance split given the corresponding plugin instance id.
+        """
+        data = {'filter': filter}
+        if cr_name: data['compute_resource_name'] = cr_name
+
+        return await self._create_related('plugin_instances_url', 'plugin instance',
+                                          plg_inst_id, 'splits', data, timeout)
+
+    async def watch(self, instances=None, workflow_id=None, interval=1, max_interval=30,
+                    backoff=1.5, max_wait=None, timeout=30):
+        """
+        Get an async generator that polls CUBE until all the given plugin instances
+        (ids or data dictionaries), or all the plugin instances of a workflow if
+        workflow_id is given, have finished running and yields a (plugin instance data,
+        previous status) tuple every time an instance's status changes. See
+        Client.watch for the polling strategy and the other arguments.
+        """
+        tracker = StatusTracker(None if workflow_id is not None else instances,
+                                interval, max_interval, backoff)
+        start = time.monotonic()
+
+        while True:
+            if workflow_id is not None:
+                plg_insts = await self._get_all_pages(
+                    lambda params: self.get_workflow_plugin_instances(workflow_id, params,
+                                                                      timeout))
+                polled_ids = ()
+            else:
+                # instances given by id are looked up once to find their feeds
+                polled_ids = tracker.unknown_ids()
+                results = await self.gather_by_id(
+                    lambda id, timeout: self.get_plugin_instances({'id': id}, timeout),
+                    polled_ids, timeout=timeout)
+                plg_insts = [plg_inst for result in results
+                             for plg_inst in result['data']]
+                for feed_id, ids in tracker.pending_feeds().items():
+                    plg_insts.extend(await self._get_all_pages(
+                        lambda params: self.get_plugin_instances(
+                            dict(params, feed_id=feed_id), timeout)))
+                    polled_ids.extend(ids)
+            for event in tracker.update(plg_insts, polled_ids):
+                yield event
+
+            if tracker.done():
+                return
+            elapsed = time.monotonic() - start
+            if max_wait is not None and elapsed + tracker.delay > max_wait:
+                return
+            await asyncio.sleep(tracker.delay)
+
+    async def wait_for(self, instances=None, workflow_id=None, callback=None, interval=1,
+                       max_interval=30, backoff=1.5, max_wait=None, timeout=30):
+        """
+        Wait until all the given plugin instances (ids or data dictionaries), or all the
+        plugin instances of a workflow if workflow_id is given, have finished running
+        and return a dictionary of their ids to their last seen data (descriptors). If
+        callback is given then it is called with the plugin instance data and the
+        previous status every time an instance's status changes. The instances that no
+        longer exist are left out of the returned dictionary.
+        """
+        last_seen = {}
+        async for plg_inst, previous_status in self.watch(
+                instances, workflow_id, interval, max_interval, backoff, max_wait,
+                timeout):
+            last_seen[plg_inst['id']] = plg_inst
+            if callback is not None:
+                callback(plg_inst, previous_status)
+        return last_seen
+
+    async def get_pipelines(self, search_params=None, timeout=30):
+        """
+        Get a paginated list of pipelines (data descriptors) given query search
+        parameters. If no search parameters is given then get the default first page.
+        """
+        coll = await self._fetch_resource('pipelines_url', search_params, timeout)
+        return Request.get_data_from_collection(coll)
+
+    async def get_pipeline_by_id(self, id, timeout=30):
+        """
+        Get a pipeline's data (descriptors) given its ChRIS id.
+        """
+        return await self._get_by_id('pipelines_url', 'pipeline', id, timeout)
+
+    async def get_pipeline_default_parameters(self, pipeline_id, params=None,
+                                              timeout=30):
+        """
+        Get a pipeline's paginated default parameters given its ChRIS id.
+        """
+        return await self._get_related('pipelines_url', 'pipeline', pipeline_id,
+                                       'default_parameters', params, timeout)
+
+    async def create_pipeline(self, data, timeout=30):
+        """
+        Create a pipeline given the data dictionary.
+        """
+        return await self._create('pipelines_url', data, None, timeout)
+
+    async def get_workflows(self, search_params=None, timeout=30):
+        """
+        Get a paginated list of workflows (data descriptors) given query search
+        parameters. If no search parameters is given then get the default first page.
+        """
+        coll = await self._fetch_resource('workflows_url', search_params, timeout)
+        return Request.get_data_from_collection(coll)
+
+    async def get_workflow_by_id(self, id, timeout=30):
+        """
+        Get a workflow's data (descriptors) given its ChRIS id.
+        """
+        return await self._get_by_id('workflows_url', 'workflow', id, timeout)
+
+    async def get_workflow_plugin_instances(self, workflow_id, params=None, timeout=30):
+        """
+        Get a workflow's paginated list of plugin instances given its ChRIS id.
+        """
+        return await self._get_related('workflows_url', 'workflow', workflow_id,
+                                       'plugin_instances', params, timeout)
+
+    async def create_workflow(self, pipeline_id, data, timeout=30):
+        """
+        Create a workflow given the corresponding pipeline id and pipeline-specific
+        data dictionary.
+        """
+        return await self._create_related('pipelines_url', 'pipeline', pipeline_id,
+                                          'workflows', data, timeout)
+
+    async def get_tags(self, search_params=None, timeout=30):
+        """
+        Get a paginated list of tags (data descriptors) given query search
+        parameters. If no search parameters is given then get the default first page.
+        """
+        coll = await self._fetch_resource('tags_url', search_params, timeout)
+        return Request.get_data_from_collection(coll)
+
+    async def get_tag_by_id(self, id, timeout=30):
+        """
+        Get a tag's data (descriptors) given its ChRIS id.
+        """
+        return await self._get_by_id('tags_url', 'tag', id, timeout)
+
+    async def create_tag(self, data, timeout=30):
+        """
+        Create a tag given the data dictionary.
+        """
+        return await self._create('tags_url', data, None, timeout)
+
+    async def get_pipeline_source_files(self, search_params=None, timeout=30):
+        """
+        Get a paginated list of pipeline source files (data descriptors) given query
+        search parameters. If no search parameters is given then get the default first
+        page.
+        """
+        coll = await self._fetch_resource('pipeline_source_files_url', search_params,
+                                          timeout)
+        return Request.get_data_from_collection(coll)
+
+    async def get_pipeline_source_file_by_id(self, id, timeout=30):
+        """
+        Get a pipeline_source_file's data (descriptors) given its ChRIS id.
+        """
+        return await self._get_by_id('pipeline_source_files_url',
+                                     'pipeline source file', id, timeout)
+
+    async def upload_pipeline_source_file(self, type, fname, timeout=30):
+        """
+        Upload a pipeline source file to create a new pipeline. The fname argument
+        can be a string indicating a local file path or a file handler. The file is
+        streamed from disk.
+        """
+        return await self._upload('pipeline_source_files_url', {'type': type}, fname,
+                                  timeout)
+
+    async def get_user_files(self, search_params=None, timeout=30):
+        """
+        Get a paginated list of user files (data descriptors) given query search
+        parameters. If no search parameters is given then get the default first page.
+        """
+        coll = await self._fetch_resource('user_files_url', search_params, timeout)
+        return Request.get_data_from_collection(coll)
+
+    async def get_user_file_by_id(self, id, timeout=30):
+        """
+        Get a user file's data (descriptors) given its ChRIS id.
+        """
+        return await self._get_by_id('user_files_url', 'user file', id, timeout)
+
+    async def upload_file(self, upload_path, fname, timeout=30):
+        """
+        Upload a file to the user's space in CUBE. The fname argument can be a string
+        indicating a local file path or a file handler. The file is streamed from disk.
+        """
+        return await self._upload('user_files_url', {'upload_path': upload_path}, fname,
+                                  timeout)
+
+    async def delete_user_file(self, id, timeout=30):
+        """
+        Delete an existing user file.
+        """
+        url = await self._get_item_url('user_files_url', id, timeout)
+        if url is None:
+            raise ChrisRequestException(f'Could not find user file with id: {id}.')
+        await self._request.delete(url, timeout)
+        self._forget_item('user_files_url', id)
+
+    async def get_pacs_files(self, search_params=None, timeout=30):
+        """
+        Get a paginated list of PACS files (data descriptors) given query search
+        parameters. If no search parameters is given then get the default first page.
+        """
+        coll = await self._fetch_resource('pacs_files_url', search_params, timeout)
+        return Request.get_data_from_collection(coll)
+
+    async def get_pacs_file_by_id(self, id, timeout=30):
+        """
+        Get a PACS file's data (descriptors) given its ChRIS id.
+        """
+        return await self._get_by_id('pacs_files_url', 'PACS file', id, timeout)
+
+    async def get_pacs_list(self, search_params=None, timeout=30):
+        """
+        Get a paginated list of PACS (data descriptors) given query search
+        parameters. If no search parameters is given then get the default first page.
+        """
+        coll = await self._fetch_resource('pacs_url', search_params, timeout)
+        return Request.get_data_from_collection(coll)
+
+    async def get_pacs_by_id(self, id, timeout=30):
+        """
+        Get a PACS's data (descriptors) given its ChRIS id.
+        """
+        return await self._get_by_id('pacs_url', 'PACS', id, timeout)
+
+    async def get_pacs_queries(self, search_params=None, timeout=30):
+        """
+        Get a paginated list of PACS queries (data descriptors) given query search
+        parameters. If no search parameters is given then get the default first page.
+        """
+        coll = await self._fetch_resource('pacs_queries_url', search_params, timeout)
+        return Request.get_data_from_collection(coll)
+
+    async def get_pacs_query_by_id(self, id, timeout=30):
+        """
+        Get a PACS query's data (descriptors) given its ChRIS id.
+        """
+        return await self._get_by_id('pacs_queries_url', 'PACS query', id, timeout)
+
+    async def create_pacs_query(self, pacs_id, data, timeout=30):
+        """
+        Create a PACS query given the corresponding PACS id and data dictionary.
+        """
+        return await self._create_related('pacs_url', 'pacs', pacs_id, 'query_list',
+                                          data, timeout)
+
+    async def create_pacs_retrieve(self, pacs_query_id, timeout=30):
+        """
+        Create a PACS retrieve given the corresponding PACS query id.
+        """
+        return await self._create_related('pacs_queries_url', 'PACS query',
+                                          pacs_query_id, 'retrieve_list', {}, timeout)
+
+    async def admin_register_pacs_series(self, data, timeout=30):
+        """
+        Register a new PACS series with CUBE.
+        """
+        return await self._create('pacs_series_url', data, None, timeout)
+
+    async def get_pacs_series_list(self, search_params=None, timeout=30):
+        """
+        Get a paginated list of PACS series (data descriptors) given query search
+        parameters. If no search parameters is given then get the default first page.
+        """
+        coll = await self._fetch_resource('pacs_series_url', search_params, timeout)
+        return Request.get_data_from_collection(coll)
+
+    async def get_pacs_series_by_id(self, id, timeout=30):
+        """
+        Get a PACS series' data (descriptors) given its ChRIS id.
+        """
+        return await self._get_by_id('pacs_series_url', 'PACS series', id, timeout)
+
+    async def get_file_browser_folders(self, search_params=None, timeout=30):
+        """
+        Get a paginated list of with the matching file browser folder (the returned
+        list only has at most one element) given query search parameters. If no search
+        parameters is given then get a list with the default root folder.
+        """
+        coll = await self._fetch_resource('file_browser_url', search_params, timeout)
+        return Request.get_data_from_collection(coll)
+
+    async def get_file_browser_folder_by_id(self, id, timeout=30):
+        """
+        Get a file browser folder' s data (descriptors) given its ChRIS id.
+        """
+        return await self._get_by_id('file_browser_url', 'file browser folder', id,
+                                     timeout)
+
+    async def get_file_browser_folder_by_path(self, path, timeout=30):
+        """
+        Get a file browser folder' s data (descriptors) given its ChRIS path.
+        """
+        result = await self.get_file_browser_folders({'path': path}, timeout)
+
+        if result['data']:
+            return result['data'][0]
+        raise ChrisRequestException(f'Could not find file browser folder with path {path}')
+
+    async def create_file_browser_folder(self, path, timeout=30):
+        """
+        Create a file browser folder given the path.
+        """
+        return await self._create('file_browser_url', {'path': path}, None, timeout)
+
+    async def get_groups(self, search_params=None, timeout=30):
+        """
+        Get a paginated list of groups (data descriptors) given query search
+        parameters. If no search parameters is given then get the default first page.
+        """
+        coll = await self._fetch_resource('groups_url', search_params, timeout)
+        return Request.get_data_from_collection(coll)
+
+    async def get_group_by_id(self, id, timeout=30):
+        """
+        Get a group's data (descriptors) given its ChRIS id.
+        """
+        return await self._get_by_id('groups_url', 'group', id, timeout)
+
+    async def admin_create_group(self, data, timeout=30):
+        """
+        Create a group given the name.
+        """
+        return await self._create('groups_url', data, None, timeout)
+
+    async def get_user(self, timeout=30):
+        """
+        Get a user's data (descriptors).
+        """
+        coll = await self._fetch_resource('user_url', None, timeout)
+        result = Request.get_data_from_collection(coll)
+        return result['data'][0]
+
+    @staticmethod
+    async def create_user(users_url, username, password, email, timeout=30):
+        """
+        Static method to create a new user account.
+        """
+        data = {'username': username, 'password': password, 'email': email}
+
+        req = AsyncRequest()
+        try:
+            coll = await req.post(users_url, data, None, timeout)
+        finally:
+            await req.close()
+        result = Request.get_data_from_collection(coll)
+        return result['data'][0]
+
+    @staticmethod
+    async def get_auth_token(auth_url, username, password, timeout=30):
+        """
+        Static method to fetch a user's login authorization token.
+        """
+        data = {'username': username, 'password': password}
+
+        req = AsyncRequest(auth=None, content_type='application/json')
+        try:
+            result = await req.post(auth_url, data, None, timeout)
+        finally:
+            await req.close()
+        return result['token']
+
+    async def _get_by_id(self, url_attr, resource_name, id, timeout=30):
+        """
+        Internal method to get a resource's data (descriptors) given its ChRIS id. No
+        search request is made if the item has already been seen.
+        """
+        coll = await self._fetch_item(url_attr, id, timeout)
+        result = Request.get_data_from_collection(coll)
+
+        if result['data']:
+            return result['data'][0]  # resource-specific ids are unique
+        raise ChrisRequestException(f'Could not find {resource_name} with id {id}')
+
+    async def _get_related(self, url_attr, resource_name, id, relation_name,
+                           params=None, timeout=30):
+        """
+        Internal method to get the paginated list of items linked to a resource through
+        a link relation given the resource's ChRIS id.
+        """
+        links = await self._get_item_link_urls(url_attr, id, relation_name, timeout)
+        if links is None:
+            raise ChrisRequestException(f'Could not find {resource_name} with id: {id}.')
+
+        if links:
+            coll = await self._request.get(links[0], params, timeout)
+            return Request.get_data_from_collection(coll)
+        return {'data': [], 'hasNextPage': False, 'hasPreviousPage': False, 'total': 0}
+
+    async def _create_related(self, url_attr, resource_name, id, relation_name, data,
+                              timeout=30):
+        """
+        Internal method to create a new item through a resource's link relation given
+        the resource's ChRIS id.
+        """
+        links = await self._get_item_link_urls(url_attr, id, relation_name, timeout)
+        if links is None:
+            raise ChrisRequestException(f'Could not find {resource_name} with id: {id}.')
+        if not links:
+            raise ChrisRequestException(
+                f'Could not find {relation_name} link for {resource_name} with id: {id}.')
+
+        coll = await self._request.post(links[0], data, None, timeout)
+        result = Request.get_data_from_collection(coll)
+        return result['data'][0]
+
+    async def _create(self, url_attr, data, file_contents=None, timeout=30):
+        """
+        Internal method to create a new item in a high level API resource.
+        """
+        if not getattr(self, url_attr): await self.set_urls(timeout)
+
+        coll = await self._send_to_resource(self._request.post, getattr(self, url_attr),
+                                            data, file_contents, timeout)
+        result = Request.get_data_from_collection(coll)
+        return result['data'][0]
+
+    async def _upload(self, url_attr, data, fname, timeout=30):
+        """
+        Internal method to stream a file given a local file path or a file handler in a
+        multipart request to create a new item in a high level API resource.
+        """
+        if not getattr(self, url_attr): await self.set_urls(timeout)
+        req = self._request
+
+        if isinstance(fname, str):
+            async def post(url):
+                with open(fname, 'rb') as f:
+                    return await req.post(url, data, f, timeout)
+        elif hasattr(fname, 'seek') and fname.seekable():
+            position = fname.tell()
+
+            async def post(url):
+                fname.seek(position)
+                return await req.post(url, data, fname, timeout)
+        else:
+            # a non-seekable stream can only be read once
+            contents = fname.read()
+
+            async def post(url):
+                return await req.post(url, data, contents, timeout)
+
+        coll = await self._send_to_resource(post, getattr(self, url_attr))
+        result = Request.get_data_from_collection(coll)
+        return result['data'][0]
+
+    async def _fetch_resource(self, url_attr, search_params=None, timeout=30):
+        """
+        Internal method to fetch the collection object of a resource given query search
+        parameters. If no search parameters is given then get the default first page.
+        """
+        url = getattr(self, url_attr)
+        if not url: await self.set_urls(timeout)
+
+        url = getattr(self, url_attr)
+        if not url:
+            raise ChrisRequestException('Resource not available to the user.')
+
+        req = self._request
+
+        if search_params:
+            collection = await self._send_to_resource(
+                req.get, url + self.query_url_sufix, search_params, timeout)
+        else:
+            collection = await self._send_to_resource(req.get, url, None, timeout)
+        self._remember_items(url_attr, collection)
+        return collection
+
+    async def _fetch_item(self, url_attr, id, timeout=30):
+        """
+        Internal method to fetch the collection object of the item of a resource given
+        its ChRIS id. The item's own url is used if it has already been seen.
+        """
+        url = self._get_known_item_url(url_attr, id)
+        if url:
+            try:
+                coll = await self._request.get(url, None, timeout)
+            except ChrisNotFoundException:
+                self._forget_item(url_attr, id)
+            else:
+                self._remember_items(url_attr, coll)
+                return coll
+        return await self._fetch_resource(url_attr, {'id': id}, timeout)
+
+    async def _get_item_url(self, url_attr, id, timeout=30):
+        """
+        Internal method to get the url of the item of a resource given its ChRIS id or
+        None if the item doesn't exist. No request is made if the item has already been
+        seen.
+        """
+        url = self._get_known_item_url(url_attr, id)
+        if url:
+            return url
+
+        coll = await self._fetch_resource(url_attr, {'id': id}, timeout)
+        return coll.items[0].href if coll.items else None
+
+    async def _get_item_link_urls(self, url_attr, id, relation_name, timeout=30):
+        """
+        Internal method to get the list of urls for a link relation of the item of a
+        resource given its ChRIS id or None if the item doesn't exist. No request is
+        made if the item has already been seen.
+        """
+        links = self._get_known_item_link_urls(url_attr, id, relation_name)
+        if links is not None:
+            return links
+
+        coll = await self._fetch_resource(url_attr, {'id': id}, timeout)
+        if len(coll.items) == 0:
+            return None
+        return Request.get_link_relation_urls(coll.items[0], relation_name)
+
+    async def _send_to_resource(self, send, url, *args):
+        """
+        Internal method to await a request coroutine function (e.g. self._request.post)
+        with the url of a high level API resource (or a url under it) and the rest of
+        its arguments. See Client._send_to_resource for the recovery from stale cached
+        urls.
+        """
+        try:
+            return await send(url, *args)
+        except ChrisNotFoundException:
+            new_url = await self._rediscover_url(url)
+            if new_url is None:
+                raise
+            return await send(new_url, *args)
+
+    async def _rediscover_url(self, url, timeout=30):
+        """
+        Internal method to get the url under the rediscovered urls of the high level API
+        resources that corresponds to a url under the cached ones, or None if the urls
+        weren't taken from the url cache or the url didn't change. The urls are
+        discovered again only once even if many requests fail at the same time.
+        """
+        if self._rediscover_lock is None:
+            self._rediscover_lock = asyncio.Lock()
+
+        async with self._rediscover_lock:
+            if self._urls_from_cache:
+                stale_urls = self._drop_urls()
+                await self.set_urls(timeout)
+                self._set_rediscovered_urls(stale_urls)
+            return self._get_rediscovered_url(url)
+
+    @staticmethod
+    async def _get_all_pages(get_page, limit=100):
+        """
+        Internal method to get the items (data descriptors) of all the pages of a
+        paginated list given a coroutine function that gets a page given its
+        limit/offset parameters.
+        """
+        items = []
+        offset = 0
+        while True:
+            result = await get_page({'limit': limit, 'offset': offset})
+            items.extend(result['data'])
+            if not result['hasNextPage']:
+                return items
+            offset += limit
+
+    @staticmethod
+    def _read_file(fname):
+        """
+        Internal method to read the contents of a file given a local file path or a
+        file handler.
+        """
+        if isinstance(fname, str):
+            with open(fname, 'rb') as f:
+                return f.read()
+        return fname.read()
@@ -0,0 +1,134 @@
+"""
+ChRIS asyncio request module.
+"""
+
+import os
+import json
+import asyncio
+
+import aiohttp
+
+from .request import Request
+from .exceptions import ChrisRequestException, ChrisNotFoundException
+
+
+class AsyncRequest(object):
+    """
+    Asyncio http request object.
+    """
+
+    def __init__(self, auth=None, content_type='application/vnd.collection+json',
+                 session=None):
+        self.auth = auth
+        self.content_type = content_type
+        self.session = session
+        self._owns_session = session is None
+
+    async def get(self, url, params=None, timeout=30):
+        """
+        Make a GET request to CUBE.
+        """
+        headers = {'Content-Type': self.content_type, 'Accept': self.content_type}
+        body = await self._send('GET', url, timeout, headers, params=params)
+
+        if self.content_type == 'application/vnd.collection+json':
+            return Request.get_collection_from_text(body)
+        return json.loads(body)
+
+    async def post(self, url, data, descriptor_file=None, timeout=30):
+        """
+        Make a POST request to CUBE.
+        """
+        return await self._post_put('POST', url, data, descriptor_file, timeout)
+
+    async def put(self, url, data, descriptor_file=None, timeout=30):
+        """
+        Make a PUT request to CUBE.
+        """
+        return await self._post_put('PUT', url, data, descriptor_file, timeout)
+
+    async def delete(self, url, timeout=30):
+        """
+        Make a DELETE request to CUBE.
+        """
+        await self._send('DELETE', url, timeout)
+
+    async def close(self):
+        """
+        Close the underlying session if it was created by this object.
+        """
+        if self.session is not None and self._owns_session:
+            await self.session.close()
+            self.session = None
+
+    async def _post_put(self, method, url, data, fname=None, timeout=30):
+        """
+        Internal method to make either a POST or PUT request to CUBE.
+        """
+        if fname is None:
+            headers = {'Content-Type': self.content_type, 'Accept': self.content_type}
+
+            if self.content_type == 'application/vnd.collection+json':
+                payload = json.dumps(Request.makeTemplate(data))
+            else:
+                payload = json.dumps(data)
+        else:
+            # this is a multipart request (file handlers are streamed by aiohttp)
+            headers = None
+            payload = aiohttp.FormData()
+            for key in data:
+                payload.add_field(key, str(data[key]))
+            filename = os.path.basename(getattr(fname, 'name', '') or 'fname')
+            payload.add_field('fname', fname, filename=filename,
+                              content_type='application/octet-stream')
+
+        body = await self._send(method, url, timeout, headers, data=payload)
+
+        if self.content_type == 'application/vnd.collection+json':
+            return Request.get_collection_from_text(body)
+        return json.loads(body)
+
+    async def _send(self, method, url, timeout, headers=None, **kwargs):
+        """
+        Internal method to send an authenticated request to CUBE through the pooled
+        session and return the response's body. ChrisNotFoundException is raised if
+        the url was not found.
+        """
+        auth = self.auth
+
+        if auth and auth.get('username') and auth.get('password'):
+            kwargs['auth'] = aiohttp.BasicAuth(auth['username'], auth['password'])
+        elif auth and auth.get('token'):
+            headers = dict(headers) if headers else {}
+            headers['Authorization'] = f"Token {auth['token']}"
+
+        if kwargs.get('params'):
+            kwargs['params'] = {k: str(v) for k, v in kwargs['params'].items()}
+        else:
+            kwargs.pop('params', None)
+
+        if self.session is None:
+            self.session = AsyncRequest.create_session()
+
+        try:
+            async with self.session.request(
+                    method, url, headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=timeout), **kwargs) as r:
+                if r.status == 404:
+                    raise ChrisNotFoundException(f'Not found: {r.url}')
+                return await r.read()
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            raise ChrisRequestException(str(e) or type(e).__name__)
+
+    @staticmethod
+    def create_session(limit=100, limit_per_host=0, keepalive_timeout=15):
+        """
+        Static method to create an aiohttp session whose connections are kept alive
+        and reused across requests. limit is the total number of simultaneous
+        connections, limit_per_host the number of simultaneous connections to the same
+        host (0 means no per-host limit) and keepalive_timeout the number of seconds an
+        idle connection is kept open. It must be called from a running event loop.
+        """
+        connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host,
+                                         keepalive_timeout=keepalive_timeout)
+        return aiohttp.ClientSession(connector=connector)
@@ -0,0 +1,145 @@
+"""
+ChRIS response cache module.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from .metrics import RequestMetrics
+
+
+class CacheEntry(object):
+    """
+    A cached GET response body with its validators.
+    """
+    __slots__ = ('url', 'body', 'etag', 'last_modified', 'expires')
+
+    def __init__(self, url, body, etag=None, last_modified=None, expires=0):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    def is_fresh(self):
+        """
+        Whether the entry can be used without revalidation.
+        """
+        return time.monotonic() < self.expires
+
+    def has_validators(self):
+        """
+        Whether the entry can be revalidated with a conditional request.
+        """
+        return bool(self.etag or self.last_modified)
+
+
+class ResponseCache(object):
+    """
+    Thread-safe, size-bounded (LRU) in-memory cache of GET response bodies. Entries
+    are fresh for a TTL that can be set per resource through the ttls dictionary that
+    maps url path fragments (e.g. '/plugins/', '/computeresources/') to seconds, the
+    longest matching fragment wins and other urls use the default ttl. The default ttl
+    is 0 so that only the explicitly listed (slow-changing) resources are cached and
+    status reads (e.g. of plugin instances) are never stale. A stale entry with an ETag
+    or Last-Modified validator is revalidated with a conditional request.
+    """
+
+    def __init__(self, maxsize=256, ttl=0, ttls=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ttl_for(self, url):
+        """
+        Get the TTL in seconds for a url.
+        """
+        matches = [fragment for fragment in self.ttls if fragment in url]
+        if matches:
+            return self.ttls[max(matches, key=len)]
+        return self.ttl
+
+    def get(self, key):
+        """
+        Get the entry for a key (fresh or stale) or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, url, body, etag=None, last_modified=None):
+        """
+        Cache a response body for a key. Nothing is cached if the url's TTL is 0 and
+        the response has no validators.
+        """
+        ttl = self.ttl_for(url)
+        if ttl <= 0 and not (etag or last_modified):
+            return
+        entry = CacheEntry(url, body, etag, last_modified, time.monotonic() + ttl)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def refresh(self, entry):
+        """
+        Make a revalidated entry fresh again.
+        """
+        entry.expires = time.monotonic() + self.ttl_for(entry.url)
+
+    def invalidate(self, url):
+        """
+        Drop every entry whose url starts with the given url (e.g. after a write to it)
+        and the list and search entries of the written url's resource (e.g. those of
+        'plugins/instances/search/' after a POST to 'plugins/3/instances/').
+        """
+        resource = RequestMetrics.resource_name(url)
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.url.startswith(url) or (
+                    self.is_collection_url(e.url) and
+                    RequestMetrics.resource_name(e.url) == resource)]:
+                del self._entries[key]
+
+    def clear(self):
+        """
+        Drop every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def record(self, counter):
+        """
+        Increment one of the 'hits', 'misses' or 'revalidations' counters.
+        """
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @staticmethod
+    def is_collection_url(url):
+        """
+        Static method to check whether a url is a list or search url rather than an
+        item's url.
+        """
+        return not urlsplit(url).path.rstrip('/').rsplit('/', 1)[-1].isdigit()
+
+    def stats(self):
+        """
+        Get a snapshot of the cache's counters and size.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'revalidations': self.revalidations, 'evictions': self.evictions,
+                    'size': len(self._entries)}
@@ -0,0 +1,203 @@
+"""
+ChRIS record/replay transport module.
+"""
+
+import io
+import json
+import base64
+import threading
+from collections import deque
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+from urllib3.response import HTTPResponse
+
+
+class Cassette(requests.adapters.HTTPAdapter):
+    """
+    Transport adapter that records the HTTP exchanges of a session to a JSON cassette
+    file and replays them deterministically without a network. The mode is 'record'
+    (send every request and record its response), 'replay' (answer every request with
+    a recorded response) or 'once' (replay if the cassette file exists, otherwise
+    record).
+
+    Requests are matched by their method, path and query parameters (in any order) so a
+    cassette recorded against one CUBE replays with any base url. The responses to the
+    same request are replayed in the order they were recorded, the last one is replayed
+    again once they run out. Request headers and bodies are never recorded, and the
+    secret query parameters (download tokens) of the urls and the tokens in the
+    response bodies (e.g. of the auth-token and download token endpoints) are replaced
+    by a placeholder when recording, so the cassettes don't store credentials. A
+    recorded cassette is saved when the adapter is closed (e.g. by closing the session
+    or the client).
+
+        cassette = Cassette('plugins.json', mode='once')
+        session = Request.create_session(transport=cassette)
+        client = Client(url, username, password, session=session)
+    """
+
+    MODES = ('record', 'replay', 'once')
+    SECRET_PARAMS = ('download_token',)
+    SECRET_FIELDS = ('token',)
+    PLACEHOLDER = 'scrubbed'
+
+    def __init__(self, path, mode='replay', **kwargs):
+        super().__init__(**kwargs)
+        if mode not in self.MODES:
+            raise ValueError(f'Invalid cassette mode {mode!r}, must be one of '
+                             f'{self.MODES}')
+        self.path = path
+        if mode == 'once':
+            try:
+                open(path).close()
+                mode = 'replay'
+            except FileNotFoundError:
+                mode = 'record'
+        self.mode = mode
+        self.interactions = []
+        self._responses = {}  # request key -> deque of recorded responses
+        self._lock = threading.Lock()
+        if mode == 'replay':
+            self.load()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None,
+             proxies=None):
+        """
+        Send a prepared request, recording its response or answering it with a
+        recorded one depending on the mode.
+        """
+        key = self.get_request_key(request.method, request.url)
+        if self.mode == 'replay':
+            return self.build_response(request, self._replay(key, request))
+
+        r = super().send(request, stream=stream, timeout=timeout, verify=verify,
+                         cert=cert, proxies=proxies)
+        interaction = {'request': {'method': request.method,
+                                   'url': self.scrub_url(request.url)},
+                       'response': self.encode_response(r)}
+        with self._lock:
+            self.interactions.append(interaction)
+        return r
+
+    def close(self):
+        """
+        Save the recorded cassette and close the pooled connections.
+        """
+        if self.mode == 'record':
+            self.save()
+        super().close()
+
+    def load(self):
+        """
+        Load the recorded interactions from the cassette file.
+        """
+        with open(self.path) as f:
+            self.interactions = json.load(f)['interactions']
+        responses = {}
+        for interaction in self.interactions:
+            req = interaction['request']
+            key = self.get_request_key(req['method'], req['url'])
+            responses.setdefault(key, deque()).append(interaction['response'])
+        self._responses = responses
+
+    def save(self):
+        """
+        Save the recorded interactions to the cassette file.
+        """
+        with self._lock:
+            interactions = list(self.interactions)
+        with open(self.path, 'w') as f:
+            json.dump({'version': 1, 'interactions': interactions}, f, indent=1)
+
+    def _replay(self, key, request):
+        """
+        Internal method to get a raw urllib3 response made from the recorded response
+        to a request.
+        """
+        with self._lock:
+            queue = self._responses.get(key)
+            if not queue:
+                raise requests.exceptions.ConnectionError(
+                    f'No recorded response to {request.method} {request.url} in '
+                    f'cassette {self.path}', request=request)
+            recorded = queue.popleft() if len(queue) > 1 else queue[0]
+        body = recorded['body'].encode() if recorded['encoding'] == 'utf-8' else \
+            base64.b64decode(recorded['body'])
+        headers = dict(recorded['headers'])
+        headers['Content-Length'] = str(len(body))
+        return HTTPResponse(body=io.BytesIO(body), headers=headers,
+                            status=recorded['status'], reason=recorded['reason'],
+                            preload_content=False, decode_content=False)
+
+    @staticmethod
+    def encode_response(response):
+        """
+        Static method to get the JSON-serializable representation of a response. The
+        body is read so a streamed response is recorded whole.
+        """
+        body = response.content
+        try:
+            body, encoding = Cassette.scrub_body(body.decode('utf-8')), 'utf-8'
+        except UnicodeDecodeError:
+            body, encoding = base64.b64encode(body).decode('ascii'), 'base64'
+        # the body is recorded decoded so its encoding headers no longer apply
+        headers = {name: value for name, value in response.headers.items()
+                   if name.lower() not in ('content-encoding', 'content-length',
+                                           'transfer-encoding', 'set-cookie')}
+        return {'status': response.status_code, 'reason': response.reason,
+                'headers': headers, 'body': body, 'encoding': encoding}
+
+    @staticmethod
+    def scrub_url(url):
+        """
+        Static method to replace the values of the secret query parameters of a url.
+        """
+        parts = urlsplit(url)
+        params = parse_qsl(parts.query, keep_blank_values=True)
+        if not any(name in Cassette.SECRET_PARAMS for name, _ in params):
+            return url
+        query = urlencode([(name, Cassette.PLACEHOLDER if name in Cassette.SECRET_PARAMS
+                            else value) for name, value in params])
+        return parts._replace(query=query).geturl()
+
+    @staticmethod
+    def scrub_body(body):
+        """
+        Static method to replace the tokens of a JSON response body, both plain JSON
+        fields and Collection+JSON descriptors with a secret field name.
+        """
+        try:
+            content = json.loads(body)
+        except ValueError:
+            return body
+        scrubbed = [False]
+
+        def scrub(obj):
+            if isinstance(obj, dict):
+                if obj.get('name') in Cassette.SECRET_FIELDS and 'value' in obj:
+                    obj['value'] = Cassette.PLACEHOLDER
+                    scrubbed[0] = True
+                for key, value in obj.items():
+                    if key in Cassette.SECRET_FIELDS and isinstance(value, str):
+                        obj[key] = Cassette.PLACEHOLDER
+                        scrubbed[0] = True
+                    else:
+                        scrub(value)
+            elif isinstance(obj, list):
+                for value in obj:
+                    scrub(value)
+
+        scrub(content)
+        return json.dumps(content) if scrubbed[0] else body
+
+    @staticmethod
+    def get_request_key(method, url):
+        """
+        Static method to get the key a request is matched by. The values of the secret
+        query parameters are ignored.
+        """
+        parts = urlsplit(url)
+        params = [(name, '' if name in Cassette.SECRET_PARAMS else value)
+                  for name, value in parse_qsl(parts.query, keep_blank_values=True)]
+        query = urlencode(sorted(params))
+        return f'{method} {parts.path}?{query}'
@@ -5,16 +5,31 @@ represented by a list of dictionaries.
 """
 
 from .request import Request
-from .exceptions import ChrisRequestException
+from .metrics import RequestMetrics
+from .resources import ResourcesMixin
+from .mirror import ObjectStore, Manifest
+from .watch import StatusTracker
+from .graph import FeedGraph, Workflow
+from .exceptions import (ChrisException, ChrisRequestException, ChrisNotFoundException,
+                         ChrisForbiddenException)
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from itertools import repeat, islice
+import os
+import time
+import posixpath
+import threading
 import json
 
 
-class Client(object):
+class Client(ResourcesMixin):
     """
     A ChRIS API client.
     """
 
-    def __init__(self, url, username=None, password=None, token=None):
+    def __init__(self, url, username=None, password=None, token=None, session=None,
+                 url_cache=None, cache=None, retry=None, breaker=None, governor=None,
+                 metrics=None, hooks=None):
         self.url = url
         self.query_url_sufix = 'search/'
         self.content_type = 'application/vnd.collection+json'
@@ -30,78 +45,106 @@ class Client(object):
         elif token is not None:
             self.auth = {'token': token}
 
-        self._request = Request(self.auth, self.content_type)
-
-        # urls of the high level API resources
-        self.feeds_url = self.url
-        self.public_feeds_url = ''
-        self.chris_instance_url = ''
-        self.compute_resources_url = ''
-        self.plugin_metas_url = ''
-        self.plugins_url = ''
-        self.plugin_instances_url = ''
-        self.pipelines_url = ''
-        self.workflows_url = ''
-        self.tags_url = ''
-        self.pipeline_source_files_url = ''
-        self.user_files_url = ''
-        self.pacs_files_url = ''
-        self.pacs_url = ''
-        self.pacs_queries_url = ''
-        self.pacs_series_url = ''
-        self.file_browser_url = ''
-        self.download_tokens_url = ''
-        self.groups_url = ''
-        self.user_url = ''
-        self.admin_url = ''
+        # per resource request metrics (RequestMetrics), shareable across clients
+        self.metrics = metrics if metrics is not None else RequestMetrics()
+
+        # all the client's requests share the session's pool of keep-alive connections,
+        # the optional in-memory response cache (ResponseCache) of GET requests, the
+        # optional retry policy (RetryPolicy), the optional per-host circuit breaker
+        # (CircuitBreaker), the optional rate and concurrency governor (Governor) and
+        # the request hooks (e.g. OpenTelemetryHooks)
+        self._request = Request(self.auth, self.content_type, session, cache, retry,
+                                breaker, governor, [self.metrics] + list(hooks or []))
+
+        # the urls of the high level API resources (optionally cached on disk by
+        # url_cache) and the urls and link relations of the items already seen
+        self._init_resources(url_cache, threading.Lock())
+        self._rediscover_lock = threading.Lock()
+
+        # download token shared by the downloads for download_token_max_age seconds
+        self.download_token_max_age = 60
+        self._download_token = None  # (token, created at)
+        self._download_token_lock = threading.Lock()
 
     def set_urls(self, timeout=30):
         """
-        Set the urls of the high level API resources.
+        Set the urls of the high level API resources. If the client has a url cache
+        then the urls are taken from it when there is a fresh entry for the CUBE url and
+        user, otherwise they are discovered from the API root and cached.
         """
-        get_url = Request.get_link_relation_urls
+        if self._set_urls_from_cache():
+            return
 
         req = self._request
         coll = req.get(self.url, None, timeout)
+        self.set_urls_from_collection(coll)
+        self._cache_urls()
 
-        # get urls of the high level API resources
-        self.public_feeds_url = self.public_feeds_url or get_url(coll, 'public_feeds')[0]
-        self.chris_instance_url = self.chris_instance_url or get_url(
-            coll, 'chrisinstance')[0]
-        self.compute_resources_url = self.compute_resources_url or get_url(
-            coll, 'compute_resources')[0]
-        self.plugin_metas_url = self.plugin_metas_url or get_url(coll, 'plugin_metas')[0]
-        self.plugins_url = self.plugins_url or get_url(coll, 'plugins')[0]
-        self.plugin_instances_url = self.plugin_instances_url or get_url(
-            coll, 'plugin_instances')[0]
-        self.pipelines_url = self.pipelines_url or get_url(coll, 'pipelines')[0]
-        self.workflows_url = self.workflows_url or get_url(coll, 'workflows')[0]
-        self.tags_url = self.tags_url or get_url(coll, 'tags')[0]
-        self.pipeline_source_files_url = self.pipeline_source_files_url or get_url(
-            coll, 'pipelinesourcefiles')[0]
-        self.user_files_url = self.user_files_url or get_url(
-            coll, 'userfiles')[0]
-        self.pacs_files_url = self.pacs_files_url or get_url(coll, 'pacsfiles')[0]
-        self.pacs_url = self.pacs_url or get_url(coll, 'pacs')[0]
-        self.pacs_queries_url = self.pacs_queries_url or get_url(coll, 'pacsqueries')[0]
-        self.pacs_series_url = self.pacs_series_url or get_url(coll, 'pacsseries')[0]
-        self.file_browser_url = self.file_browser_url or get_url(coll, 'filebrowser')[0]
-
-        if not self.download_tokens_url:
-            urls = get_url(coll, 'download_tokens')
-            self.download_tokens_url = urls[0] if urls else ''
-
-        if not self.groups_url:
-            urls = get_url(coll, 'groups')
-            self.groups_url = urls[0] if urls else ''
-
-        if not self.user_url:
-            urls = get_url(coll, 'user')
-            self.user_url = urls[0] if urls else ''
+    def close(self):
+        """
+        Close the client's connections to CUBE.
+        """
+        self._request.close()
 
-        if not self.admin_url:
-            urls = get_url(coll, 'admin')
-            self.admin_url = urls[0] if urls else ''
+    def stats(self):
+        """
+        Get a snapshot of the client's request metrics per resource (see
+        RequestMetrics.snapshot) and of the stats of its response cache and governor
+        (None if the client doesn't have them).
+        """
+        req = self._request
+        return {'requests': self.metrics.snapshot(),
+                'cache': req.cache.stats() if req.cache is not None else None,
+                'governor': req.governor.stats() if req.governor is not None else None}
+
+    def fetch_all(self, resource, search_params=None, workers=4, stream=False,
+                  timeout=30):
+        """
+        Get all the items (data descriptors) of a high level API resource (e.g.
+        'plugin_instances', 'feeds', 'pacs_files') matching the query search parameters
+        by fetching the result pages concurrently. The collection's total and the size
+        of the first page (which the server may cap below the requested limit) are used
+        to compute every offset/limit window, so the pages are fetched by workers
+        threads over the pooled connections. The items are returned in a list
+        in the same order as the sequential listing. If stream is True then a generator
+        that yields the items in the same order is returned instead, fetching at most
+        workers pages ahead of the page being consumed.
+        """
+        url_attr = resource + '_url'
+        if not hasattr(self, url_attr):
+            raise ValueError(f'Unknown resource: {resource}.')
+
+        url = self._get_resource_url(url_attr, search_params, timeout)
+        return self._fetch_all_pages(url, search_params, workers, stream, timeout)
+
+    def iter_pages(self, resource, search_params=None, id=None, relation=None,
+                   timeout=30, prefetch=False):
+        """
+        Get a generator of the result pages of a high level API resource (e.g.
+        'plugins', 'plugin_instances') matching the query search parameters that lazily
+        follows the pages' next links. If id and relation are given then the pages of
+        the item's related collection (e.g. a plugin's 'parameters' or a plugin
+        instance's 'files') are generated instead. Each page is a result dictionary as
+        returned by the get methods with an extra 'links' list that holds a dictionary
+        of link relation names to urls for each of the page's items. If prefetch is
+        True then the next page is fetched in the background while the current one is
+        consumed.
+        """
+        url_attr = resource + '_url'
+        if not hasattr(self, url_attr):
+            raise ValueError(f'Unknown resource: {resource}.')
+
+        if relation is None:
+            url = self._get_resource_url(url_attr, search_params, timeout)
+            return self._iter_result_pages(url, search_params, timeout, prefetch,
+                                           url_attr)
+
+        links = self._get_item_link_urls(url_attr, id, relation, timeout)
+        if links is None:
+            raise ChrisRequestException(f'Could not find {resource} item with id: {id}.')
+        if not links:
+            return iter(())
+        return self._iter_result_pages(links[0], search_params, timeout, prefetch)
 
     def get_chris_instance(self, timeout=30):
         """
@@ -119,6 +162,15 @@ class Client(object):
         coll = self._fetch_resource('feeds_url', search_params, timeout)
         return Request.get_data_from_collection(coll)
 
+    def iter_feeds(self, search_params=None, timeout=30, prefetch=False):
+        """
+        Get a generator of all the feeds (data descriptors) matching the query search
+        parameters that lazily follows the pages' next links. If prefetch is True then
+        the next page is fetched in the background while the current one is consumed.
+        """
+        url = self._get_resource_url('feeds_url', search_params, timeout)
+        return self._iter_collection_items(url, search_params, timeout, prefetch)
+
     def get_public_feeds(self, search_params=None, timeout=30):
         """
         Get a paginated list of public feeds (data descriptors) given query search
@@ -127,11 +179,22 @@ class Client(object):
         coll = self._fetch_resource('public_feeds_url', search_params, timeout)
         return Request.get_data_from_collection(coll)
 
+    def iter_public_feeds(self, search_params=None, timeout=30, prefetch=False):
+        """
+        Get a generator of all the public feeds (data descriptors) matching the query
+        search parameters that lazily follows the pages' next links. If prefetch is True
+        then the next page is fetched in the background while the current one is
+        consumed.
+        """
+        url = self._get_resource_url('public_feeds_url', search_params, timeout)
+        return self._iter_collection_items(url, search_params, timeout, prefetch)
+
     def get_feed_by_id(self, id, timeout=30):
         """
         Get a feed's data (descriptors) given its ChRIS id.
         """
-        result = self.get_feeds({'id': id}, timeout)
+        coll = self._get_item_collection('feeds_url', id, timeout)
+        result = Request.get_data_from_collection(coll)
 
         if result['data']:
             return result['data'][0]  # resource-specific ids are unique
@@ -145,11 +208,21 @@ class Client(object):
         coll = self._fetch_resource('plugins_url', search_params, timeout)
         return Request.get_data_from_collection(coll)
 
+    def iter_plugins(self, search_params=None, timeout=30, prefetch=False):
+        """
+        Get a generator of all the plugins (data descriptors) matching the query search
+        parameters that lazily follows the pages' next links. If prefetch is True then
+        the next page is fetched in the background while the current one is consumed.
+        """
+        url = self._get_resource_url('plugins_url', search_params, timeout)
+        return self._iter_collection_items(url, search_params, timeout, prefetch)
+
     def get_plugin_by_id(self, id, timeout=30):
         """
         Get a plugin's data (descriptors) given its ChRIS id.
         """
-        result = self.get_plugins({'id': id}, timeout)
+        coll = self._get_item_collection('plugins_url', id, timeout)
+        result = Request.get_data_from_collection(coll)
 
         if result['data']:
             return result['data'][0]
@@ -159,12 +232,11 @@ class Client(object):
         """
         Get a plugin's paginated parameters given its ChRIS id.
         """
-        coll = self._fetch_resource('plugins_url', {'id': plugin_id}, timeout)
-        if len(coll.items) == 0:
+        parameters_links = self._get_item_link_urls('plugins_url', plugin_id,
+                                                    'parameters', timeout)
+        if parameters_links is None:
             raise ChrisRequestException(f'Could not find plugin with id: {plugin_id}.')
 
-        parameters_links = Request.get_link_relation_urls(coll.items[0], 'parameters')
-
         if parameters_links:
             req = self._request
             coll = req.get(parameters_links[0], params, timeout) # there can only be a single parameters link
@@ -172,6 +244,20 @@ class Client(object):
 
         return {'data': [], 'hasNextPage': False, 'hasPreviousPage': False, 'total': 0}
 
+    def iter_plugin_parameters(self, plugin_id, params=None, timeout=30, prefetch=False):
+        """
+        Get a generator of all a plugin's parameters given its ChRIS id that lazily
+        follows the pages' next links. If prefetch is True then the next page is fetched
+        in the background while the current one is consumed.
+        """
+        links = self._get_item_link_urls('plugins_url', plugin_id, 'parameters', timeout)
+        if links is None:
+            raise ChrisRequestException(f'Could not find plugin with id: {plugin_id}.')
+
+        if not links:
+            return iter(())
+        return self._iter_collection_items(links[0], params, timeout, prefetch)
+
     def get_plugin_metas(self, search_params=None, timeout=30):
         """
         Get a paginated list of plugin metas (data descriptors) given query search
@@ -180,11 +266,22 @@ class Client(object):
         coll = self._fetch_resource('plugin_metas_url', search_params, timeout)
         return Request.get_data_from_collection(coll)
 
+    def iter_plugin_metas(self, search_params=None, timeout=30, prefetch=False):
+        """
+        Get a generator of all the plugin metas (data descriptors) matching the query
+        search parameters that lazily follows the pages' next links. If prefetch is True
+        then the next page is fetched in the background while the current one is
+        consumed.
+        """
+        url = self._get_resource_url('plugin_metas_url', search_params, timeout)
+        return self._iter_collection_items(url, search_params, timeout, prefetch)
+
     def get_plugin_meta_by_id(self, id, timeout=30):
         """
         Get a plugin meta's data (descriptors) given its ChRIS id.
         """
-        result = self.get_plugin_metas({'id': id}, timeout)
+        coll = self._get_item_collection('plugin_metas_url', id, timeout)
+        result = Request.get_data_from_collection(coll)
 
         if result['data']:
             return result['data'][0]
@@ -198,11 +295,22 @@ class Client(object):
         coll = self._fetch_resource('compute_resources_url', search_params, timeout)
         return Request.get_data_from_collection(coll)
 
+    def iter_compute_resources(self, search_params=None, timeout=30, prefetch=False):
+        """
+        Get a generator of all the compute resources (data descriptors) matching the
+        query search parameters that lazily follows the pages' next links. If prefetch
+        is True then the next page is fetched in the background while the current one is
+        consumed.
+        """
+        url = self._get_resource_url('compute_resources_url', search_params, timeout)
+        return self._iter_collection_items(url, search_params, timeout, prefetch)
+
     def get_compute_resource_by_id(self, id, timeout=30):
         """
         Get a compute_resource's data (descriptors) given its ChRIS id.
         """
-        result = self.get_compute_resources({'id': id}, timeout)
+        coll = self._get_item_collection('compute_resources_url', id, timeout)
+        result = Request.get_data_from_collection(coll)
 
         if result['data']:
             return result['data'][0]
@@ -231,7 +339,8 @@ class Client(object):
         comp = {'compute_names': compute_names}
 
         req = self._request
-        coll = req.post(self.admin_url, comp, file_contents, timeout)
+        coll = self._send_to_resource(req.post, self.admin_url, comp, file_contents,
+                                      timeout)
         result = Request.get_data_from_collection(coll)
         return result['data'][0]
 
@@ -246,7 +355,8 @@ class Client(object):
         data = {'compute_names': compute_names}
 
         req = self._request
-        coll = req.put(self.admin_url + f'{plugin_id}/', data, None, timeout)
+        coll = self._send_to_resource(req.put, self.admin_url + f'{plugin_id}/', data,
+                                      None, timeout)
         result = Request.get_data_from_collection(coll)
         return result['data'][0]
 
@@ -258,43 +368,95 @@ class Client(object):
         coll = self._fetch_resource('plugin_instances_url', search_params, timeout)
         return Request.get_data_from_collection(coll)
 
+    def iter_plugin_instances(self, search_params=None, timeout=30, prefetch=False):
+        """
+        Get a generator of all the plugin instances (data descriptors) matching the
+        query search parameters that lazily follows the pages' next links. If prefetch
+        is True then the next page is fetched in the background while the current one is
+        consumed.
+        """
+        url = self._get_resource_url('plugin_instances_url', search_params, timeout)
+        return self._iter_collection_items(url, search_params, timeout, prefetch)
+
     def get_plugin_instance_by_id(self, id, timeout=30):
         """
         Get a plugin instance's data (descriptors) given its ChRIS id.
         """
-        result = self.get_plugin_instances({'id': id}, timeout)
+        coll = self._get_item_collection('plugin_instances_url', id, timeout)
+        result = Request.get_data_from_collection(coll)
 
         if result['data']:
             return result['data'][0]
         raise ChrisRequestException(f'Could not find plugin instance with id {id}')
 
-    def create_plugin_instance(self, plugin_id, data, timeout=30):
+    def create_plugin_instance(self, plugin_id, data, timeout=30, idempotency_key=None):
         """
         Create a plugin instance given the corresponding plugin id and plugin-specific
-        data dictionary.
+        data dictionary. If an idempotency_key is given then the request can be retried
+        by the client's retry policy on transient failures.
         """
-        coll = self._fetch_resource('plugins_url', {'id': plugin_id}, timeout)
-        if len(coll.items) == 0:
+        instances_links = self._get_item_link_urls('plugins_url', plugin_id,
+                                                   'instances', timeout)
+        if instances_links is None:
             raise ChrisRequestException(f'Could not find plugin with id: {plugin_id}.')
-
-        instances_links = Request.get_link_relation_urls(coll.items[0], 'instances')
+        if not instances_links:
+            raise ChrisRequestException(f'Could not find instances link for plugin '
+                                        f'with id: {plugin_id}.')
 
         req = self._request
-        coll = req.post(instances_links[0], data, None, timeout)
+        coll = req.post(instances_links[0], data, None, timeout,
+                        idempotency_key=idempotency_key)
         result = Request.get_data_from_collection(coll)
         return result['data'][0]
 
+    def create_plugin_instances(self, plugin_id, data_list, concurrency=8, rate=None,
+                                timeout=30, idempotency_keys=None):
+        """
+        Create many plugin instances of the same plugin given the plugin id and a list
+        of plugin-specific data dictionaries. The plugin's instances link is resolved
+        once and the POST requests are sent by concurrency threads over the pooled
+        connections, at most rate requests per second if rate is given. A list is
+        returned in the same order as data_list with either the created plugin
+        instance's data (descriptors) or the ChrisException raised when creating it.
+        If a list of idempotency_keys (in the same order as data_list) is given then
+        the requests can be retried by the client's retry policy.
+        """
+        instances_links = self._get_item_link_urls('plugins_url', plugin_id,
+                                                   'instances', timeout)
+        if instances_links is None:
+            raise ChrisRequestException(f'Could not find plugin with id: {plugin_id}.')
+        if not instances_links:
+            raise ChrisRequestException(f'Could not find instances link for plugin '
+                                        f'with id: {plugin_id}.')
+
+        req = self._request
+        throttle = self._make_throttle(rate)
+
+        def create(data, idempotency_key):
+            throttle()
+            try:
+                coll = req.post(instances_links[0], data, None, timeout,
+                                idempotency_key=idempotency_key)
+            except ChrisException as e:
+                return e
+            return Request.get_data_from_collection(coll)['data'][0]
+
+        keys = idempotency_keys if idempotency_keys is not None else repeat(None)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(create, data_list, keys))
+
     def create_plugin_instance_split(self, plg_inst_id, filter='', cr_name='', timeout=30):
         """
         Create a plugin instance given the corresponding plugin id and plugin-specific
         data dictionary.
         """
-        coll = self._fetch_resource('plugin_instances_url', {'id': plg_inst_id},
-                                    timeout)
-        if len(coll.items) == 0:
+        splits_links = self._get_item_link_urls('plugin_instances_url', plg_inst_id,
+                                                'splits', timeout)
+        if splits_links is None:
             raise ChrisRequestException(f'Could not find plugin instance with id: {plg_inst_id}')
-
-        splits_links = Request.get_link_relation_urls(coll.items[0], 'splits')
+        if not splits_links:
+            raise ChrisRequestException(f'Could not find splits link for plugin instance '
+                                        f'with id: {plg_inst_id}.')
 
         data = {'filter': filter}
         if cr_name: data['compute_resource_name'] = cr_name
@@ -304,6 +466,71 @@ class Client(object):
         result = Request.get_data_from_collection(coll)
         return result['data'][0]
 
+    def watch(self, instances=None, workflow_id=None, interval=1, max_interval=30,
+              backoff=1.5, max_wait=None, timeout=30):
+        """
+        Get a generator that polls CUBE until all the given plugin instances (ids or
+        data dictionaries), or all the plugin instances of a workflow if workflow_id is
+        given, have finished running and yields a (plugin instance data, previous
+        status) tuple every time an instance's status changes (the previous status is
+        None the first time an instance is seen). Instances given by id are looked up
+        once to find their feeds. Then each poll makes a single paginated plugin
+        instances search per feed of the unfinished instances (or a single listing of
+        the workflow's plugin instances) instead of one request per instance. An
+        instance that is no longer returned (e.g. it was deleted) stops being watched.
+        The delay between polls starts at interval seconds and grows by the backoff
+        factor up to max_interval seconds while nothing changes. If max_wait is given
+        then the generator stops after max_wait seconds even if some instances are
+        running.
+        """
+        tracker = StatusTracker(None if workflow_id is not None else instances,
+                                interval, max_interval, backoff)
+        start = time.monotonic()
+
+        while True:
+            if workflow_id is not None:
+                plg_insts = list(self.iter_workflow_plugin_instances(
+                    workflow_id, {'limit': 100}, timeout))
+                polled_ids = ()
+            else:
+                # CUBE's plugin instances search has no filter for a list of ids, so
+                # the tracker ignores the unwatched instances of the polled feeds
+                polled_ids = tracker.unknown_ids()
+                plg_insts = [plg_inst for id in polled_ids for plg_inst in
+                             self.get_plugin_instances({'id': id}, timeout)['data']]
+                for feed_id, ids in tracker.pending_feeds().items():
+                    plg_insts.extend(self.iter_plugin_instances(
+                        {'feed_id': feed_id, 'limit': 100}, timeout))
+                    polled_ids.extend(ids)
+            yield from tracker.update(plg_insts, polled_ids)
+
+            if tracker.done():
+                return
+            elapsed = time.monotonic() - start
+            if max_wait is not None and elapsed + tracker.delay > max_wait:
+                return
+            time.sleep(tracker.delay)
+
+    def wait_for(self, instances=None, workflow_id=None, callback=None, interval=1,
+                 max_interval=30, backoff=1.5, max_wait=None, timeout=30):
+        """
+        Wait until all the given plugin instances (ids or data dictionaries), or all the
+        plugin instances of a workflow if workflow_id is given, have finished running
+        and return a dictionary of their ids to their last seen data (descriptors). If
+        callback is given then it is called with the plugin instance data and the
+        previous status every time an instance's status changes. The instances that no
+        longer exist are left out of the returned dictionary. The polling is done by
+        the watch method (see it for the other arguments).
+        """
+        last_seen = {}
+        for plg_inst, previous_status in self.watch(instances, workflow_id, interval,
+                                                    max_interval, backoff, max_wait,
+                                                    timeout):
+            last_seen[plg_inst['id']] = plg_inst
+            if callback is not None:
+                callback(plg_inst, previous_status)
+        return last_seen
+
     def get_pipelines(self, search_params=None, timeout=30):
         """
         Get a paginated list of pipelines (data descriptors) given query search
@@ -312,11 +539,22 @@ class Client(object):
         coll = self._fetch_resource('pipelines_url', search_params, timeout)
         return Request.get_data_from_collection(coll)
 
+    def iter_pipelines(self, search_params=None, timeout=30, prefetch=False):
+        """
+        Get a generator of all the pipelines (data descriptors) matching the query
+        search parameters that lazily follows the pages' next links. If prefetch is True
+        then the next page is fetched in the background while the current one is
+        consumed.
+        """
+        url = self._get_resource_url('pipelines_url', search_params, timeout)
+        return self._iter_collection_items(url, search_params, timeout, prefetch)
+
     def get_pipeline_by_id(self, id, timeout=30):
         """
         Get a pipeline's data (descriptors) given its ChRIS id.
         """
-        result = self.get_pipelines({'id': id}, timeout)
+        coll = self._get_item_collection('pipelines_url', id, timeout)
+        result = Request.get_data_from_collection(coll)
 
         if result['data']:
             return result['data'][0]  # pipeline ids are unique
@@ -326,18 +564,35 @@ class Client(object):
         """
         Get a pipeline's paginated default parameters given its ChRIS id.
         """
-        coll = self._fetch_resource('pipelines_url', {'id': pipeline_id}, timeout)
-        if len(coll.items) == 0:
+        parameters_links = self._get_item_link_urls('pipelines_url', pipeline_id,
+                                                    'default_parameters', timeout)
+        if parameters_links is None:
             raise ChrisRequestException(f'Could not find pipeline with id: '
                                         f'{pipeline_id}.')
-        parameters_links = Request.get_link_relation_urls(coll.items[0],
-                                                          'default_parameters')
+
         if parameters_links:
             req = self._request
             coll = req.get(parameters_links[0], params, timeout)
             return Request.get_data_from_collection(coll)
         return {'data': [], 'hasNextPage': False, 'hasPreviousPage': False, 'total': 0}
 
+    def iter_pipeline_default_parameters(self, pipeline_id, params=None, timeout=30,
+                                         prefetch=False):
+        """
+        Get a generator of all a pipeline's default parameters given its ChRIS id that
+        lazily follows the pages' next links. If prefetch is True then the next page is
+        fetched in the background while the current one is consumed.
+        """
+        links = self._get_item_link_urls('pipelines_url', pipeline_id,
+                                         'default_parameters', timeout)
+        if links is None:
+            raise ChrisRequestException(f'Could not find pipeline with id: '
+                                        f'{pipeline_id}.')
+
+        if not links:
+            return iter(())
+        return self._iter_collection_items(links[0], params, timeout, prefetch)
+
     def create_pipeline(self, data, timeout=30):
         """
         Create a pipeline given the data dictionary.
@@ -345,7 +600,7 @@ class Client(object):
         if not self.pipelines_url: self.set_urls(timeout)
 
         req = self._request
-        coll = req.post(self.pipelines_url, data, None, timeout)
+        coll = self._send_to_resource(req.post, self.pipelines_url, data, None, timeout)
         result = Request.get_data_from_collection(coll)
         return result['data'][0]
 
@@ -357,11 +612,22 @@ class Client(object):
         coll = self._fetch_resource('workflows_url', search_params, timeout)
         return Request.get_data_from_collection(coll)
 
+    def iter_workflows(self, search_params=None, timeout=30, prefetch=False):
+        """
+        Get a generator of all the workflows (data descriptors) matching the query
+        search parameters that lazily follows the pages' next links. If prefetch is True
+        then the next page is fetched in the background while the current one is
+        consumed.
+        """
+        url = self._get_resource_url('workflows_url', search_params, timeout)
+        return self._iter_collection_items(url, search_params, timeout, prefetch)
+
     def get_workflow_by_id(self, id, timeout=30):
         """
         Get a workflow's data (descriptors) given its ChRIS id.
         """
-        result = self.get_workflows({'id': id}, timeout)
+        coll = self._get_item_collection('workflows_url', id, timeout)
+        result = Request.get_data_from_collection(coll)
 
         if result['data']:
             return result['data'][0]
@@ -371,71 +637,81 @@ class Client(object):
         """
         Get a workflow's paginated list of plugin instances given its ChRIS id.
         """
-        coll = self._fetch_resource('workflows_url', {'id': workflow_id}, timeout)
-        if len(coll.items) == 0:
+        parameters_links = self._get_item_link_urls('workflows_url', workflow_id,
+                                                    'plugin_instances', timeout)
+        if parameters_links is None:
             raise ChrisRequestException(f'Could not find workflow with id: {workflow_id}.')
 
-        parameters_links = Request.get_link_relation_urls(coll.items[0],
-                                                          'plugin_instances')
         if parameters_links:
             req = self._request
             coll = req.get(parameters_links[0], params, timeout)
             return Request.get_data_from_collection(coll)
         return {'data': [], 'hasNextPage': False, 'hasPreviousPage': False, 'total': 0}
 
+    def iter_workflow_plugin_instances(self, workflow_id, params=None, timeout=30,
+                                       prefetch=False):
+        """
+        Get a generator of all a workflow's plugin instances given its ChRIS id that
+        lazily follows the pages' next links. If prefetch is True then the next page is
+        fetched in the background while the current one is consumed.
+        """
+        links = self._get_item_link_urls('workflows_url', workflow_id,
+                                         'plugin_instances', timeout)
+        if links is None:
+            raise ChrisRequestException(f'Could not find workflow with id: '
+                                        f'{workflow_id}.')
+
+        if not links:
+            return iter(())
+        return self._iter_collection_items(links[0], params, timeout, prefetch)
+
+    def get_workflow_graph(self, workflow_id, workers=4, timeout=30):
+        """
+        Get the DAG (a Workflow object) of all a workflow's plugin instances given its
+        ChRIS id. The pages of plugin instances are fetched concurrently by workers
+        threads and the graph is built locally.
+        """
+        links = self._get_item_link_urls('workflows_url', workflow_id,
+                                         'plugin_instances', timeout)
+        if links is None:
+            raise ChrisRequestException(f'Could not find workflow with id: '
+                                        f'{workflow_id}.')
+
+        plg_insts = []
+        if links:
+            plg_insts = self._fetch_all_pages(links[0], {'limit': 100}, workers,
+                                              timeout=timeout)
+        return Workflow(workflow_id, plg_insts)
+
+    def get_feed_graph(self, feed_id, workers=4, timeout=30):
+        """
+        Get the DAG (a FeedGraph object) of all a feed's plugin instances given its
+        ChRIS id. The pages of plugin instances are fetched concurrently by workers
+        threads and the graph is built locally.
+        """
+        plg_insts = self.fetch_all('plugin_instances', {'feed_id': feed_id, 'limit': 100},
+                                   workers, timeout=timeout)
+        return FeedGraph(plg_insts)
+
     def create_workflow(self, pipeline_id, data, timeout=30):
         """
         Create a workflow given the corresponding pipeline id and pipeline-specific
         data dictionary.
         """
-        coll = self._fetch_resource('pipelines_url', {'id': pipeline_id}, timeout)
-        if len(coll.items) == 0:
+        workflows_links = self._get_item_link_urls('pipelines_url', pipeline_id,
+                                                   'workflows', timeout)
+        if workflows_links is None:
             raise ChrisRequestException(f'Could not find pipeline with id: '
                                         f'{pipeline_id}.')
-
-        workflows_links = Request.get_link_relation_urls(coll.items[0], 'workflows')
+        if not workflows_links:
+            raise ChrisRequestException(f'Could not find workflows link for pipeline '
+                                        f'with id: {pipeline_id}.')
 
         req = self._request
         coll = req.post(workflows_links[0], data, None, timeout)
         result = Request.get_data_from_collection(coll)
         return result['data'][0]
 
-    def compute_workflow_nodes_info(self, pipeline_default_parameters,
-                                    include_all_defaults=False):
-        """
-        Helper method to create the nodes_info data structure required to create a
-        workflow from a pipeline's default parameters data returned by the
-        get_pipeline_default_parameters. If include_all_defaults is set to True
-        then non-null parameters are also included in the result.
-        """
-        pipings_dict = {}
-        for default_param in pipeline_default_parameters:
-            piping_id = default_param['plugin_piping_id']
-
-            if piping_id not in pipings_dict:
-                pipings_dict[piping_id] = {
-                    'piping_id': piping_id,
-                    'previous_piping_id': default_param['previous_plugin_piping_id'],
-                    'compute_resource_name': 'host',
-                    'title': default_param['plugin_piping_title'],
-                    'plugin_parameter_defaults': []
-                }
-
-            if default_param['value'] is None or include_all_defaults:
-                pipings_dict[piping_id]['plugin_parameter_defaults'].append(
-                    {
-                        'name': default_param['param_name'],
-                        'default': default_param['value']
-                    }
-                )
-
-        nodes_info = []
-        for piping_id in pipings_dict:
-            if not pipings_dict[piping_id]['plugin_parameter_defaults']:
-                del pipings_dict[piping_id]['plugin_parameter_defaults']
-            nodes_info.append(pipings_dict[piping_id])
-        return nodes_info
-
     def get_tags(self, search_params=None, timeout=30):
         """
         Get a paginated list of tags (data descriptors) given query search
@@ -444,11 +720,21 @@ class Client(object):
         coll = self._fetch_resource('tags_url', search_params, timeout)
         return Request.get_data_from_collection(coll)
 
+    def iter_tags(self, search_params=None, timeout=30, prefetch=False):
+        """
+        Get a generator of all the tags (data descriptors) matching the query search
+        parameters that lazily follows the pages' next links. If prefetch is True then
+        the next page is fetched in the background while the current one is consumed.
+        """
+        url = self._get_resource_url('tags_url', search_params, timeout)
+        return self._iter_collection_items(url, search_params, timeout, prefetch)
+
     def get_tag_by_id(self, id, timeout=30):
         """
         Get a tag's data (descriptors) given its ChRIS id.
         """
-        result = self.get_tags({'id': id}, timeout)
+        coll = self._get_item_collection('tags_url', id, timeout)
+        result = Request.get_data_from_collection(coll)
 
         if result['data']:
             return result['data'][0]
@@ -461,7 +747,7 @@ class Client(object):
         if not self.tags_url: self.set_urls(timeout)
 
         req = self._request
-        coll = req.post(self.tags_url, data, None, timeout)
+        coll = self._send_to_resource(req.post, self.tags_url, data, None, timeout)
         result = Request.get_data_from_collection(coll)
         return result['data'][0]
 
@@ -474,35 +760,40 @@ class Client(object):
         coll = self._fetch_resource('pipeline_source_files_url', search_params, timeout)
         return Request.get_data_from_collection(coll)
 
+    def iter_pipeline_source_files(self, search_params=None, timeout=30, prefetch=False):
+        """
+        Get a generator of all the pipeline source files (data descriptors) matching the
+        query search parameters that lazily follows the pages' next links. If prefetch
+        is True then the next page is fetched in the background while the current one is
+        consumed.
+        """
+        url = self._get_resource_url('pipeline_source_files_url', search_params, timeout)
+        return self._iter_collection_items(url, search_params, timeout, prefetch)
+
     def get_pipeline_source_file_by_id(self, id, timeout=30):
         """
         Get a pipeline_source_file's data (descriptors) given its ChRIS id.
         """
-        result = self.get_pipeline_source_files({'id': id}, timeout)
+        coll = self._get_item_collection('pipeline_source_files_url', id, timeout)
+        result = Request.get_data_from_collection(coll)
 
         if result['data']:
             return result['data'][0]
         raise ChrisRequestException(f'Could not find pipeline source file with id {id}')
 
-    def upload_pipeline_source_file(self, type, fname, timeout=30):
+    def upload_pipeline_source_file(self, type, fname, timeout=30,
+                                    chunk_size=1024 * 1024, progress_callback=None):
         """
         Upload a pipeline source file to create a new pipeline. The fname argument
-        can be a string indicating a local file path or a file handler.
+        can be a string indicating a local file path or a file handler. The file is
+        streamed in chunks of at most chunk_size bytes and progress_callback (if given)
+        is called with the number of bytes sent so far and the total after every chunk.
         """
         if not self.pipeline_source_files_url: self.set_urls(timeout)
 
-        if isinstance(fname, str):
-            with open(fname, 'rb') as f:
-                file_contents = f.read()
-        else:
-            file_contents = fname.read()
-
         data = {'type': type}
-
-        req = self._request
-        coll = req.post(self.pipeline_source_files_url, data, file_contents, timeout)
-        result = Request.get_data_from_collection(coll)
-        return result['data'][0]
+        return self._upload(self.pipeline_source_files_url, data, fname, timeout,
+                            chunk_size, progress_callback)
 
     def get_user_files(self, search_params=None, timeout=30):
         """
@@ -512,46 +803,210 @@ class Client(object):
         coll = self._fetch_resource('user_files_url', search_params, timeout)
         return Request.get_data_from_collection(coll)
 
+    def iter_user_files(self, search_params=None, timeout=30, prefetch=False):
+        """
+        Get a generator of all the user files (data descriptors) matching the query
+        search parameters that lazily follows the pages' next links. If prefetch is True
+        then the next page is fetched in the background while the current one is
+        consumed.
+        """
+        url = self._get_resource_url('user_files_url', search_params, timeout)
+        return self._iter_collection_items(url, search_params, timeout, prefetch)
+
     def get_user_file_by_id(self, id, timeout=30):
         """
         Get a user file's data (descriptors) given its ChRIS id.
         """
-        result = self.get_user_files({'id': id}, timeout)
+        coll = self._get_item_collection('user_files_url', id, timeout)
+        result = Request.get_data_from_collection(coll)
 
         if result['data']:
             return result['data'][0]
         raise ChrisRequestException(f'Could not find user file with id {id}')
 
-    def upload_file(self, upload_path, fname, timeout=30):
+    def upload_file(self, upload_path, fname, timeout=30, chunk_size=1024 * 1024,
+                    progress_callback=None):
         """
         Upload a file to the user's space in CUBE. The fname argument can be a string
-        indicating a local file path or a file handler.
+        indicating a local file path or a file handler. The file is streamed in chunks
+        of at most chunk_size bytes so that memory use doesn't depend on the file's
+        size, and progress_callback (if given) is called with the number of bytes sent
+        so far and the total after every chunk.
         """
         if not self.user_files_url: self.set_urls(timeout)
 
-        if isinstance(fname, str):
-            with open(fname, 'rb') as f:
-                file_contents = f.read()
-        else:
-            file_contents = fname.read()
-
         data = {'upload_path': upload_path}
-
-        req = self._request
-        coll = req.post(self.user_files_url, data, file_contents, timeout)
-        result = Request.get_data_from_collection(coll)
-        return result['data'][0]
+        return self._upload(self.user_files_url, data, fname, timeout, chunk_size,
+                            progress_callback)
+
+    def upload_directory(self, local_dir, upload_path, workers=4, skip_existing=True,
+                         create_folders=True, timeout=30):
+        """
+        Upload all the files in a local directory tree to the user's space in CUBE
+        under upload_path with workers concurrent uploads over the pooled connections.
+        If skip_existing is True then files already present remotely with the same size
+        are skipped, so an interrupted upload can be resumed by calling this method
+        again. If create_folders is True then the missing file browser folders are
+        created before uploading. A report dictionary is returned with the lists of
+        uploaded and skipped local paths, a dictionary of failed local paths to error
+        messages, the number of bytes uploaded, the elapsed seconds and the throughput
+        in bytes per second.
+        """
+        upload_path = upload_path.strip('/')
+        start = time.monotonic()
+
+        files = []
+        for root, dirs, fnames in os.walk(local_dir):
+            dirs.sort()
+            for fname in sorted(fnames):
+                local_path = os.path.join(root, fname)
+                rel_path = os.path.relpath(local_path, local_dir).replace(os.sep, '/')
+                files.append((local_path, f'{upload_path}/{rel_path}'))
+
+        report = {'uploaded': [], 'skipped': [], 'failed': {}, 'bytes': 0, 'elapsed': 0,
+                  'throughput': 0}
+
+        pending = files
+        if skip_existing and files:
+            remote_sizes = {f['fname']: f.get('fsize') for f in
+                            self.iter_user_files({'fname': upload_path + '/',
+                                                  'limit': 100}, timeout)}
+            pending = []
+            for local_path, remote_path in files:
+                if remote_sizes.get(remote_path) == os.path.getsize(local_path):
+                    report['skipped'].append(local_path)
+                else:
+                    pending.append((local_path, remote_path))
+
+        if create_folders and pending:
+            folders = set()
+            for _, remote_path in pending:
+                folder = posixpath.dirname(remote_path)
+                while folder and folder not in folders and (
+                        folder == upload_path or folder.startswith(upload_path + '/')):
+                    folders.add(folder)
+                    folder = posixpath.dirname(folder)
+            self._create_missing_folders(sorted(folders), timeout)
+
+        def upload(local_path, remote_path):
+            self.upload_file(remote_path, local_path, timeout)
+            return os.path.getsize(local_path)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(upload, local_path, remote_path): local_path
+                       for local_path, remote_path in pending}
+            for future in as_completed(futures):
+                local_path = futures[future]
+                try:
+                    report['bytes'] += future.result()
+                except (ChrisException, OSError) as e:
+                    report['failed'][local_path] = str(e)
+                else:
+                    report['uploaded'].append(local_path)
+
+        report['elapsed'] = time.monotonic() - start
+        if report['elapsed'] > 0:
+            report['throughput'] = report['bytes'] / report['elapsed']
+        return report
 
     def delete_user_file(self, id, timeout=30):
         """
         Delete an existing user file.
         """
-        search_params = {'id': id}
-        coll = self._fetch_resource('user_files_url', search_params, timeout)
-        file_url = coll.items[0].href
+        file_url = self._get_item_url('user_files_url', id, timeout)
+        if file_url is None:
+            raise ChrisRequestException(f'Could not find user file with id: {id}.')
 
         req = self._request
         req.delete(file_url, timeout)
+        self._forget_item('user_files_url', id)
+
+    def download_file(self, id, local_path, resource='user_files', timeout=30,
+                      chunk_size=1024 * 1024, resume=True, progress_callback=None):
+        """
+        Download a file of a files resource ('user_files', 'pacs_files' or
+        'pipeline_source_files') given its ChRIS id to a local path and return its
+        size. The file is streamed to disk in chunks of at most chunk_size bytes and if
+        resume is True then an interrupted download of the same local path is
+        continued from where it stopped. If progress_callback is given then it is
+        called with the number of bytes received so far and the total after every
+        chunk.
+        """
+        url_attr = resource + '_url'
+        if not hasattr(self, url_attr):
+            raise ValueError(f'Unknown resource: {resource}.')
+
+        file_urls = self._get_item_link_urls(url_attr, id, 'file_resource', timeout)
+        if not file_urls:
+            raise ChrisRequestException(f'Could not find file with id: {id}.')
+        return self._download(file_urls[0], local_path, timeout, chunk_size, resume,
+                              progress_callback)
+
+    def download_files(self, search_params, local_dir, resource='user_files', workers=4,
+                       skip_existing=True, resume=True, timeout=30,
+                       chunk_size=1024 * 1024):
+        """
+        Download all the files of a files resource ('user_files', 'pacs_files' or
+        'pipeline_source_files') matching the query search parameters to a local
+        directory with workers concurrent downloads over the pooled connections. Each
+        file is saved under local_dir at its ChRIS path (fname), e.g. the outputs of a
+        feed are the user files with {'fname': 'home/<user>/feeds/feed_<id>/'}. The
+        downloads start while the following result pages are still being listed. If
+        skip_existing is True then the local files with the same size as the remote
+        ones are skipped and if resume is True then interrupted downloads are continued
+        from where they stopped, so calling this method again completes a previous
+        call. A report dictionary is returned with the lists of downloaded and skipped
+        local paths, a dictionary of failed local paths to error messages, the number
+        of bytes downloaded, the elapsed seconds and the throughput in bytes per second.
+        """
+        url_attr = resource + '_url'
+        if not hasattr(self, url_attr):
+            raise ValueError(f'Unknown resource: {resource}.')
+
+        start = time.monotonic()
+        url = self._get_resource_url(url_attr, search_params, timeout)
+        local_dir = os.path.abspath(local_dir)
+
+        report = {'downloaded': [], 'skipped': [], 'failed': {}, 'bytes': 0,
+                  'elapsed': 0, 'throughput': 0}
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for coll in self._iter_collection_pages(url, search_params, timeout, True):
+                for item in coll.items:
+                    descriptors = Request.get_item_descriptors(item)
+                    local_path = os.path.normpath(
+                        os.path.join(local_dir, *descriptors['fname'].split('/')))
+                    if not local_path.startswith(local_dir + os.sep):
+                        report['failed'][local_path] = 'Invalid file path.'
+                        continue
+
+                    if skip_existing and os.path.isfile(local_path) and (
+                            os.path.getsize(local_path) == descriptors.get('fsize')):
+                        report['skipped'].append(local_path)
+                        continue
+
+                    file_urls = Request.get_link_relation_urls(item, 'file_resource')
+                    if not file_urls:
+                        report['failed'][local_path] = 'File resource not available.'
+                        continue
+                    future = executor.submit(self._download, file_urls[0], local_path,
+                                             timeout, chunk_size, resume)
+                    futures[future] = local_path
+
+            for future in as_completed(futures):
+                local_path = futures[future]
+                try:
+                    report['bytes'] += future.result()
+                except (ChrisException, OSError) as e:
+                    report['failed'][local_path] = str(e)
+                else:
+                    report['downloaded'].append(local_path)
+
+        report['elapsed'] = time.monotonic() - start
+        if report['elapsed'] > 0:
+            report['throughput'] = report['bytes'] / report['elapsed']
+        return report
 
     def get_pacs_files(self, search_params=None, timeout=30):
         """
@@ -561,11 +1016,22 @@ class Client(object):
         coll = self._fetch_resource('pacs_files_url', search_params, timeout)
         return Request.get_data_from_collection(coll)
 
+    def iter_pacs_files(self, search_params=None, timeout=30, prefetch=False):
+        """
+        Get a generator of all the PACS files (data descriptors) matching the query
+        search parameters that lazily follows the pages' next links. If prefetch is True
+        then the next page is fetched in the background while the current one is
+        consumed.
+        """
+        url = self._get_resource_url('pacs_files_url', search_params, timeout)
+        return self._iter_collection_items(url, search_params, timeout, prefetch)
+
     def get_pacs_file_by_id(self, id, timeout=30):
         """
         Get a PACS file's data (descriptors) given its ChRIS id.
         """
-        result = self.get_pacs_files({'id': id}, timeout)
+        coll = self._get_item_collection('pacs_files_url', id, timeout)
+        result = Request.get_data_from_collection(coll)
 
         if result['data']:
             return result['data'][0]
@@ -579,11 +1045,21 @@ class Client(object):
         coll = self._fetch_resource('pacs_url', search_params, timeout)
         return Request.get_data_from_collection(coll)
 
+    def iter_pacs_list(self, search_params=None, timeout=30, prefetch=False):
+        """
+        Get a generator of all the PACS (data descriptors) matching the query search
+        parameters that lazily follows the pages' next links. If prefetch is True then
+        the next page is fetched in the background while the current one is consumed.
+        """
+        url = self._get_resource_url('pacs_url', search_params, timeout)
+        return self._iter_collection_items(url, search_params, timeout, prefetch)
+
     def get_pacs_by_id(self, id, timeout=30):
         """
         Get a PACS's data (descriptors) given its ChRIS id.
         """
-        result = self.get_pacs_list({'id': id}, timeout)
+        coll = self._get_item_collection('pacs_url', id, timeout)
+        result = Request.get_data_from_collection(coll)
 
         if result['data']:
             return result['data'][0]
@@ -597,11 +1073,22 @@ class Client(object):
         coll = self._fetch_resource('pacs_queries_url', search_params, timeout)
         return Request.get_data_from_collection(coll)
 
+    def iter_pacs_queries(self, search_params=None, timeout=30, prefetch=False):
+        """
+        Get a generator of all the PACS queries (data descriptors) matching the query
+        search parameters that lazily follows the pages' next links. If prefetch is True
+        then the next page is fetched in the background while the current one is
+        consumed.
+        """
+        url = self._get_resource_url('pacs_queries_url', search_params, timeout)
+        return self._iter_collection_items(url, search_params, timeout, prefetch)
+
     def get_pacs_query_by_id(self, id, timeout=30):
         """
         Get a PACS query's data (descriptors) given its ChRIS id.
         """
-        result = self.get_pacs_queries({'id': id}, timeout)
+        coll = self._get_item_collection('pacs_queries_url', id, timeout)
+        result = Request.get_data_from_collection(coll)
 
         if result['data']:
             return result['data'][0]
@@ -611,11 +1098,13 @@ class Client(object):
         """
         Create a PACS query given the corresponding PACS id and data dictionary.
         """
-        coll = self._fetch_resource('pacs_url', {'id': pacs_id}, timeout)
-        if len(coll.items) == 0:
+        queries_links = self._get_item_link_urls('pacs_url', pacs_id,
+                                                 'query_list', timeout)
+        if queries_links is None:
             raise ChrisRequestException(f'Could not find pacs with id: {pacs_id}.')
-
-        queries_links = Request.get_link_relation_urls(coll.items[0], 'query_list')
+        if not queries_links:
+            raise ChrisRequestException(f'Could not find query_list link for pacs '
+                                        f'with id: {pacs_id}.')
 
         req = self._request
         coll = req.post(queries_links[0], data, None, timeout)
@@ -626,12 +1115,14 @@ class Client(object):
         """
         Create a PACS retrieve given the corresponding PACS query id.
         """
-        coll = self._fetch_resource('pacs_queries_url', {'id': pacs_query_id}, timeout)
-        if len(coll.items) == 0:
+        retrieves_links = self._get_item_link_urls('pacs_queries_url', pacs_query_id,
+                                                   'retrieve_list', timeout)
+        if retrieves_links is None:
             raise ChrisRequestException(f'Could not find PACS query with id: '
                                         f'{pacs_query_id}.')
-
-        retrieves_links = Request.get_link_relation_urls(coll.items[0], 'retrieve_list')
+        if not retrieves_links:
+            raise ChrisRequestException(f'Could not find retrieve_list link for PACS '
+                                        f'query with id: {pacs_query_id}.')
 
         req = self._request
         coll = req.post(retrieves_links[0], {}, None, timeout)
@@ -645,7 +1136,7 @@ class Client(object):
         if not self.pacs_series_url: self.set_urls(timeout)
 
         req = self._request
-        coll = req.post(self.pacs_series_url, data, None, timeout)
+        coll = self._send_to_resource(req.post, self.pacs_series_url, data, None, timeout)
         result = Request.get_data_from_collection(coll)
         return result['data'][0]
 
@@ -657,11 +1148,22 @@ class Client(object):
         coll = self._fetch_resource('pacs_series_url', search_params, timeout)
         return Request.get_data_from_collection(coll)
 
+    def iter_pacs_series_list(self, search_params=None, timeout=30, prefetch=False):
+        """
+        Get a generator of all the PACS series (data descriptors) matching the query
+        search parameters that lazily follows the pages' next links. If prefetch is True
+        then the next page is fetched in the background while the current one is
+        consumed.
+        """
+        url = self._get_resource_url('pacs_series_url', search_params, timeout)
+        return self._iter_collection_items(url, search_params, timeout, prefetch)
+
     def get_pacs_series_by_id(self, id, timeout=30):
         """
         Get a PACS series' data (descriptors) given its ChRIS id.
         """
-        result = self.get_pacs_series_list({'id': id}, timeout)
+        coll = self._get_item_collection('pacs_series_url', id, timeout)
+        result = Request.get_data_from_collection(coll)
 
         if result['data']:
             return result['data'][0]
@@ -680,7 +1182,8 @@ class Client(object):
         """
         Get a file browser folder' s data (descriptors) given its ChRIS id.
         """
-        result = self.get_file_browser_folders({'id': id}, timeout)
+        coll = self._get_item_collection('file_browser_url', id, timeout)
+        result = Request.get_data_from_collection(coll)
 
         if result['data']:
             return result['data'][0]
@@ -705,10 +1208,131 @@ class Client(object):
         data = {'path': path}
 
         req = self._request
-        coll = req.post(self.file_browser_url, data, None, timeout)
+        coll = self._send_to_resource(req.post, self.file_browser_url, data, None, timeout)
         result = Request.get_data_from_collection(coll)
         return result['data'][0]
 
+    def sync_folder(self, path, local_dir, workers=4, store=None, prune=True, timeout=30,
+                    chunk_size=1024 * 1024, copy=False):
+        """
+        Incrementally mirror the files under a ChRIS folder path (e.g. a feed's folder
+        or a PACS series' folder under 'SERVICES/PACS') into a local directory with
+        workers concurrent downloads. A manifest of the mirrored files' ids, sizes,
+        creation dates and content digests is kept in the local directory so that only
+        new or changed files are transferred. The files' contents are kept in the
+        local content-addressed store (an ObjectStore, by default in the user's cache
+        directory) and hard-linked into the local directory, so identical files are
+        stored once. Hard-linked files share the store's read-only objects and must not
+        be edited in place. If copy is True then the files are copied instead (as
+        reflinks when the file system supports them) and can be edited. If prune is
+        True then the local files whose remote files no longer exist are removed. A
+        report dictionary is returned with the lists of downloaded, linked (restored
+        from the store without a transfer), unchanged and removed local paths, a
+        dictionary of failed local paths to error messages, the number of bytes
+        downloaded, the elapsed seconds and the throughput in bytes per second.
+        """
+        start = time.monotonic()
+        path = path.strip('/')
+        self.get_file_browser_folder_by_path(path, timeout)  # the folder must exist
+
+        url_attr = 'pacs_files_url' if path.startswith('SERVICES/PACS') else (
+            'user_files_url')
+        url = self._get_resource_url(url_attr, {'fname': path + '/'}, timeout)
+        local_dir = os.path.abspath(local_dir)
+        store = store if store is not None else ObjectStore()
+        restore = store.copy if copy else store.link
+        manifest = Manifest(os.path.join(local_dir, '.chrisclient-manifest.json'))
+
+        report = {'downloaded': [], 'linked': [], 'unchanged': [], 'removed': [],
+                  'failed': {}, 'bytes': 0, 'elapsed': 0, 'throughput': 0}
+
+        def fetch(file_url, key):
+            incoming_path = store.incoming_path(key)
+            self._download(file_url, incoming_path, timeout, chunk_size)
+            return store.add(incoming_path, chunk_size)
+
+        seen = set()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {}
+                for coll in self._iter_collection_pages(url, {'fname': path + '/'},
+                                                        timeout, True):
+                    for item in coll.items:
+                        descriptors = Request.get_item_descriptors(item)
+                        fname = descriptors['fname']
+                        rel_path = fname[len(path) + 1:]
+                        local_path = os.path.normpath(
+                            os.path.join(local_dir, *rel_path.split('/')))
+                        if not local_path.startswith(local_dir + os.sep):
+                            report['failed'][local_path] = 'Invalid file path.'
+                            continue
+                        seen.add(fname)
+
+                        entry = manifest.entries.get(fname)
+                        if manifest.is_current(fname, descriptors) and store.has(
+                                entry['sha256']):
+                            if os.path.isfile(local_path) and (
+                                    os.path.getsize(local_path) == entry['fsize']):
+                                report['unchanged'].append(local_path)
+                            else:
+                                restore(entry['sha256'], local_path)
+                                report['linked'].append(local_path)
+                            continue
+
+                        file_urls = Request.get_link_relation_urls(item,
+                                                                   'file_resource')
+                        if not file_urls:
+                            report['failed'][local_path] = 'File resource not available.'
+                            continue
+                        key = '|'.join(str(descriptors.get(name)) for name in
+                                       ('fname', 'id', 'fsize', 'creation_date'))
+                        future = executor.submit(fetch, file_urls[0], key)
+                        futures[future] = (fname, rel_path, local_path, descriptors)
+
+                for future in as_completed(futures):
+                    fname, rel_path, local_path, descriptors = futures[future]
+                    try:
+                        digest = future.result()
+                        restore(digest, local_path)
+                    except (ChrisException, OSError) as e:
+                        report['failed'][local_path] = str(e)
+                        continue
+                    manifest.entries[fname] = {
+                        'id': descriptors.get('id'), 'fsize': descriptors.get('fsize'),
+                        'creation_date': descriptors.get('creation_date'),
+                        'sha256': digest, 'local_path': rel_path}
+                    report['downloaded'].append(local_path)
+                    report['bytes'] += os.path.getsize(local_path)
+
+            if prune:
+                for fname in [f for f in manifest.entries if f.startswith(path + '/')
+                              and f not in seen]:
+                    entry = manifest.entries.pop(fname)
+                    local_path = os.path.join(local_dir,
+                                              *entry['local_path'].split('/'))
+                    if os.path.isfile(local_path):
+                        os.remove(local_path)
+                    report['removed'].append(local_path)
+        finally:
+            manifest.save()
+
+        report['elapsed'] = time.monotonic() - start
+        if report['elapsed'] > 0:
+            report['throughput'] = report['bytes'] / report['elapsed']
+        return report
+
+    def create_download_token(self, timeout=30):
+        """
+        Create a short-lived download token that authorizes file downloads.
+        """
+        if not self.download_tokens_url: self.set_urls(timeout)
+
+        req = self._request
+        coll = self._send_to_resource(req.post, self.download_tokens_url, {}, None,
+                                      timeout)
+        result = Request.get_data_from_collection(coll)
+        return result['data'][0]['token']
+
     def get_groups(self, search_params=None, timeout=30):
         """
         Get a paginated list of groups (data descriptors) given query search
@@ -717,11 +1341,21 @@ class Client(object):
         coll = self._fetch_resource('groups_url', search_params, timeout)
         return Request.get_data_from_collection(coll)
 
+    def iter_groups(self, search_params=None, timeout=30, prefetch=False):
+        """
+        Get a generator of all the groups (data descriptors) matching the query search
+        parameters that lazily follows the pages' next links. If prefetch is True then
+        the next page is fetched in the background while the current one is consumed.
+        """
+        url = self._get_resource_url('groups_url', search_params, timeout)
+        return self._iter_collection_items(url, search_params, timeout, prefetch)
+
     def get_group_by_id(self, id, timeout=30):
         """
         Get a group's data (descriptors) given its ChRIS id.
         """
-        result = self.get_groups({'id': id}, timeout)
+        coll = self._get_item_collection('groups_url', id, timeout)
+        result = Request.get_data_from_collection(coll)
 
         if result['data']:
             return result['data'][0]
@@ -734,7 +1368,7 @@ class Client(object):
         if not self.groups_url: self.set_urls(timeout)
 
         req = self._request
-        coll = req.post(self.groups_url, data, None, timeout)
+        coll = self._send_to_resource(req.post, self.groups_url, data, None, timeout)
         result = Request.get_data_from_collection(coll)
         return result['data'][0]
 
@@ -769,11 +1403,176 @@ class Client(object):
         result = req.post(auth_url, data, None, timeout)
         return result['token']
 
+    def _create_missing_folders(self, paths, timeout=30):
+        """
+        Internal method to create the file browser folders in a list of paths (sorted
+        so that parents come first) that don't exist yet.
+        """
+        for path in paths:
+            if not self.get_file_browser_folders({'path': path}, timeout)['data']:
+                try:
+                    self.create_file_browser_folder(path, timeout)
+                except ChrisRequestException:
+                    pass  # a concurrent client may have just created it
+
+    def _upload(self, url, data, fname, timeout=30, chunk_size=1024 * 1024,
+                progress_callback=None):
+        """
+        Internal method to stream a file given a local file path or a file handler in a
+        multipart POST request and return the created item's data (descriptors).
+        """
+        req = self._request
+
+        if isinstance(fname, str):
+            def post(url):
+                with open(fname, 'rb') as f:
+                    return req.post(url, data, f, timeout, chunk_size, progress_callback)
+        elif hasattr(fname, 'seek') and fname.seekable():
+            position = fname.tell()
+
+            def post(url):
+                fname.seek(position)
+                return req.post(url, data, fname, timeout, chunk_size, progress_callback)
+        else:
+            # the length of a non-seekable stream isn't known in advance
+            contents = fname.read()
+
+            def post(url):
+                return req.post(url, data, contents, timeout)
+
+        coll = self._send_to_resource(post, url)
+        result = Request.get_data_from_collection(coll)
+        return result['data'][0]
+
+    def _download(self, file_url, local_path, timeout=30, chunk_size=1024 * 1024,
+                  resume=True, progress_callback=None):
+        """
+        Internal method to stream a file's url to a local path and return its size. A
+        download token is used as the url's query parameter when CUBE provides them.
+        The same token is shared by the downloads made within download_token_max_age
+        seconds and a new one is created (and the download tried again) when CUBE
+        rejects it.
+        """
+        req = self._request
+        if not self.download_tokens_url:
+            return req.download(file_url, local_path, None, timeout, chunk_size, resume,
+                                progress_callback)
+
+        token = self._get_download_token(timeout)
+        try:
+            return req.download(file_url, local_path, {'download_token': token},
+                                timeout, chunk_size, resume, progress_callback)
+        except ChrisForbiddenException:
+            token = self._get_download_token(timeout, rejected=token)
+            return req.download(file_url, local_path, {'download_token': token},
+                                timeout, chunk_size, resume, progress_callback)
+
+    def _get_download_token(self, timeout=30, rejected=None):
+        """
+        Internal method to get the shared download token, creating a new one when there
+        is none, it's older than download_token_max_age seconds or it's the rejected
+        one. The lock makes concurrent downloads wait for a single new token.
+        """
+        with self._download_token_lock:
+            entry = self._download_token
+            if entry is None or entry[0] == rejected or (
+                    time.monotonic() - entry[1] >= self.download_token_max_age):
+                entry = (self.create_download_token(timeout), time.monotonic())
+                self._download_token = entry
+            return entry[0]
+
     def _fetch_resource(self, url_attr, search_params=None, timeout=30):
         """
         Internal method to fetch the collection object of a resource given query search
         parameters. If no search parameters is given then get the default first page.
         """
+        url = self._get_resource_url(url_attr, search_params, timeout)
+
+        req = self._request
+        coll = self._send_to_resource(req.get, url, search_params or None, timeout)
+        self._remember_items(url_attr, coll)
+        return coll
+
+    def _get_item_collection(self, url_attr, id, timeout=30):
+        """
+        Internal method to fetch the collection object with the item of a resource
+        given its ChRIS id. The item's own url is used when it has already been seen,
+        otherwise the resource's search url.
+        """
+        url = self._get_known_item_url(url_attr, id)
+        if url:
+            try:
+                coll = self._request.get(url, None, timeout)
+            except ChrisNotFoundException:
+                self._forget_item(url_attr, id)
+            else:
+                self._remember_items(url_attr, coll)
+                return coll
+        return self._fetch_resource(url_attr, {'id': id}, timeout)
+
+    def _get_item_url(self, url_attr, id, timeout=30):
+        """
+        Internal method to get the url of the item of a resource given its ChRIS id or
+        None if the item doesn't exist. No request is made if the item has already been
+        seen.
+        """
+        url = self._get_known_item_url(url_attr, id)
+        if url:
+            return url
+
+        coll = self._fetch_resource(url_attr, {'id': id}, timeout)
+        return coll.items[0].href if coll.items else None
+
+    def _get_item_link_urls(self, url_attr, id, relation_name, timeout=30):
+        """
+        Internal method to get the list of urls for a link relation of the item of a
+        resource given its ChRIS id or None if the item doesn't exist. No request is
+        made if the item has already been seen.
+        """
+        links = self._get_known_item_link_urls(url_attr, id, relation_name)
+        if links is not None:
+            return links
+
+        coll = self._fetch_resource(url_attr, {'id': id}, timeout)
+        if len(coll.items) == 0:
+            return None
+        return Request.get_link_relation_urls(coll.items[0], relation_name)
+
+    def _send_to_resource(self, send, url, *args):
+        """
+        Internal method to call a request method (e.g. self._request.post) with the url
+        of a high level API resource (or a url under it) and the rest of its arguments.
+        If the request is not found and the urls were taken from the url cache then
+        they are stale (e.g. CUBE was redeployed), so they are discovered again from
+        the API root and the request is sent once more to the rediscovered url.
+        """
+        try:
+            return send(url, *args)
+        except ChrisNotFoundException:
+            new_url = self._rediscover_url(url)
+            if new_url is None:
+                raise
+            return send(new_url, *args)
+
+    def _rediscover_url(self, url, timeout=30):
+        """
+        Internal method to get the url under the rediscovered urls of the high level API
+        resources that corresponds to a url under the cached ones, or None if the urls
+        weren't taken from the url cache or the url didn't change. The urls are
+        discovered again only once even if many requests fail at the same time.
+        """
+        with self._rediscover_lock:
+            if self._urls_from_cache:
+                stale_urls = self._drop_urls()
+                self.set_urls(timeout)
+                self._set_rediscovered_urls(stale_urls)
+            return self._get_rediscovered_url(url)
+
+    def _get_resource_url(self, url_attr, search_params=None, timeout=30):
+        """
+        Internal method to get the url of a resource (its search url if search
+        parameters are given).
+        """
         url = getattr(self, url_attr)
         if not url: self.set_urls(timeout)
 
@@ -781,10 +1580,141 @@ class Client(object):
         if not url:
             raise ChrisRequestException('Resource not available to the user.')
 
+        if search_params:
+            return url + self.query_url_sufix
+        return url
+
+    def _fetch_all_pages(self, url, params=None, workers=4, stream=False, timeout=30):
+        """
+        Internal method to get all the items (data descriptors) of a paginated list url
+        by fetching its pages concurrently (see fetch_all).
+        """
+        params = dict(params or {})
+        offset = int(params.get('offset', 0))
+
         req = self._request
+        coll = self._send_to_resource(req.get, url, params or None, timeout)
+        first_page = Request.get_data_from_collection(coll)
+
+        # the page size is the size of the first page, as the server may cap the
+        # requested limit (or use its default page size if no limit is requested)
+        limit = len(first_page['data']) or int(params.get('limit') or 1)
+        offsets = range(0)
+        if first_page['hasNextPage']:
+            offsets = range(offset + limit, first_page['total'], limit)
+
+        def fetch_page(page_offset):
+            page_params = dict(params, limit=limit, offset=page_offset)
+            return Request.get_data_from_collection(
+                self._send_to_resource(req.get, url, page_params, timeout))
+
+        if stream:
+            return self._stream_pages(first_page['data'], fetch_page, offsets, workers)
+
+        items = list(first_page['data'])
+        if offsets:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for page in executor.map(fetch_page, offsets):
+                    items.extend(page['data'])
+        return items
 
-        if search_params:
-            collection = req.get(url + self.query_url_sufix, search_params, timeout)
-        else:
-            collection = req.get(url, None, timeout)
-        return collection
+    @staticmethod
+    def _make_throttle(rate=None):
+        """
+        Internal method to make a thread-safe function that blocks its callers so that
+        it returns at most rate times per second (without any limit if rate is None).
+        """
+        lock = threading.Lock()
+        next_time = [time.monotonic()]
+
+        def throttle():
+            if not rate:
+                return
+            with lock:
+                now = time.monotonic()
+                wait = next_time[0] - now
+                next_time[0] = max(now, next_time[0]) + 1.0 / rate
+            if wait > 0:
+                time.sleep(wait)
+        return throttle
+
+    @staticmethod
+    def _stream_pages(first_items, fetch_page, offsets, workers):
+        """
+        Internal generator to yield the items of the first page and then the items of
+        the pages at the given offsets in order. At most workers pages are fetched
+        ahead of the one being consumed so memory doesn't grow with the listing.
+        """
+        yield from first_items
+
+        if offsets:
+            executor = ThreadPoolExecutor(max_workers=workers)
+            window = deque()
+            offsets = iter(offsets)
+            try:
+                for offset in islice(offsets, workers):
+                    window.append(executor.submit(fetch_page, offset))
+                while window:
+                    page = window.popleft().result()
+                    for offset in islice(offsets, 1):
+                        window.append(executor.submit(fetch_page, offset))
+                    yield from page['data']
+            finally:
+                for future in window:
+                    future.cancel()
+                executor.shutdown(wait=False)
+
+    def _iter_collection_items(self, url, params=None, timeout=30, prefetch=False):
+        """
+        Internal generator to lazily yield the items (data descriptors) of a paginated
+        collection by following the next links of its pages. Only the current page
+        (and the next one when prefetching) is kept in memory.
+        """
+        for coll in self._iter_collection_pages(url, params, timeout, prefetch):
+            for item in coll.items:
+                yield Request.get_item_descriptors(item)
+
+    def _iter_result_pages(self, url, params=None, timeout=30, prefetch=False,
+                           url_attr=None):
+        """
+        Internal generator to lazily yield the result dictionaries of the pages of a
+        paginated collection (see iter_pages). The items are remembered as items of
+        the url_attr resource when it is given.
+        """
+        for coll in self._iter_collection_pages(url, params, timeout, prefetch):
+            if url_attr is not None:
+                self._remember_items(url_attr, coll)
+            result = Request.get_data_from_collection(coll)
+            result['links'] = []
+            for item in coll.items:
+                links = {}
+                for link in item.links:
+                    links.setdefault(link.rel, []).append(link.href)
+                result['links'].append(links)
+            yield result
+
+    def _iter_collection_pages(self, url, params=None, timeout=30, prefetch=False):
+        """
+        Internal generator to lazily yield the collection objects of the pages of a
+        paginated collection by following their next links.
+        """
+        req = self._request
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            coll = self._send_to_resource(req.get, url, params or None, timeout)
+            while True:
+                next_urls = Request.get_link_relation_urls(coll, 'next')
+                future = None
+                if next_urls and executor is not None:
+                    future = executor.submit(req.get, next_urls[0], None, timeout)
+
+                yield coll
+
+                if not next_urls:
+                    break
+                # next links already carry the query parameters of the search
+                coll = future.result() if future else req.get(next_urls[0], None,
+                                                               timeout)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
@@ -0,0 +1,91 @@
+"""
+Fast Collection+JSON decoder module.
+The response body is parsed once (with orjson when it is installed) and walked once into
+lightweight collection and item objects whose descriptors are already plain dictionaries.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .exceptions import ChrisRequestException
+
+
+class Link(object):
+    """
+    A Collection+JSON link.
+    """
+    __slots__ = ('rel', 'href')
+
+    def __init__(self, rel, href):
+        self.rel = rel
+        self.href = href
+
+
+class CollectionItem(object):
+    """
+    A Collection+JSON item whose data (descriptors) is a dictionary.
+    """
+    __slots__ = ('href', 'data', 'links')
+
+    def __init__(self, href, data, links):
+        self.href = href
+        self.data = data
+        self.links = links
+
+
+class CollectionDocument(object):
+    """
+    A decoded Collection+JSON document.
+    """
+    __slots__ = ('href', 'items', 'links', 'total')
+
+    def __init__(self, href, items, links, total=0):
+        self.href = href
+        self.items = items
+        self.links = links
+        self.total = total
+
+
+def loads(body):
+    """
+    Parse a JSON document given as bytes or str, using orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def decode_collection(body):
+    """
+    Decode a Collection+JSON response body into a CollectionDocument object in a single
+    pass. Raise ChrisRequestException if the document contains an error object.
+    """
+    coll = _get_collection(loads(body))
+
+    items = [CollectionItem(item.get('href'),
+                            {d['name']: d.get('value') for d in item.get('data', ())},
+                            [Link(link['rel'], link['href'])
+                             for link in item.get('links', ())])
+             for item in coll.get('items', ())]
+    links = [Link(link['rel'], link['href']) for link in coll.get('links', ())]
+    return CollectionDocument(coll.get('href'), items, links, coll.get('total', 0))
+
+
+def _get_collection(content):
+    """
+    Internal function to get the collection object of a parsed Collection+JSON
+    document.
+    """
+    try:
+        coll = content['collection']
+    except (KeyError, TypeError):
+        raise ChrisRequestException(f'Invalid Collection+JSON document: {content}')
+
+    error = coll.get('error')
+    if error:
+        raise ChrisRequestException(error.get('message') or error.get('title'))
+    return coll
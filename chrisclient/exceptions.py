@@ -8,5 +8,13 @@ class ChrisException(Exception): pass
 class ChrisRequestException(ChrisException): pass
 
 
+class ChrisNotFoundException(ChrisRequestException): pass
+
+
+class ChrisForbiddenException(ChrisRequestException): pass
+
+
 class ChrisErrorException(ChrisException): pass
 
+
+class ChrisCircuitOpenException(ChrisRequestException): pass
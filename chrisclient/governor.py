@@ -0,0 +1,133 @@
+"""
+ChRIS request rate and concurrency governor module.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+
+
+class TokenBucket(object):
+    """
+    Thread-safe token bucket that lets through at most rate acquisitions per second
+    on average with bursts of at most burst acquisitions (rate by default).
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take a token, blocking until one is available.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst,
+                                   self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Limit(object):
+    """
+    Rate (requests per second) and concurrency (requests in flight) limits of a class
+    of requests. Either limit can be None for no limit.
+    """
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None):
+        self.rate = rate
+        self.max_in_flight = max_in_flight
+        self.waiting = 0
+        self.in_flight = 0
+        self._bucket = TokenBucket(rate, burst) if rate else None
+        self._semaphore = threading.BoundedSemaphore(max_in_flight) \
+            if max_in_flight else None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self):
+        """
+        Context manager that blocks until a request of this class can be sent and
+        holds one of the in flight slots until it exits.
+        """
+        with self._lock:
+            self.waiting += 1
+        try:
+            if self._semaphore is not None:
+                self._semaphore.acquire()
+            try:
+                if self._bucket is not None:
+                    self._bucket.acquire()
+            except BaseException:
+                if self._semaphore is not None:
+                    self._semaphore.release()
+                raise
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            if self._semaphore is not None:
+                self._semaphore.release()
+
+
+class Governor(object):
+    """
+    Thread-safe client-side governor of the requests sent to CUBE. Requests are
+    classified as reads (GET, HEAD, OPTIONS), uploads (multipart requests with a file)
+    or writes (any other request) and each class has its own Limit. A governor can be
+    shared by the Request objects of many clients in a process so that their combined
+    traffic stays within the limits.
+    """
+
+    def __init__(self, read=None, write=None, upload=None):
+        self.limits = {'read': read or Limit(), 'write': write or Limit(),
+                       'upload': upload or Limit()}
+
+    def slot(self, request_class):
+        """
+        Get a context manager that holds a slot of a request class (see Limit.slot).
+        """
+        return self.limits[request_class].slot()
+
+    def queue_depth(self, request_class=None):
+        """
+        Get the number of requests waiting for a slot of a request class (of any class
+        if request_class is None).
+        """
+        if request_class is not None:
+            return self.limits[request_class].waiting
+        return sum(limit.waiting for limit in self.limits.values())
+
+    def stats(self):
+        """
+        Get a dictionary of each request class to its limits, number of waiting
+        requests and number of requests in flight.
+        """
+        return {name: {'rate': limit.rate, 'max_in_flight': limit.max_in_flight,
+                       'waiting': limit.waiting, 'in_flight': limit.in_flight}
+                for name, limit in self.limits.items()}
+
+    @staticmethod
+    def classify(method, upload=False):
+        """
+        Static method to get the class of a request given its method and whether it
+        uploads a file.
+        """
+        if method in ('GET', 'HEAD', 'OPTIONS'):
+            return 'read'
+        return 'upload' if upload else 'write'
@@ -0,0 +1,147 @@
+"""
+ChRIS plugin instance graph module.
+"""
+
+from collections import Counter, deque
+from datetime import datetime
+
+from .watch import StatusTracker
+
+
+class Node(object):
+    """
+    A plugin instance in a graph with links to its parent and children nodes.
+    """
+    __slots__ = ('id', 'data', 'parent', 'children', 'depth')
+
+    def __init__(self, data):
+        self.id = data['id']
+        self.data = data
+        self.parent = None
+        self.children = []
+        self.depth = 0
+
+    def __repr__(self):
+        return f"Node(id={self.id}, status={self.data.get('status')!r})"
+
+    def duration(self):
+        """
+        Get the number of seconds between the plugin instance's start and end dates
+        (0 if they are not available).
+        """
+        start = _parse_date(self.data.get('start_date'))
+        end = _parse_date(self.data.get('end_date'))
+        if start is None or end is None:
+            return 0
+        return max((end - start).total_seconds(), 0)
+
+
+class FeedGraph(object):
+    """
+    Indexed DAG of the plugin instances (data descriptors) of a feed built locally from
+    a single bulk fetch. Each plugin instance is a node linked to its previous plugin
+    instance (its parent) and the plugin instances that ran on its outputs (its
+    children). Plugin instances whose previous plugin instance is not in the graph are
+    roots.
+    """
+
+    def __init__(self, plg_insts):
+        self.nodes = {plg_inst['id']: Node(plg_inst) for plg_inst in plg_insts}
+        self.roots = []
+
+        for node in sorted(self.nodes.values(), key=lambda n: n.id):
+            parent = self.nodes.get(node.data.get('previous_id'))
+            if parent is None:
+                self.roots.append(node)
+            else:
+                node.parent = parent
+                parent.children.append(node)
+
+        for node in self:
+            if node.parent is not None:
+                node.depth = node.parent.depth + 1
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, id):
+        return id in self.nodes
+
+    def __getitem__(self, id):
+        return self.nodes[id]
+
+    def __iter__(self):
+        """
+        Iterate over the nodes in topological order (every node comes after its
+        parent) level by level from the roots.
+        """
+        queue = deque(self.roots)
+        while queue:
+            node = queue.popleft()
+            yield node
+            queue.extend(node.children)
+
+    def leaves(self):
+        """
+        Get the list of nodes without children.
+        """
+        return [node for node in self if not node.children]
+
+    def depth(self):
+        """
+        Get the number of levels of the graph.
+        """
+        return max((node.depth + 1 for node in self.nodes.values()), default=0)
+
+    def critical_path(self):
+        """
+        Get the list of nodes from a root to a leaf with the longest total run time
+        (the longest chain if the run times are not available).
+        """
+        best = {}  # id -> (total duration, number of nodes) of the best path to a node
+        for node in self:
+            previous = best[node.parent.id] if node.parent is not None else (0, 0)
+            best[node.id] = (previous[0] + node.duration(), previous[1] + 1)
+
+        if not best:
+            return []
+        node = self.nodes[max(best, key=best.get)]
+        path = []
+        while node is not None:
+            path.append(node)
+            node = node.parent
+        return path[::-1]
+
+    def status_summary(self):
+        """
+        Get a dictionary of plugin instance statuses to the number of nodes with them.
+        """
+        return dict(Counter(node.data.get('status') for node in self.nodes.values()))
+
+    def is_finished(self):
+        """
+        Whether every plugin instance in the graph has finished running.
+        """
+        return all(StatusTracker.is_terminal(node.data) for node in self.nodes.values())
+
+
+class Workflow(FeedGraph):
+    """
+    Indexed DAG of the plugin instances created by a workflow.
+    """
+
+    def __init__(self, workflow_id, plg_insts):
+        self.workflow_id = workflow_id
+        super().__init__(plg_insts)
+
+
+def _parse_date(value):
+    """
+    Parse a CUBE ISO 8601 date string or return None if it can't be parsed.
+    """
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
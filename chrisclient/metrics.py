@@ -0,0 +1,158 @@
+"""
+ChRIS request metrics and tracing module.
+"""
+
+import bisect
+import threading
+from collections import Counter
+from urllib.parse import urlsplit
+
+
+class ResourceStats(object):
+    """
+    Counters and latency histogram of the requests to a resource.
+    """
+    __slots__ = ('requests', 'errors', 'retries', 'bytes_sent', 'bytes_received',
+                 'statuses', 'methods', 'total_time', 'max_time', 'buckets')
+
+    def __init__(self, n_buckets):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.statuses = Counter()
+        self.methods = Counter()
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.buckets = [0] * n_buckets
+
+
+class RequestMetrics(object):
+    """
+    Thread-safe per resource counters (requests, errors, retries, bytes, status codes
+    and methods) and latency histograms of the HTTP requests sent to CUBE. Every try of
+    a retried request is counted as a request. A resource is named after the path of
+    its url without the API prefix, the ids, the 'search' suffix and the file names,
+    e.g. 'plugins', 'plugins/instances' or 'pacs/files'. The histograms' buckets are
+    the upper bounds (in seconds) of the latencies they count plus a last unbounded
+    bucket. A RequestMetrics object is a Request hook and can be shared across
+    clients.
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._resources = {}
+        self._lock = threading.Lock()
+
+    def post_request(self, info):
+        """
+        Post request hook that records a finished request given its info dictionary.
+        """
+        with self._lock:
+            stats = self._resources.get(info['resource'])
+            if stats is None:
+                stats = self._resources[info['resource']] = ResourceStats(
+                    len(self.buckets) + 1)
+            elapsed = info['elapsed']
+            stats.requests += 1
+            stats.methods[info['method']] += 1
+            if info['attempt']:
+                stats.retries += 1
+            if info['error'] is not None or (info['status'] or 0) >= 400:
+                stats.errors += 1
+            if info['status'] is not None:
+                stats.statuses[info['status']] += 1
+            stats.bytes_sent += info['bytes_sent']
+            stats.bytes_received += info['bytes_received']
+            stats.total_time += elapsed
+            stats.max_time = max(stats.max_time, elapsed)
+            stats.buckets[bisect.bisect_left(self.buckets, elapsed)] += 1
+
+    def snapshot(self):
+        """
+        Get a dictionary of each resource to a dictionary of its counters, mean and max
+        latency and latency histogram.
+        """
+        with self._lock:
+            return {resource: {
+                'requests': stats.requests,
+                'errors': stats.errors,
+                'retries': stats.retries,
+                'bytes_sent': stats.bytes_sent,
+                'bytes_received': stats.bytes_received,
+                'statuses': dict(stats.statuses),
+                'methods': dict(stats.methods),
+                'mean_time': stats.total_time / stats.requests,
+                'max_time': stats.max_time,
+                'histogram': dict(zip(self.buckets + (float('inf'),), stats.buckets))}
+                for resource, stats in self._resources.items()}
+
+    def reset(self):
+        """
+        Forget all the recorded requests.
+        """
+        with self._lock:
+            self._resources = {}
+
+    @staticmethod
+    def resource_name(url):
+        """
+        Static method to get the name of the resource of a url.
+        """
+        path = urlsplit(url).path
+        segments = path.strip('/').split('/')
+        if not path.endswith('/'):
+            segments = segments[:-1]  # a file name
+        if segments[:2] == ['api', 'v1']:
+            segments = segments[2:]
+        names = [s for s in segments if s and not s.isdigit() and s != 'search']
+        return '/'.join(names) or 'root'
+
+
+class OpenTelemetryHooks(object):
+    """
+    Pre and post request hooks that emit an OpenTelemetry client span for every
+    request and propagate the trace context in the request headers. The
+    opentelemetry-api package is an optional dependency only imported here.
+
+        hooks = OpenTelemetryHooks()
+        client = Client(url, username, password, hooks=[hooks])
+    """
+
+    def __init__(self, tracer=None):
+        from opentelemetry import trace, propagate
+
+        self._trace = trace
+        self._propagate = propagate
+        self.tracer = tracer or trace.get_tracer('chrisclient')
+
+    def pre_request(self, info):
+        """
+        Start the request's span and inject its context in the request headers.
+        """
+        span = self.tracer.start_span(
+            f"{info['method']} {info['resource']}", kind=self._trace.SpanKind.CLIENT,
+            attributes={'http.method': info['method'], 'http.url': info['url'],
+                        'chrisclient.resource': info['resource'],
+                        'chrisclient.attempt': info['attempt']})
+        info['span'] = span
+        self._propagate.inject(info['headers'],
+                               context=self._trace.set_span_in_context(span))
+
+    def post_request(self, info):
+        """
+        End the request's span with its status.
+        """
+        span = info.get('span')
+        if span is None:
+            return
+        if info['status'] is not None:
+            span.set_attribute('http.status_code', info['status'])
+        if info['error'] is not None:
+            span.record_exception(info['error'])
+        if info['error'] is not None or (info['status'] or 0) >= 500:
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR))
+        span.end()
@@ -0,0 +1,181 @@
+"""
+ChRIS local file mirror module.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Linux ioctl that clones a file's content into another one on the same copy-on-write
+# file system (e.g. Btrfs or XFS)
+FICLONE = 0x40049409
+
+
+class ObjectStore(object):
+    """
+    Local content-addressed store of downloaded files. Each distinct content is stored
+    once under its sha256 digest, so identical files shared across feeds or PACS series
+    take disk space only once (they are still downloaded from each of their paths and
+    deduplicated after hashing). Stored objects are read-only and are either
+    hard-linked into the mirrored directories, so the mirrored files are read-only too
+    and must not be edited in place, or copied into them as independent writable files
+    that share the object's disk blocks when the file system supports reflinks
+    (copy-on-write clones).
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+                os.path.expanduser('~'), '.cache')
+            path = os.path.join(cache_dir, 'chrisclient', 'objects')
+        self.path = path
+
+    def incoming_path(self, key):
+        """
+        Get the local path a remote file identified by key is downloaded to before
+        being added to the store. The path is stable so that an interrupted download
+        can be resumed.
+        """
+        name = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.path, 'incoming', name)
+
+    def object_path(self, digest):
+        """
+        Get the local path of the object with the given sha256 digest.
+        """
+        return os.path.join(self.path, digest[:2], digest[2:])
+
+    def has(self, digest):
+        """
+        Whether the store has an object with the given sha256 digest.
+        """
+        return os.path.isfile(self.object_path(digest))
+
+    def add(self, file_path, chunk_size=1024 * 1024):
+        """
+        Move a downloaded file into the store and return its sha256 digest. The file is
+        just removed if the store already has its content.
+        """
+        sha = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+
+        obj_path = self.object_path(digest)
+        if os.path.isfile(obj_path):
+            os.remove(file_path)
+        else:
+            os.makedirs(os.path.dirname(obj_path), exist_ok=True)
+            os.chmod(file_path, 0o444)
+            os.replace(file_path, obj_path)
+        return digest
+
+    def link(self, digest, local_path):
+        """
+        Atomically make local_path a hard link to (or a copy of) the object with the
+        given sha256 digest.
+        """
+        tmp_path = self._make_tmp_path(local_path)
+        try:
+            os.link(self.object_path(digest), tmp_path)
+        except OSError:
+            # hard links can't cross file systems
+            shutil.copyfile(self.object_path(digest), tmp_path)
+        os.replace(tmp_path, local_path)
+
+    def copy(self, digest, local_path):
+        """
+        Atomically make local_path a copy (a reflink when possible) of the object with
+        the given sha256 digest. The copy gets the default mode of new files, so it can
+        be edited without changing the object.
+        """
+        tmp_path = self._make_tmp_path(local_path)
+        with open(self.object_path(digest), 'rb') as src, open(tmp_path, 'wb') as dst:
+            if not self._reflink(src, dst):
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp_path, local_path)
+
+    @staticmethod
+    def _make_tmp_path(local_path):
+        """
+        Internal method to create the directory of a local path and get the free
+        temporary path next to it that is atomically moved to the local path.
+        """
+        local_dir = os.path.dirname(local_path)
+        if local_dir:
+            os.makedirs(local_dir, exist_ok=True)
+        tmp_path = local_path + '.link'
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        return tmp_path
+
+    @staticmethod
+    def _reflink(src, dst):
+        """
+        Internal method to clone the content of an open file into another one and
+        return whether the file system supports it.
+        """
+        if fcntl is None:
+            return False
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            return False  # e.g. not a copy-on-write file system or across file systems
+        return True
+
+
+class Manifest(object):
+    """
+    On-disk record of the files mirrored into a local directory. It maps each remote
+    file's ChRIS path to its id, size, creation date and content digest so that an
+    incremental sync only transfers new or changed files.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = self._load()
+
+    def is_current(self, fname, descriptors):
+        """
+        Whether the manifest's entry for a remote file's path matches the remote file's
+        data descriptors.
+        """
+        entry = self.entries.get(fname)
+        return entry is not None and all(
+            entry.get(name) == descriptors.get(name)
+            for name in ('id', 'fsize', 'creation_date'))
+
+    def save(self):
+        """
+        Atomically write the manifest to disk.
+        """
+        manifest_dir = os.path.dirname(self.path)
+        os.makedirs(manifest_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=manifest_dir, prefix='.manifest-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+
+    def _load(self):
+        """
+        Internal method to load the manifest entries from disk. A missing or corrupt
+        manifest means that nothing has been mirrored yet.
+        """
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
@@ -0,0 +1,94 @@
+"""
+Streaming multipart/form-data encoder module.
+"""
+
+import os
+import uuid
+
+
+class MultipartEncoder(object):
+    """
+    File-like multipart/form-data request body that streams a file from disk (or any
+    seekable file handler) in chunks of at most chunk_size bytes, so that uploading a
+    file of any size uses a constant amount of memory. The body's length is known in
+    advance so the request is sent with a Content-Length header. If progress_callback
+    is given then it is called with the number of bytes sent so far and the total
+    number of bytes after every chunk.
+    """
+
+    def __init__(self, fields, file_field, fileobj, filename=None,
+                 chunk_size=1024 * 1024, progress_callback=None):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+        self.chunk_size = chunk_size
+        self.progress_callback = progress_callback
+
+        if filename is None:
+            filename = os.path.basename(getattr(fileobj, 'name', '') or file_field)
+
+        head = b''
+        for name, value in fields.items():
+            head += (f'--{self.boundary}\r\n'
+                     f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                     f'{value}\r\n').encode('utf-8')
+        head += (f'--{self.boundary}\r\n'
+                 f'Content-Disposition: form-data; name="{file_field}"; '
+                 f'filename="{filename}"\r\n'
+                 f'Content-Type: application/octet-stream\r\n\r\n').encode('utf-8')
+        tail = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+
+        start = fileobj.tell()
+        fileobj.seek(0, os.SEEK_END)
+        file_size = fileobj.tell() - start
+        fileobj.seek(start)
+
+        self._parts = [head, fileobj, tail]
+        self._part_index = 0
+        self._part_offset = 0
+        self._file_start = start
+        self.len = len(head) + file_size + len(tail)
+        self.bytes_read = 0
+
+    def __len__(self):
+        return self.len
+
+    def rewind(self):
+        """
+        Go back to the start of the body so that it can be sent again (e.g. when a
+        request is retried). Return False if the file handler can't seek.
+        """
+        fileobj = self._parts[1]
+        try:
+            fileobj.seek(self._file_start)
+        except (AttributeError, OSError, ValueError):
+            return False
+        self._part_index = 0
+        self._part_offset = 0
+        self.bytes_read = 0
+        return True
+
+    def read(self, size=-1):
+        """
+        Read at most size bytes (and never more than chunk_size bytes) of the body.
+        """
+        if size is None or size < 0 or size > self.chunk_size:
+            size = self.chunk_size
+
+        chunk = b''
+        while len(chunk) < size and self._part_index < len(self._parts):
+            part = self._parts[self._part_index]
+            if isinstance(part, bytes):
+                data = part[self._part_offset:self._part_offset + size - len(chunk)]
+                self._part_offset += len(data)
+            else:
+                data = part.read(size - len(chunk))
+            if data:
+                chunk += data
+            else:
+                self._part_index += 1
+                self._part_offset = 0
+
+        self.bytes_read += len(chunk)
+        if chunk and self.progress_callback is not None:
+            self.progress_callback(self.bytes_read, self.len)
+        return chunk
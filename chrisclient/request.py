@@ -2,11 +2,18 @@
 ChRIS request module.
 """
 
+import os
 import json
+import time
 import requests
-from collection_json import Collection
+from contextlib import nullcontext
+from urllib.parse import urlsplit
 
-from.exceptions import ChrisRequestException
+from .decoder import decode_collection
+from .multipart import MultipartEncoder
+from .metrics import RequestMetrics
+from .exceptions import (ChrisRequestException, ChrisNotFoundException,
+                         ChrisForbiddenException)
 
 
 class Request(object):
@@ -14,107 +21,387 @@ class Request(object):
     Http request object.
     """
 
-    def __init__(self, auth=None, content_type='application/vnd.collection+json'):
+    def __init__(self, auth=None, content_type='application/vnd.collection+json',
+                 session=None, cache=None, retry=None, breaker=None, governor=None,
+                 hooks=None):
         self.auth = auth
         self.content_type = content_type
+        self.session = session if session is not None else Request.create_session()
+        self.cache = cache  # optional ResponseCache for GET requests
+        self.retry = retry  # optional RetryPolicy for transient failures
+        self.breaker = breaker  # optional (shareable) per-host CircuitBreaker
+        self.governor = governor  # optional (shareable) rate and concurrency Governor
+        # objects with pre_request(info) and/or post_request(info) methods called around
+        # every HTTP request (e.g. RequestMetrics, OpenTelemetryHooks)
+        self.hooks = list(hooks or [])
 
     def get(self, url, params=None, timeout=30):
         """
         Make a GET request to CUBE.
         """
-        auth = self.auth
         headers = {'Content-Type': self.content_type, 'Accept': self.content_type}
 
-        try:
-            if auth and auth.get('username') and auth.get('password'):
-                r = requests.get(url,
-                                 params=params,
-                                 auth=(auth['username'], auth['password']),
-                                 timeout=timeout, headers=headers)
-            elif auth and auth.get('token'):
-                headers = {'Authorization': f"Token {auth['token']}"}
-                r = requests.get(url, params=params, timeout=timeout, headers=headers)
-            else:
-                r = requests.get(url, params=params, timeout=timeout, headers=headers)
-        except (requests.exceptions.Timeout, requests.exceptions.RequestException) as e:
-            raise ChrisRequestException(str(e))
+        if self.cache is not None:
+            body = self._get_cached(url, params, timeout, headers)
+        else:
+            r = self._send('GET', url, timeout, headers, params=params)
+            self.check_not_found(r)
+            body = r.content
 
         if self.content_type == 'application/vnd.collection+json':
-            return self.get_collection_from_response(r)
-        return json.loads(r.text)
+            return self.get_collection_from_text(body)
+        return json.loads(body)
 
-    def post(self, url, data, descriptor_file=None, timeout=30):
+    def post(self, url, data, descriptor_file=None, timeout=30, chunk_size=1024 * 1024,
+             progress_callback=None, idempotency_key=None):
         """
-        Make a POST request to CUBE.
+        Make a POST request to CUBE. If descriptor_file is a file handler then it's
+        streamed in chunks of at most chunk_size bytes in a multipart request. If an
+        idempotency_key is given then it's sent in an Idempotency-Key header and the
+        request can be retried by the retry policy like an idempotent request (the
+        caller guarantees that sending it twice is harmless).
         """
-        return self._post_put(requests.post, url, data, descriptor_file, timeout)
+        return self._post_put('POST', url, data, descriptor_file, timeout, chunk_size,
+                              progress_callback, idempotency_key)
 
     def put(self, url, data, descriptor_file=None, timeout=30):
         """
         Make a PUT request to CUBE.
         """
-        return self._post_put(requests.put, url, data, descriptor_file, timeout)
+        return self._post_put('PUT', url, data, descriptor_file, timeout)
 
     def delete(self, url, timeout=30):
         """
         Make a DELETE request to CUBE.
         """
-        auth = self.auth
-        try:
-            if auth and auth.get('username') and auth.get('password'):
-                r = requests.delete(url,
-                                    auth=(auth['username'], auth['password']),
-                                    timeout=timeout)
-            elif auth and auth.get('token'):
-                headers = {'Authorization': f"Token {auth['token']}"}
-                r = requests.delete(url, timeout=timeout, headers=headers)
-            else:
-               r = requests.delete(url, timeout=timeout)
-        except (requests.exceptions.Timeout, requests.exceptions.RequestException) as e:
-            raise ChrisRequestException(str(e))
+        self._send('DELETE', url, timeout)
+        if self.cache is not None:
+            self.cache.invalidate(url)
+
+    def download(self, url, local_path, params=None, timeout=30, chunk_size=1024 * 1024,
+                 resume=True, progress_callback=None):
+        """
+        Stream a file from CUBE to a local path in chunks of at most chunk_size bytes
+        and return its size. The file is written to a '.part' file that is renamed to
+        local_path when the download completes. If resume is True and a '.part' file
+        is left from an interrupted download then only its missing bytes are requested
+        with an HTTP Range request. If progress_callback is given then it is called
+        with the number of bytes received so far and the total after every chunk.
+        """
+        part_path = local_path + '.part'
+        offset = 0
+        if resume and os.path.exists(part_path):
+            offset = os.path.getsize(part_path)
+        headers = {'Range': f'bytes={offset}-'} if offset else None
+
+        # the governor's slot is held while the response body is streamed
+        with self._slot('read'):
+            return self._download(url, local_path, params, timeout, chunk_size,
+                                  progress_callback, headers, offset)
+
+    def _download(self, url, local_path, params, timeout, chunk_size, progress_callback,
+                  headers, offset):
+        """
+        Internal method to stream a file from CUBE (see download).
+        """
+        part_path = local_path + '.part'
+        r = self._send('GET', url, timeout, headers, governed=False, params=params,
+                       stream=True)
+        with r:
+            if r.status_code == 416 and offset:
+                # the range starts at the end of the file or the remote file changed
+                if r.headers.get('Content-Range', '').endswith(f'/{offset}'):
+                    os.replace(part_path, local_path)
+                    return offset
+                os.remove(part_path)
+                return self._download(url, local_path, params, timeout, chunk_size,
+                                      progress_callback, None, 0)
+            self.check_not_found(r)
+            if r.status_code in (401, 403):
+                # e.g. the download token expired or was already used
+                raise ChrisForbiddenException(f'Could not download {url}: HTTP error '
+                                              f'{r.status_code}')
+            if r.status_code >= 400:
+                raise ChrisRequestException(f'Could not download {url}: HTTP error '
+                                            f'{r.status_code}')
+            if r.status_code != 206:
+                offset = 0  # the server ignored the range so get the whole file
+
+            total = offset + int(r.headers.get('Content-Length') or 0)
+            size = offset
+            local_dir = os.path.dirname(local_path)
+            if local_dir:
+                os.makedirs(local_dir, exist_ok=True)
+            try:
+                with open(part_path, 'ab' if offset else 'wb') as f:
+                    for chunk in r.iter_content(chunk_size):
+                        f.write(chunk)
+                        size += len(chunk)
+                        if progress_callback is not None:
+                            progress_callback(size, max(total, size))
+            except requests.exceptions.RequestException as e:
+                raise ChrisRequestException(str(e))
+
+        os.replace(part_path, local_path)
+        return size
 
-    def _post_put(self, request_method, url, data, fname=None, timeout=30):
+    def close(self):
+        """
+        Close the underlying session and release its pooled connections.
+        """
+        self.session.close()
+
+    def _post_put(self, method, url, data, fname=None, timeout=30,
+                  chunk_size=1024 * 1024, progress_callback=None, idempotency_key=None):
         """
         Internal method to make either a POST or PUT request to CUBE.
         """
-        auth = self.auth
+        files = None
 
         if fname is None:
             headers = {'Content-Type': self.content_type, 'Accept': self.content_type}
-            files = None
 
             if self.content_type == 'application/vnd.collection+json':
                 data = json.dumps(self.makeTemplate(data))
             else:
                 data = json.dumps(data)
+        elif hasattr(fname, 'read'):
+            # this is a streamed multipart request
+            data = MultipartEncoder(data, 'fname', fname, chunk_size=chunk_size,
+                                    progress_callback=progress_callback)
+            headers = {'Content-Type': data.content_type}
         else:
             # this is a multipart request
             headers = None
             files = {'fname': fname}
 
-        try:
-            if auth and auth.get('username') and auth.get('password'):
-                r = request_method(url, files=files, data=data,
-                                   auth=(auth['username'], auth['password']),
-                                   timeout=timeout, headers=headers)
-            elif auth and auth.get('token'):
-                if headers is None:
-                    headers = {'Authorization': f"Token {auth['token']}"}
-                else:
-                    headers['Authorization'] = f"Token {auth['token']}"
+        if idempotency_key is not None:
+            headers = dict(headers) if headers else {}
+            headers['Idempotency-Key'] = str(idempotency_key)
 
-                r = request_method(url, files=files, data=data, timeout=timeout,
-                                   headers=headers)
-            else:
-                r = request_method(url, files=files, data=data, timeout=timeout,
-                                   headers=headers)
-        except (requests.exceptions.Timeout, requests.exceptions.RequestException) as e:
-            raise ChrisRequestException(str(e))
+        r = self._send(method, url, timeout, headers, files=files, data=data)
+        self.check_not_found(r)
+        if self.cache is not None:
+            self.cache.invalidate(url)
 
         if self.content_type == 'application/vnd.collection+json':
             return self.get_collection_from_response(r)
         return json.loads(r.text)
 
+    def _get_cached(self, url, params, timeout, headers):
+        """
+        Internal method to get the body of a GET response through the response cache.
+        A fresh cached body is returned without any request and a stale one with
+        validators is revalidated with a conditional request.
+        """
+        cache = self.cache
+        auth = self.auth or {}
+        key = (url, tuple(sorted((k, str(v)) for k, v in (params or {}).items())),
+               auth.get('username') or auth.get('token'))
+
+        entry = cache.get(key)
+        if entry is not None and entry.is_fresh():
+            cache.record('hits')
+            return entry.body
+
+        if entry is not None and entry.has_validators():
+            headers = dict(headers)
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        r = self._send('GET', url, timeout, headers, params=params)
+
+        if r.status_code == 304 and entry is not None:
+            cache.refresh(entry)
+            cache.record('revalidations')
+            return entry.body
+
+        self.check_not_found(r)
+        cache.record('misses')
+        if r.status_code == 200:
+            cache.set(key, url, r.content, r.headers.get('ETag'),
+                      r.headers.get('Last-Modified'))
+        return r.content
+
+    def _send(self, method, url, timeout, headers=None, governed=True, **kwargs):
+        """
+        Internal method to send an authenticated request to CUBE through the pooled
+        session. If there's a retry policy then the request is retried on transient
+        failures and if there's a circuit breaker then the request fails fast while
+        the circuit of the url's host is open. If there's a governor (and governed is
+        True) then every try waits for a slot of the request's class.
+
+        Every try is wrapped by the hooks: before it is sent each hook's pre_request
+        method is called with an info dictionary with the request's method, url,
+        resource name, attempt number (0 for the first try) and headers (that can be
+        modified), and after it each hook's post_request method is called with the
+        same dictionary updated with the response status (None on error), the elapsed
+        seconds, the bytes sent and received and the raised exception (or None). The
+        elapsed time and bytes received of a streamed response only cover its headers
+        unless it has a Content-Length header.
+        """
+        auth = self.auth
+
+        if auth and auth.get('username') and auth.get('password'):
+            kwargs['auth'] = (auth['username'], auth['password'])
+        elif auth and auth.get('token'):
+            headers = dict(headers) if headers else {}
+            headers['Authorization'] = f"Token {auth['token']}"
+
+        retry = self.retry
+        breaker = self.breaker
+        host = urlsplit(url).netloc
+        idempotent = retry is not None and retry.is_idempotent(method, headers)
+        attempt = 0
+        request_class = None
+        if governed and self.governor is not None:
+            upload = bool(kwargs.get('files')) or isinstance(kwargs.get('data'),
+                                                             MultipartEncoder)
+            request_class = self.governor.classify(method, upload)
+
+        while True:
+            if breaker is not None:
+                breaker.before_request(host)
+            try:
+                with self._slot(request_class):
+                    if self.hooks:
+                        r = self._send_hooked(method, url, timeout, headers, attempt,
+                                              kwargs)
+                    else:
+                        r = self.session.request(method, url, timeout=timeout,
+                                                 headers=headers, **kwargs)
+            except (requests.exceptions.Timeout,
+                    requests.exceptions.RequestException) as e:
+                if breaker is not None:
+                    breaker.record_failure(host)
+                if retry is None or not retry.should_retry(attempt, idempotent,
+                                                           exception=e):
+                    raise ChrisRequestException(str(e))
+                delay = retry.get_delay(attempt)
+            except BaseException:
+                # e.g. raised by a hook, also ends a half-open trial so the circuit
+                # doesn't stay half-open with a trial in flight forever
+                if breaker is not None:
+                    breaker.record_failure(host)
+                raise
+            else:
+                if breaker is not None:
+                    if r.status_code >= 500:
+                        breaker.record_failure(host)
+                    else:
+                        breaker.record_success(host)
+                if retry is None or not retry.should_retry(attempt, idempotent,
+                                                           response=r):
+                    return r
+                delay = retry.get_delay(attempt, r)
+                r.close()
+
+            if not self._rewind_body(kwargs):
+                raise ChrisRequestException(f'Could not retry {method} {url}: the '
+                                            f'request body can not be sent again')
+            time.sleep(delay)
+            attempt += 1
+
+    def _send_hooked(self, method, url, timeout, headers, attempt, kwargs):
+        """
+        Internal method to send a single try of a request wrapped by the hooks.
+        """
+        info = {'method': method, 'url': url,
+                'resource': RequestMetrics.resource_name(url), 'attempt': attempt,
+                'headers': dict(headers) if headers else {}}
+        for hook in self.hooks:
+            if hasattr(hook, 'pre_request'):
+                hook.pre_request(info)
+
+        data = kwargs.get('data')
+        start = time.monotonic()
+        r = None
+        error = None
+        try:
+            r = self.session.request(method, url, timeout=timeout,
+                                     headers=info['headers'], **kwargs)
+            return r
+        except requests.exceptions.RequestException as e:
+            error = e
+            raise
+        finally:
+            info['elapsed'] = time.monotonic() - start
+            info['status'] = r.status_code if r is not None else None
+            info['error'] = error
+            info['bytes_sent'] = len(data) if isinstance(
+                data, (str, bytes, MultipartEncoder)) else 0
+            info['bytes_received'] = 0
+            if r is not None:
+                if kwargs.get('stream'):
+                    info['bytes_received'] = int(r.headers.get('Content-Length') or 0)
+                else:
+                    info['bytes_received'] = len(r.content)
+            for hook in self.hooks:
+                if hasattr(hook, 'post_request'):
+                    hook.post_request(info)
+
+    def _slot(self, request_class):
+        """
+        Internal method to get a context manager that holds a governor's slot of a
+        request class (a no-op without governor or request class).
+        """
+        if self.governor is None or request_class is None:
+            return nullcontext()
+        return self.governor.slot(request_class)
+
+    @staticmethod
+    def _rewind_body(kwargs):
+        """
+        Internal method to rewind a request's body so that it can be sent again.
+        Return False if the body is a stream that can't be rewound.
+        """
+        data = kwargs.get('data')
+        if isinstance(data, MultipartEncoder):
+            return data.rewind()
+        if hasattr(data, 'read'):
+            return False
+        for f in (kwargs.get('files') or {}).values():
+            if hasattr(f, 'read'):
+                if not (hasattr(f, 'seekable') and f.seekable()):
+                    return False
+                f.seek(0)
+        return True
+
+    @staticmethod
+    def create_session(pool_connections=10, pool_maxsize=10, max_retries=0,
+                       pool_block=False, transport=None):
+        """
+        Static method to create a requests session whose connections are kept alive
+        and reused across requests. pool_connections is the number of per-host pools
+        to cache, pool_maxsize the number of connections kept open to each host and
+        max_retries the number of retries for failed connection attempts (an int or a
+        urllib3 Retry object). If pool_block is True then pool_maxsize becomes a hard
+        per-host connection limit and extra requests wait for a free connection.
+        transport is an optional requests transport adapter (e.g. a record/replay
+        Cassette) mounted instead of a new pooled adapter.
+        """
+        session = requests.Session()
+        adapter = transport
+        if adapter is None:
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_connections,
+                                                    pool_maxsize=pool_maxsize,
+                                                    max_retries=max_retries,
+                                                    pool_block=pool_block)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @staticmethod
+    def check_not_found(response):
+        """
+        Static method to raise ChrisNotFoundException if a response's url was not found
+        in CUBE.
+        """
+        if response.status_code == 404:
+            raise ChrisNotFoundException(f'Not found: {response.url}')
+
     @staticmethod
     def get_data_from_collection(collection):
         """
@@ -141,6 +428,9 @@ class Request(object):
         """
         Get an item's data (descriptors) in a dictionary.
         """
+        if isinstance(item.data, dict):
+            return item.data  # already collected by the decoder
+
         item_dict = {}
 
         # collect the item's descriptors
@@ -161,17 +451,15 @@ class Request(object):
         """
         Static method to get the collection object from a response object.
         """
-        content = json.loads(response.text)
-        total = content['collection'].pop('total', None)
-
-        collection = Collection.from_json(json.dumps(content))
+        return decode_collection(response.content)
 
-        if collection.error:
-            raise ChrisRequestException(collection.error.message)
-
-        if total is not None:
-            collection.total = total
-        return collection
+    @staticmethod
+    def get_collection_from_text(text):
+        """
+        Static method to get the collection object from the text (or bytes) of a
+        response's body.
+        """
+        return decode_collection(text)
 
     @staticmethod
     def makeTemplate(descriptors_dict):
@@ -0,0 +1,156 @@
+"""
+ChRIS request resilience module (retries with backoff and circuit breaking).
+"""
+
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from .exceptions import ChrisCircuitOpenException
+
+
+class RetryPolicy(object):
+    """
+    Policy to retry the requests that failed with a transient error: a connection
+    error, a timeout or a response status in retry_statuses (e.g. a 502 from a proxy
+    during a deploy). Requests are retried at most retries times with a jittered
+    exponential backoff (a random delay between 0 and backoff_factor * 2 ** attempt
+    seconds, at most max_backoff). A Retry-After header is honoured as the minimum
+    delay unless it's longer than max_retry_after in which case the request is not
+    retried.
+
+    Only idempotent requests are retried: those whose method is in idempotent_methods
+    and the POST requests sent with a client-side idempotency (dedup) key. Other
+    requests are only retried when the connection couldn't be established, so they
+    never reached the server.
+    """
+
+    def __init__(self, retries=3, backoff_factor=0.5, max_backoff=30,
+                 retry_statuses=(429, 502, 503, 504), max_retry_after=120,
+                 idempotent_methods=('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')):
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_statuses = tuple(retry_statuses)
+        self.max_retry_after = max_retry_after
+        self.idempotent_methods = tuple(idempotent_methods)
+
+    def is_idempotent(self, method, headers=None):
+        """
+        Whether a request can be safely sent more than once.
+        """
+        return method in self.idempotent_methods or bool(
+            headers and headers.get('Idempotency-Key'))
+
+    def should_retry(self, attempt, idempotent, response=None, exception=None):
+        """
+        Whether a request that got a response or raised a requests exception on its
+        attempt-th try (starting at 0) should be retried.
+        """
+        if attempt >= self.retries:
+            return False
+        if exception is not None:
+            return idempotent or isinstance(exception,
+                                            requests.exceptions.ConnectTimeout)
+        if response.status_code not in self.retry_statuses or not idempotent:
+            return False
+        retry_after = self.get_retry_after(response)
+        return retry_after is None or retry_after <= self.max_retry_after
+
+    def get_delay(self, attempt, response=None):
+        """
+        Get the number of seconds to wait before the next try of a request that failed
+        on its attempt-th try.
+        """
+        delay = random.uniform(0, min(self.max_backoff,
+                                      self.backoff_factor * 2 ** attempt))
+        retry_after = self.get_retry_after(response) if response is not None else None
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    @staticmethod
+    def get_retry_after(response):
+        """
+        Static method to get the number of seconds of a response's Retry-After header
+        (given either in seconds or as an HTTP date) or None.
+        """
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+        try:
+            date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        return max((date - datetime.now(timezone.utc)).total_seconds(), 0)
+
+
+class CircuitBreaker(object):
+    """
+    Thread-safe per-host circuit breaker. After failure_threshold consecutive failures
+    (connection errors, timeouts or 5xx responses) to a host its circuit opens and the
+    requests to that host fail fast with ChrisCircuitOpenException for reset_timeout
+    seconds. Then the circuit is half-open: a single trial request is let through and
+    its outcome closes the circuit again or reopens it. A breaker can be shared across
+    clients talking to the same hosts.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._hosts = {}  # host -> [consecutive failures, opened at, trial in flight]
+        self._lock = threading.Lock()
+
+    def before_request(self, host):
+        """
+        Raise ChrisCircuitOpenException if a request to host must not be sent now.
+        """
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state[1] is None:
+                return
+            if time.monotonic() - state[1] < self.reset_timeout or state[2]:
+                raise ChrisCircuitOpenException(
+                    f'Circuit open for {host} after {state[0]} consecutive failures')
+            state[2] = True  # half-open, let this trial request through
+
+    def record_success(self, host):
+        """
+        Record a successful request to host, closing its circuit.
+        """
+        with self._lock:
+            self._hosts.pop(host, None)
+
+    def record_failure(self, host):
+        """
+        Record a failed request to host, opening its circuit when the threshold is
+        reached (or when a half-open trial request fails).
+        """
+        with self._lock:
+            state = self._hosts.setdefault(host, [0, None, False])
+            state[0] += 1
+            if state[2] or state[0] >= self.failure_threshold:
+                state[1] = time.monotonic()
+                state[2] = False
+
+    def state(self, host):
+        """
+        Get the state of the circuit of a host: 'closed', 'open' or 'half-open'.
+        """
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state[1] is None:
+                return 'closed'
+            if state[2] or time.monotonic() - state[1] >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
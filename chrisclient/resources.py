@@ -0,0 +1,256 @@
+"""
+ChRIS API resources bookkeeping module.
+"""
+
+from collections import OrderedDict
+
+from .request import Request
+from .urlcache import UrlCache
+
+
+class ResourcesMixin(object):
+    """
+    Bookkeeping shared by Client and AsyncClient that makes no requests: the urls of
+    the high level API resources (discovered from the API root or taken from a
+    UrlCache), the urls and link relations of the items already seen and the helpers
+    that only transform data. The client class must have the url and auth attributes
+    and call _init_resources from its constructor.
+    """
+
+    def _init_resources(self, url_cache, item_links_lock):
+        """
+        Internal method to initialize the bookkeeping given the optional url cache and
+        the lock (a context manager) that guards the items already seen.
+        """
+        # optional on-disk cache of the urls discovered from the API root (UrlCache)
+        self.url_cache = url_cache
+        self._urls_from_cache = False
+        self._rediscovered = {}  # stale url -> rediscovered url
+
+        # urls and link relations of the items already seen, keyed by (url_attr, id)
+        self.item_links_maxsize = 10000
+        self._item_links = OrderedDict()
+        self._item_links_lock = item_links_lock
+
+        # urls of the high level API resources
+        self.feeds_url = self.url
+        self.public_feeds_url = ''
+        self.chris_instance_url = ''
+        self.compute_resources_url = ''
+        self.plugin_metas_url = ''
+        self.plugins_url = ''
+        self.plugin_instances_url = ''
+        self.pipelines_url = ''
+        self.workflows_url = ''
+        self.tags_url = ''
+        self.pipeline_source_files_url = ''
+        self.user_files_url = ''
+        self.pacs_files_url = ''
+        self.pacs_url = ''
+        self.pacs_queries_url = ''
+        self.pacs_series_url = ''
+        self.file_browser_url = ''
+        self.download_tokens_url = ''
+        self.groups_url = ''
+        self.user_url = ''
+        self.admin_url = ''
+
+    def set_urls_from_collection(self, coll):
+        """
+        Set the urls of the high level API resources from the API root collection
+        object.
+        """
+        get_url = Request.get_link_relation_urls
+
+        # get urls of the high level API resources
+        self.public_feeds_url = self.public_feeds_url or get_url(coll, 'public_feeds')[0]
+        self.chris_instance_url = self.chris_instance_url or get_url(
+            coll, 'chrisinstance')[0]
+        self.compute_resources_url = self.compute_resources_url or get_url(
+            coll, 'compute_resources')[0]
+        self.plugin_metas_url = self.plugin_metas_url or get_url(coll, 'plugin_metas')[0]
+        self.plugins_url = self.plugins_url or get_url(coll, 'plugins')[0]
+        self.plugin_instances_url = self.plugin_instances_url or get_url(
+            coll, 'plugin_instances')[0]
+        self.pipelines_url = self.pipelines_url or get_url(coll, 'pipelines')[0]
+        self.workflows_url = self.workflows_url or get_url(coll, 'workflows')[0]
+        self.tags_url = self.tags_url or get_url(coll, 'tags')[0]
+        self.pipeline_source_files_url = self.pipeline_source_files_url or get_url(
+            coll, 'pipelinesourcefiles')[0]
+        self.user_files_url = self.user_files_url or get_url(
+            coll, 'userfiles')[0]
+        self.pacs_files_url = self.pacs_files_url or get_url(coll, 'pacsfiles')[0]
+        self.pacs_url = self.pacs_url or get_url(coll, 'pacs')[0]
+        self.pacs_queries_url = self.pacs_queries_url or get_url(coll, 'pacsqueries')[0]
+        self.pacs_series_url = self.pacs_series_url or get_url(coll, 'pacsseries')[0]
+        self.file_browser_url = self.file_browser_url or get_url(coll, 'filebrowser')[0]
+
+        if not self.download_tokens_url:
+            urls = get_url(coll, 'download_tokens')
+            self.download_tokens_url = urls[0] if urls else ''
+
+        if not self.groups_url:
+            urls = get_url(coll, 'groups')
+            self.groups_url = urls[0] if urls else ''
+
+        if not self.user_url:
+            urls = get_url(coll, 'user')
+            self.user_url = urls[0] if urls else ''
+
+        if not self.admin_url:
+            urls = get_url(coll, 'admin')
+            self.admin_url = urls[0] if urls else ''
+
+    def compute_workflow_nodes_info(self, pipeline_default_parameters,
+                                    include_all_defaults=False):
+        """
+        Helper method to create the nodes_info data structure required to create a
+        workflow from a pipeline's default parameters data returned by the
+        get_pipeline_default_parameters. If include_all_defaults is set to True
+        then non-null parameters are also included in the result.
+        """
+        pipings_dict = {}
+        for default_param in pipeline_default_parameters:
+            piping_id = default_param['plugin_piping_id']
+
+            if piping_id not in pipings_dict:
+                pipings_dict[piping_id] = {
+                    'piping_id': piping_id,
+                    'previous_piping_id': default_param['previous_plugin_piping_id'],
+                    'compute_resource_name': 'host',
+                    'title': default_param['plugin_piping_title'],
+                    'plugin_parameter_defaults': []
+                }
+
+            if default_param['value'] is None or include_all_defaults:
+                pipings_dict[piping_id]['plugin_parameter_defaults'].append(
+                    {
+                        'name': default_param['param_name'],
+                        'default': default_param['value']
+                    }
+                )
+
+        nodes_info = []
+        for piping_id in pipings_dict:
+            if not pipings_dict[piping_id]['plugin_parameter_defaults']:
+                del pipings_dict[piping_id]['plugin_parameter_defaults']
+            nodes_info.append(pipings_dict[piping_id])
+        return nodes_info
+
+    def _set_urls_from_cache(self):
+        """
+        Internal method to set the urls of the high level API resources from the url
+        cache and return whether it had a fresh entry for the CUBE url and user.
+        """
+        if self.url_cache is None:
+            return False
+        urls = self.url_cache.get(UrlCache.make_key(self.url, self.auth))
+        if urls is None:
+            return False
+        for url_attr, url in urls.items():
+            if hasattr(self, url_attr) and not getattr(self, url_attr):
+                setattr(self, url_attr, url)
+        self._urls_from_cache = True
+        return True
+
+    def _cache_urls(self):
+        """
+        Internal method to write the urls of the high level API resources to the url
+        cache (if any).
+        """
+        if self.url_cache is not None:
+            urls = {attr: value for attr, value in vars(self).items()
+                    if attr.endswith('_url')}
+            self.url_cache.set(UrlCache.make_key(self.url, self.auth), urls)
+
+    def _drop_urls(self):
+        """
+        Internal method to drop the urls of the high level API resources and their url
+        cache entry so that they are discovered again from the API root. The dropped
+        urls are returned keyed by attribute name.
+        """
+        stale_urls = {url_attr: value for url_attr, value in vars(self).items()
+                      if url_attr.endswith('_url') and value}
+        if self.url_cache is not None:
+            self.url_cache.delete(UrlCache.make_key(self.url, self.auth))
+        for url_attr in stale_urls:
+            setattr(self, url_attr, '')
+        self.feeds_url = self.url
+        self._urls_from_cache = False
+        return stale_urls
+
+    def _set_rediscovered_urls(self, stale_urls):
+        """
+        Internal method to record the rediscovered url of each of the dropped urls of
+        the high level API resources.
+        """
+        self._rediscovered = {value: getattr(self, url_attr)
+                              for url_attr, value in stale_urls.items()
+                              if getattr(self, url_attr)}
+
+    def _get_rediscovered_url(self, url):
+        """
+        Internal method to get the url under the rediscovered urls of the high level API
+        resources that corresponds to a url under the stale ones, or None if there is
+        no such stale url or it didn't change.
+        """
+        rediscovered = self._rediscovered
+        stale = max((value for value in rediscovered if url.startswith(value)),
+                    key=len, default=None)
+        if stale is None or rediscovered[stale] == stale:
+            return None
+        return rediscovered[stale] + url[len(stale):]
+
+    def _get_known_item_url(self, url_attr, id):
+        """
+        Internal method to get the url of an already seen item of a resource given its
+        ChRIS id or None if it hasn't been seen.
+        """
+        key = (url_attr, str(id))
+        with self._item_links_lock:
+            entry = self._item_links.get(key)
+            if entry is None:
+                return None
+            self._item_links.move_to_end(key)
+            return entry[0]
+
+    def _get_known_item_link_urls(self, url_attr, id, relation_name):
+        """
+        Internal method to get the list of urls for a link relation of an already seen
+        item of a resource given its ChRIS id or None if it hasn't been seen.
+        """
+        key = (url_attr, str(id))
+        with self._item_links_lock:
+            entry = self._item_links.get(key)
+            if entry is None:
+                return None
+            self._item_links.move_to_end(key)
+            return entry[1].get(relation_name, [])
+
+    def _remember_items(self, url_attr, coll):
+        """
+        Internal method to remember the url and link relations of the items in a
+        resource's collection object. The least recently used items are forgotten when
+        there are more than item_links_maxsize of them.
+        """
+        with self._item_links_lock:
+            for item in coll.items:
+                id = Request.get_item_descriptors(item).get('id')
+                if id is None or not item.href:
+                    continue
+                links = {}
+                for link in item.links:
+                    links.setdefault(link.rel, []).append(link.href)
+                key = (url_attr, str(id))
+                self._item_links[key] = (item.href, links)
+                self._item_links.move_to_end(key)
+
+            while len(self._item_links) > self.item_links_maxsize:
+                self._item_links.popitem(last=False)
+
+    def _forget_item(self, url_attr, id):
+        """
+        Internal method to forget the url and link relations of an item of a resource.
+        """
+        with self._item_links_lock:
+            self._item_links.pop((url_attr, str(id)), None)
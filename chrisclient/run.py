@@ -3,71 +3,12 @@
 import  logging
 logging.disable(logging.CRITICAL)
 
-import  os
-import  sys
-import  json
-import  socket
-import  requests
-import  ast
-import  pudb
-
-import  pfmisc
 from    chrisclient         import  search
+from    chrisclient         import  utils
+from    chrisclient.schemacache import  PluginSchemaCache
+from    chrisclient.exceptions import  ChrisRequestException
 from    argparse            import  Namespace
 
-# pfstorage local dependencies
-from    pfmisc._colors      import  Colors
-from    pfmisc.debug        import  debug
-from    pfmisc.C_snode      import  *
-from    pfstate             import  S
-
-class D(S):
-    """
-    A derived 'pfstate' class that keeps system state.
-
-    See https://github.com/FNNDSC/pfstate for more information.
-    """
-
-    def __init__(self, *args, **kwargs):
-        """
-        An object to hold some generic/global-ish system state, in C_snode
-        trees.
-        """
-        d_sysArgs   : dict      = {}
-        d_CUBE      : dict      = {
-                "protocol":     "http",
-                "port":         "8000",
-                "address":      "%HOSTIP",
-                "user":         "chris",
-                "password":     "chris1234",
-        }
-        for k,v in kwargs.items():
-            if k == 'args': d_sysArgs   = v
-        if len(d_sysArgs['str_CUBE']):
-            d_CUBE  = ast.literal_eval("".join(d_sysArgs['str_CUBE'].split()))
-        if len(d_sysArgs['str_CUBEaddress']):
-            d_CUBE['address']   = d_sysArgs['str_CUBEaddress']
-        if len(d_sysArgs['str_CUBEport']):
-            d_CUBE['port']      = d_sysArgs['str_CUBEport']
-        self.state_create(
-        {
-            "CUBE": d_CUBE,
-            "self":
-            {
-                'httpProxy':
-                {
-                    'use':      False,
-                    'httpSpec': ''
-                }
-            },
-            "this":
-            {
-                'verbosity':    0,
-                'colorize':     False
-            }
-        },
-        *args, **kwargs)
-
 class PluginRun(object):
     """
     A class that interacts with CUBE via the collection+json API
@@ -77,25 +18,15 @@ class PluginRun(object):
 
     def S(self, *args):
         """
-        set/get components of the state object
-        """
-        if len(args) == 1:
-            return self.state.T.cat(args[0])
-        else:
-            self.state.T.touch(args[0], args[1])
-
-    def CUBE_IPspec(self):
-        """
-        Check and update the %HOSTIP if required
+        set/get components of the config object by their (former
+        state tree) path, e.g. '/CUBE/address'.
         """
-
-        IP = self.S('/CUBE/address')
-        if IP == "%HOSTIP":
-            self.S('/CUBE/address', self.d_meta['defIP'])
+        return self.query.S(*args)
 
     def __init__(self, d_meta, *args, **kwargs):
         """
-        Class constructor.
+        Class constructor. An existing CUBEConfig and chrisclient Client
+        can be shared with the 'config' and 'client' keyword arguments.
         """
 
         # Structures to contain the "CLI" of the plugin
@@ -109,34 +40,40 @@ class PluginRun(object):
         # to CLI appropriate for the search module:
         self.d_args['str_using']    = self.d_args['str_pluginSpec']
         self.d_args['str_for']      = 'id'
-        ns                          = Namespace(**self.d_args)
+        ns                          = Namespace(**dict(self.d_args,
+                                                str_for = 'id,name,version'))
+
+        # The CUBE connection details, built once and shared with
+        # the search module
+        self.d_meta                 = d_meta
+        self.config                 = kwargs.get('config')
+        if self.config is None:
+            self.config             = search.CUBEConfig.fromArgs(
+                                        self.d_args, d_meta.get('defIP'))
 
         # The search module -- used to determine the plugin ID
-        # in ChRIS/CUBE
-        self.query                  = search.PluginSearch(d_meta, ns)
-        self.str_pluginID   : str   = ''
-
-        # Generic "state" data, mostly describing the
-        # compute environment in which CUBE exists
-        self.d_meta     = d_meta
-        self.state      = D(
-            version     = d_meta['version'],
-            name        = d_meta['name'],
-            desc        = d_meta['desc'],
-            args        = vars(*args)
-        )
+        # (and name and version) in ChRIS/CUBE
+        self.query                  = search.PluginSearch(d_meta, ns,
+                                        config = self.config,
+                                        client = kwargs.get('client'))
+        self.str_pluginID       : str   = ''
+        self.str_pluginName     : str   = ''
+        self.str_pluginVersion  : str   = ''
+
+        # The on-disk cache of plugin parameter schemas, keyed
+        # by CUBE url, plugin name and version
+        self.schemaCache            = None
+        if not self.d_args.get('b_noSchemaCache'):
+            self.schemaCache        = PluginSchemaCache()
 
         # A debug/print object
-        self.dp         = pfmisc.debug(
+        self.dp         = utils.create_debug(
             verbosity   = int(self.d_args['verbosity']),
             within      = d_meta['name'],
             syslog      = self.d_args['b_syslog'],
-            colorize    = self.state.T.cat('/this/colorize')
+            colorize    = self.config.colorize
         )
 
-        # Quick housekeeping
-        self.CUBE_IPspec()
-
     def pluginCLIargs_parse(self):
         """
         Parse the string of CLI args into a dictionary
@@ -172,6 +109,48 @@ class PluginRun(object):
             'CLIdict':  self.d_CLIargs
         }
 
+    def pluginSchema_get(self):
+        """
+        Get the parameter schema of the plugin to run, i.e. the list of
+        its parameters, indexed by CLI flag and name.
+
+        The schema is read from the on-disk cache if this plugin name and
+        version have been seen before in this CUBE, otherwise it is fetched
+        from CUBE by following the pages of the plugin's parameters and
+        cached.
+        """
+        b_status    : bool          = False
+        b_cached    : bool          = False
+        l_params    : list          = None
+        b_cacheable : bool          = self.schemaCache is not None and \
+                                      len(self.str_pluginName) and    \
+                                      len(self.str_pluginVersion)
+
+        if b_cacheable:
+            str_CUBEurl = self.query.CUBE_client().url
+            l_params    = self.schemaCache.get(str_CUBEurl,
+                                               self.str_pluginName,
+                                               self.str_pluginVersion)
+            b_cached    = l_params is not None
+            b_status    = b_cached
+        if l_params is None:
+            try:
+                l_params    = list(self.query.CUBE_client().iter_plugin_parameters(
+                                    self.str_pluginID, {'limit': 100}))
+                b_status    = True
+            except ChrisRequestException as e:
+                logging.error(str(e))
+                l_params    = []
+            if b_status and b_cacheable:
+                self.schemaCache.set(str_CUBEurl, self.str_pluginName,
+                                     self.str_pluginVersion, l_params)
+        return {
+            'status':   b_status,
+            'cached':   b_cached,
+            'schema':   l_params,
+            'index':    PluginSchemaCache.index(l_params)
+        }
+
     def pluginArgs_CLIvalsFind(self):
         """
         The plugin has a pattern of CLI flags. These flags are associated
@@ -180,7 +159,9 @@ class PluginRun(object):
 
         This method finds, for each CLI flag, the corresponding value and
         saves this in self.d_CLIvals, key indexed by the name to POST and
-        the CLI value.
+        the CLI value. The plugin's parameter schema is fetched (or read
+        from cache) only once and every flag is resolved against its
+        index.
 
         Some exceptions to the CLI / name lookup can be defined. These
         are not subject to the indirect value calculation but are passed
@@ -189,34 +170,23 @@ class PluginRun(object):
         """
 
         b_status    : bool          = False
-        l_hits      : list          = []
         l_directArg : list          = []
-        d_val       : dict          = {}
-        d_query     : dict          = {}
-        d_search    : dict          = {
-            'str_for':          'flag,name',
-            'str_using':        'plugin_id=%s' % self.str_pluginID,
-            'str_across':       'parameters',
-            'str_CUBE':         self.d_args['str_CUBE'],
-            'str_filterFor':    'key'
-        }
+        d_param     : dict          = {}
+        d_index     : dict          = {}
+
         l_directArg = ["previous_id", "title", "compute_resource_name"]
+        if len([key for key in self.d_CLIargs if key not in l_directArg]):
+            d_index     = self.pluginSchema_get()['index']
         for key in self.d_CLIargs:
             b_status                        = True
             if key not in l_directArg:
-                d_search['str_filterFor']   = '--' + key
-                ns                          = Namespace(**d_search)
-                self.query                  = search.PluginSearch(self.d_meta, ns)
-                d_query                     = self.query.do()
-                if len(d_query['target']):
-                    l_hits                  = d_query['target'][0]
-                    str_userCLIvalue        = self.d_CLIargs[key]
-                    d_val = next((el for el in l_hits if el['name'] == 'name'))
-                    self.d_CLIvals[d_val['value']] = str_userCLIvalue
+                d_param = d_index.get('--' + key) or \
+                          d_index.get('-' + key)  or \
+                          d_index.get(key)
+                if d_param:
+                    self.d_CLIvals[d_param['name']] = self.d_CLIargs[key]
             if key in l_directArg:
                 self.d_CLIvals[key] = self.d_CLIargs[key]
-            # if key == 'previous_id':
-            #     self.d_CLIvals['previous_id'] = self.d_CLIargs['previous_id']
         return {
             'status':           b_status,
             'CUBEpluginVals':   self.d_CLIvals
@@ -267,41 +237,20 @@ class PluginRun(object):
         str_message         : str   = 'CUBE API not called because of earlier error'
 
         if d_templatize['status']:
-            d_headers           : dict = {
-                'Accept':       'application/vnd.collection+json',
-                'Content-Type': 'application/vnd.collection+json'
-            }
-            str_dataServiceAddr : str  = "%s://%s:%s" % (
-                                    self.S('/CUBE/protocol'),
-                                    self.S('/CUBE/address'),
-                                    self.S('/CUBE/port')
-                                )
-            str_dataServiceURL  : str  = 'api/v1/plugins/%s/instances/' % \
-                                    self.str_pluginID
-            str_user            : str  = self.S('/CUBE/user')
-            str_passwd          : str  = self.S('/CUBE/password')
-            str_URL             : str  = '%s/%s' % (
-                                    str_dataServiceAddr,
-                                    str_dataServiceURL
-                                )
+            d_data              : dict = {d['name']: d['value']
+                                          for d in self.d_CLItemplate['data']}
             try:
-                resp = requests.post(
-                                    str_URL,
-                                    data    = json.dumps(
-                                        {'template' : self.d_CLItemplate}
-                                    ),
-                                    auth    = (str_user, str_passwd),
-                                    timeout = 30,
-                                    headers = d_headers
-                        )
-                b_status    = True
-                str_message     = "CUBE call return a response"
-            except (requests.exceptions.Timeout,
-                    requests.exceptions.RequestException) as e:
+                d_instance  = self.query.CUBE_client().create_plugin_instance(
+                                    self.str_pluginID, d_data)
+                d_resp      = {'collection': {'items': [{'data': [
+                                    {'name': k, 'value': v}
+                                    for k, v in d_instance.items()]}]}}
+                str_message = "CUBE call return a response"
+            except ChrisRequestException as e:
                 logging.error(str(e))
-                str_message     = "CUBE call return some error"
-                raise
-            d_resp = resp.json()
+                d_resp      = {'collection': {'error': {'message': str(e)}}}
+                str_message = "CUBE call return some error"
+            b_status        = True
         return {
             'status':       b_status,
             'templatize':   d_templatize,
@@ -360,8 +309,11 @@ class PluginRun(object):
         if len(d_query['target']) >= 1:
             if len(d_query['target']) > 1:
                 str_message     += "multiple hits found, using first\n"
-            d_targetID          = d_query['target'][0][0]
-            self.str_pluginID   = d_targetID['value']
+            d_target            = {hit['name']: hit['value']
+                                    for hit in d_query['target'][0]}
+            self.str_pluginID       = str(d_target['id'])
+            self.str_pluginName     = str(d_target.get('name', ''))
+            self.str_pluginVersion  = str(d_target.get('version', ''))
 
             # and now, run it!
             d_run:  dict    = self.pluginInstanceID_find(
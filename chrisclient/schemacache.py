@@ -0,0 +1,76 @@
+"""
+ChRIS plugin parameter schema cache module.
+"""
+
+import os
+import re
+import json
+import hashlib
+import tempfile
+
+
+class PluginSchemaCache(object):
+    """
+    On-disk cache of plugin parameter schemas (the list of a plugin's parameters with
+    their CLI flags and names) keyed by CUBE url, plugin name and version. The same
+    plugin name and version can be registered with different parameters in different
+    CUBEs, but the parameters of a plugin version never change once it's registered in
+    a CUBE, so entries don't expire.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+                os.path.expanduser('~'), '.cache')
+            path = os.path.join(cache_dir, 'chrisclient', 'plugins')
+        self.path = path
+
+    def get(self, url, name, version):
+        """
+        Get the cached list of parameters of a plugin version in the CUBE at url or
+        None.
+        """
+        try:
+            with open(self._file_path(url, name, version)) as f:
+                parameters = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return parameters if isinstance(parameters, list) else None
+
+    def set(self, url, name, version, parameters):
+        """
+        Cache the list of parameters of a plugin version in the CUBE at url.
+        """
+        tmp_path = None
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix='.schema-')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(parameters, f)
+            os.replace(tmp_path, self._file_path(url, name, version))
+        except OSError:
+            # the cache is an optimization, failing to write it is not an error
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def index(parameters):
+        """
+        Static method to index a list of parameters by their CLI flags, short CLI
+        flags and names.
+        """
+        index = {}
+        for param in parameters:
+            for key in ('name', 'short_flag', 'flag'):
+                if param.get(key):
+                    index[param[key]] = param
+        return index
+
+    def _file_path(self, url, name, version):
+        """
+        Internal method to get the cache file path of a plugin version in the CUBE at
+        url. The url is hashed to keep the file name short and safe.
+        """
+        cube = hashlib.sha256(url.encode()).hexdigest()[:16]
+        return os.path.join(self.path, re.sub(r'[^\w.-]', '_', f'{name}-{version}') +
+                            f'-{cube}.json')
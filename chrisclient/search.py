@@ -3,71 +3,60 @@
 import  logging
 logging.disable(logging.CRITICAL)
 
-import  os
-import  sys
-import  json
-import  socket
-import  requests
 import  ast
-import  pudb
 
-import  pfmisc
+from    chrisclient         import  client
+from    chrisclient         import  utils
+from    chrisclient.exceptions import  ChrisRequestException
 
-# pfstorage local dependencies
-from    pfmisc._colors      import  Colors
-from    pfmisc.debug        import  debug
-from    pfmisc.C_snode      import  *
-from    pfstate             import  S
+# marks the fields that an item of a search result does not have
+MISSING     = object()
 
-class D(S):
+class CUBEConfig(object):
     """
-    A derived 'pfstate' class that keeps system state.
+    The connection details of a CUBE instance (and the few output
+    settings) shared by the search and run modules.
 
-    See https://github.com/FNNDSC/pfstate for more information.
+    An instance is built once from the CLI args and can be passed to
+    any number of PluginSearch/PluginRun objects.
     """
 
-    def __init__(self, *args, **kwargs):
+    __slots__   = ('protocol', 'address', 'port', 'user', 'password', 'colorize')
+
+    def __init__(self, protocol = 'http', address = '%HOSTIP', port = '8000',
+                       user = 'chris', password = 'chris1234', colorize = False):
+        self.protocol   : str   = protocol
+        self.address    : str   = address
+        self.port       : str   = port
+        self.user       : str   = user
+        self.password   : str   = password
+        self.colorize   : bool  = colorize
+
+    @classmethod
+    def fromArgs(cls, d_args, str_defIP = ''):
         """
-        An object to hold some generic/global-ish system state, in C_snode
-        trees.
+        Build the config from the CLI args ('--onCUBE' JSON and the
+        '--onCUBEaddress'/'--onCUBEport' overrides). A '%HOSTIP'
+        address is replaced with <str_defIP>, or with the actual IP
+        of the host if that is not given.
         """
-        d_sysArgs   : dict      = {}
-        d_CUBE      : dict      = {
-                "protocol":     "http",
-                "port":         "8000",
-                "address":      "%HOSTIP",
-                "user":         "chris",
-                "password":     "chris1234",
-        }
-        for k,v in kwargs.items():
-            if k == 'args': d_sysArgs   = v
-        if 'str_CUBE' in d_sysArgs:
-            if len(d_sysArgs['str_CUBE']):
-                d_CUBE  = ast.literal_eval("".join(d_sysArgs['str_CUBE'].split()))
-        if 'str_CUBEaddress' in d_sysArgs:
-            if len(d_sysArgs['str_CUBEaddress']):
-                d_CUBE['address']   = d_sysArgs['str_CUBEaddress']
-        if 'str_CUBEport' in d_sysArgs:
-            if len(d_sysArgs['str_CUBEport']):
-                d_CUBE['port']      = d_sysArgs['str_CUBEport']
-        self.state_create(
-        {
-            "CUBE": d_CUBE,
-            "self":
-            {
-                'httpProxy':
-                {
-                    'use':      False,
-                    'httpSpec': ''
-                }
-            },
-            "this":
-            {
-                'verbosity':    0,
-                'colorize':     False
-            }
-        },
-        *args, **kwargs)
+        d_CUBE      : dict  = {}
+        if len(d_args.get('str_CUBE', '')):
+            d_CUBE  = ast.literal_eval("".join(d_args['str_CUBE'].split()))
+        if len(d_args.get('str_CUBEaddress', '')):
+            d_CUBE['address']   = d_args['str_CUBEaddress']
+        if len(d_args.get('str_CUBEport', '')):
+            d_CUBE['port']      = d_args['str_CUBEport']
+        config      = cls(**{k: v for k, v in d_CUBE.items() if k in cls.__slots__})
+        if config.address == "%HOSTIP":
+            config.address      = str_defIP or utils.get_host_ip()
+        return config
+
+    def URL(self):
+        """
+        Return the URL of the CUBE API root.
+        """
+        return "%s://%s:%s/api/v1/" % (self.protocol, self.address, self.port)
 
 class PluginSearch(object):
     """
@@ -77,38 +66,32 @@ class PluginSearch(object):
 
     def S(self, *args):
         """
-        set/get components of the state object
+        set/get components of the config object by their (former
+        state tree) path, e.g. '/CUBE/address'.
         """
+        str_field   : str   = args[0].rstrip('/').split('/')[-1]
         if len(args) == 1:
-            return self.state.T.cat(args[0])
+            return getattr(self.config, str_field)
         else:
-            self.state.T.touch(args[0], args[1])
+            setattr(self.config, str_field, args[1])
 
     def __init__(self, d_meta, *args, **kwargs):
         """
-        Class constructor.
+        Class constructor. An existing CUBEConfig and chrisclient Client
+        can be shared with the 'config' and 'client' keyword arguments.
         """
         self.d_args     = vars(*args)
-        self.state      = D(
-            version     = d_meta['version'],
-            name        = d_meta['name'],
-            desc        = d_meta['desc'],
-            args        = vars(*args)
-        )
-        if 'verbosity' in self.d_args:  verbosity   = self.d_args['verbosity']
-        else:                           verbosity   = 0
-        if 'b_syslog' in self.d_args:   b_syslog    = self.d_args['b_syslog']
-        else:                           b_syslog    = False
-        self.dp         = pfmisc.debug(
-            verbosity   = int(verbosity),
+        self.client     = kwargs.get('client')
+        self.config     = kwargs.get('config')
+        self.pageSize   = 100
+        if self.config is None:
+            self.config = CUBEConfig.fromArgs(self.d_args, d_meta.get('defIP'))
+        self.dp         = utils.create_debug(
+            verbosity   = int(self.d_args.get('verbosity', 0)),
             within      = d_meta['name'],
-            syslog      = b_syslog,
-            colorize    = self.state.T.cat('/this/colorize')
+            syslog      = self.d_args.get('b_syslog', False),
+            colorize    = self.config.colorize
         )
-        # Check the IP in the state structure and optionally update
-        IP = self.S('/CUBE/address')
-        if IP == "%HOSTIP":
-            self.S('/CUBE/address', d_meta['defIP'])
 
     def search_templatize(self):
         """
@@ -154,37 +137,58 @@ class PluginSearch(object):
             'params':   d_params
         }
 
+    def CUBE_client(self):
+        """
+        Return the chrisclient Client connected to the CUBE instance
+        in the config object, creating it on first use.
+        """
+        if self.client is None:
+            self.client = client.Client(
+                                self.config.URL(),
+                                self.config.user,
+                                self.config.password
+                        )
+        return self.client
+
     def search_CUBEAPIcall(self):
         """
 
         This method implements the actual search logic.
 
+        The response collection holds the 'href' of the search and a
+        generator of its result 'pages' that lazily follows the pages'
+        next links, so only the page being consumed (and the next one,
+        fetched in the background) is kept in memory. The 'total' is
+        filled in as the pages arrive.
+
         Caller should check return!
 
         """
-        def dataServiceURL_resolve():
+        def pages_resolve(d_params):
             """
-            Based on CLI flags, resolve the actual URL in CUBE.
+            Based on CLI flags, resolve the search in CUBE through the
+            client's public page iterator and return the generator of
+            its result pages or None if the context makes no sense.
             """
-            str_URL         : str   = ""
             str_id          : str   = ""
-            limit           : int   = 50000
+            str_resource    : str   = ""
+            str_relation    : str   = None
+            CUBE                    = self.CUBE_client()
 
             # search across plugins space
             if self.d_args['str_across'] == 'plugins':
-                str_URL     = 'api/v1/plugins/search/?limit=%d' % limit
+                str_resource    = 'plugins'
             # search across plugininstance space
             if self.d_args['str_across'] == 'plugininstances':
-                str_URL     = 'api/v1/plugins/instances/search/?limit=%d' % \
-                                (limit)
+                str_resource    = 'plugin_instances'
 
             # search across plugin parameter space (given plugin_id)
             if self.d_args['str_across'] == 'parameters':
                 if 'plugin_id' in self.d_args['str_using']:
                     str_id  = self.d_args['str_using'].split('=')[1]
                     if str_id.isnumeric():
-                        str_URL = 'api/v1/plugins/%s/parameters/?limit=%d' % \
-                                    (str_id, limit)
+                        str_resource    = 'plugins'
+                        str_relation    = 'parameters'
 
             # search across plugin instance file space (given plugin_inst_id)
             if self.d_args['str_across'] == 'files' or \
@@ -192,54 +196,46 @@ class PluginSearch(object):
                 if 'plugin_inst_id' in self.d_args['str_using']:
                     str_id  = self.d_args['str_using'].split('=')[1]
                     if str_id.isnumeric():
-                        str_URL = 'api/v1/plugins/instances/%s/files/?limit=%d' % \
-                                    (str_id, limit)
-            return str_URL
+                        str_resource    = 'plugin_instances'
+                        str_relation    = 'files'
+
+            if not len(str_resource):
+                return None
+            if str_relation is not None:
+                for str_key in ('plugin_id', 'plugin_inst_id'):
+                    d_params.pop(str_key, None)
+            return CUBE.iter_pages(str_resource, d_params, id = str_id or None,
+                                   relation = str_relation, prefetch = True)
+
+        def pages_get(pages, d_collection):
+            """
+            Pass the result pages through, keeping the collection's total.
+            """
+            for d_page in pages:
+                d_collection['total']   = d_page['total']
+                yield d_page
 
         d_resp              : dict      = {}
         d_templatize        : dict      = self.search_templatize()
         b_status            : bool      = False
         str_message         : str       = 'CUBE API not called because of previous error'
         if d_templatize['status']:
-            d_params    = d_templatize['params']
-            d_headers           : dict = {
-                'Accept':   'application/vnd.collection+json'
-            }
-            d_resp              : dict  = {}
-            str_dataServiceAddr : str   = "%s://%s:%s" % (
-                                    self.S('/CUBE/protocol'),
-                                    self.S('/CUBE/address'),
-                                    self.S('/CUBE/port')
-                                )
-            str_dataServiceURL  : str   =    dataServiceURL_resolve()
-            if len(str_dataServiceURL):
-                str_user            : str   = self.S('/CUBE/user')
-                str_passwd          : str   = self.S('/CUBE/password')
-                str_URL             : str   = '%s/%s' % (
-                                        str_dataServiceAddr,
-                                        str_dataServiceURL
-                                    )
-                try:
-                    resp = requests.get(
-                                        str_URL,
-                                        params  = d_params,
-                                        auth    = (str_user, str_passwd),
-                                        timeout = 30,
-                                        headers = d_headers
-                            )
+            d_params    = dict(d_templatize['params'])
+            d_params.setdefault('limit', self.pageSize)
+            try:
+                pages       = pages_resolve(d_params)
+                if pages is not None:
+                    d_collection    = {'total': 0}
+                    d_collection['pages']   = pages_get(pages, d_collection)
+                    d_resp          = {'collection': d_collection}
                     b_status        = True
                     str_message     = "CUBE call returned a response"
-                    d_resp          = resp.json()
-                    if 'error' in d_resp['collection']:
-                        b_status    = False
-                        str_message = d_resp['collection']['error']
-                except (requests.exceptions.Timeout,
-                        requests.exceptions.RequestException) as e:
-                    logging.error(str(e))
-                    b_status        = False
-                    str_message     = "CUBE call returned some error"
-            else:
-                str_message         = "Unable to construct a valid service URL. Check if context makes sense."
+                else:
+                    str_message     = "Unable to construct a valid service URL. Check if context makes sense."
+            except ChrisRequestException as e:
+                logging.error(str(e))
+                b_status        = False
+                str_message     = "CUBE call returned some error: %s" % e
         return {
             'status':       b_status,
             'templatize':   d_templatize,
@@ -247,51 +243,100 @@ class PluginSearch(object):
             'message':      str_message
         }
 
+    def search_rowsGet(self, d_page):
+        """
+        Return the rows of a page of search results, i.e. a dictionary
+        per item of its descriptor values or, when searching across
+        'links', of its first url of each link relation.
+        """
+        if self.d_args['str_across'] == 'links':
+            return [{str_rel: l_urls[0] for str_rel, l_urls in d_links.items()}
+                        for d_links in d_page['links']]
+        return d_page['data']
+
+    def search_columnsGet(self, l_rows, l_fields):
+        """
+        Convert the rows of a page of search results into columns, i.e.
+        a dictionary of each of the <l_fields> to the list of its value
+        in every row, or MISSING where the row does not have it. Each
+        column is built in a single pass over the page.
+        """
+        return {str_field: [d_row.get(str_field, MISSING) for d_row in l_rows]
+                    for str_field in l_fields}
+
     def search_desiredReturnFind(self, d_search):
         """
         For a given search response from CUBE, return the
         specific value sought.
+
+        The result pages are consumed one at a time: each page is
+        converted into per field columns (see search_columnsGet), the
+        '--filterFor' filter is evaluated column by column into a mask
+        of kept rows and only the '--for' projection of the kept rows
+        is retained. The values of the targets are also returned in
+        'columns', as a dictionary of each '--for' field to the list of
+        its values.
         """
         b_status        :   bool    = False
-        l_thistarget    :   list    = []
         l_target        :   list    = []
         str_message     :   str     = 'search returned no response'
-        b_keysListed    :   bool    = False
         l_keys          :   list    = []
-        str_innerList   :   str     = 'data'
-        str_innerKey    :   str     = 'name'
+        l_for           :   list    = []
+        l_forAll        :   list    = []
+        d_columns       :   dict    = {}
+        s_filter        :   set     = set()
+        str_nameKey     :   str     = 'name'
+        str_valueKey    :   str     = 'value'
+        str_error       :   str     = ''
 
         if self.d_args['str_across'] == 'links':
-            str_innerList   = 'links'
-            str_innerKey    = 'rel'
+            str_nameKey     = 'rel'
+            str_valueKey    = 'href'
+        l_forAll    = self.d_args['str_for'].split(',')
+        l_for       = list(dict.fromkeys(l_forAll))
+        if len(self.d_args['str_filterFor']):
+            s_filter    = {filt.strip() for filt in
+                                self.d_args['str_filterFor'].split(',')}
         if d_search['status']:
-            if d_search['response']['collection']['total']:
-                for d_hit in d_search['response']['collection']['items']:
-                    l_data  :   list = d_hit[str_innerList]
-                    if not b_keysListed:
-                        for d_el in l_data:
-                            l_keys.append(d_el[str_innerKey])
-                        b_keysListed = True
-                    l_thistarget     = []
-                    for str_desired in self.d_args['str_for'].split(','):
-                        l_hit   :   list = list(
-                                    filter(
-                                        lambda info: info[str_innerKey] == str_desired, l_data
-                                        )
-                                    )
-                        if len(l_hit):
-                            l_thistarget.append(l_hit[0])
-                            b_status    = True
-                    if len(self.d_args['str_filterFor']):
-                        l_filter = self.d_args['str_filterFor'].split(',')
-                        if not len([d for d in l_thistarget     \
-                                        for filt in l_filter    \
-                                            if d['value'] == filt.strip()]):
-                            l_thistarget    = []
-                    if len(l_thistarget):
-                        l_target.append(l_thistarget)
-
-        if not len(l_target):
+            d_collection    = d_search['response']['collection']
+            d_columns       = {str_field: [] for str_field in l_for}
+            try:
+                for d_page in d_collection.pop('pages', ()):
+                    l_rows  = self.search_rowsGet(d_page)
+                    if not len(l_rows):
+                        continue
+                    if not len(l_keys):
+                        l_keys  = list(l_rows[0])
+                    d_page_columns  = self.search_columnsGet(l_rows, l_for)
+                    l_found     = [any(v is not MISSING for v in t_row)
+                                        for t_row in zip(*d_page_columns.values())]
+                    b_status    = b_status or any(l_found)
+                    l_keep      = l_found
+                    if len(s_filter):
+                        l_match = [False] * len(l_rows)
+                        for l_column in d_page_columns.values():
+                            l_match = [b or (isinstance(v, str) and v in s_filter)
+                                            for b, v in zip(l_match, l_column)]
+                        l_keep  = [b and m for b, m in zip(l_found, l_match)]
+                    l_kept      = [i for i, b in enumerate(l_keep) if b]
+                    for str_field, l_column in d_page_columns.items():
+                        d_columns[str_field].extend(
+                            None if l_column[i] is MISSING else l_column[i]
+                                for i in l_kept)
+                    for i in l_kept:
+                        l_target.append([
+                            {str_nameKey: str_field,
+                             str_valueKey: d_page_columns[str_field][i]}
+                                for str_field in l_forAll
+                                if d_page_columns[str_field][i] is not MISSING])
+            except ChrisRequestException as e:
+                logging.error(str(e))
+                b_status    = False
+                str_error   = "CUBE call returned some error: %s" % e
+
+        if len(str_error):
+            str_message     = str_error
+        elif not len(l_target):
             str_message     = "No targets found"
         else:
             str_message     = "%s target(s) found" % len(l_target)
@@ -301,9 +346,23 @@ class PluginSearch(object):
             'search':   d_search,
             'target':   l_target,
             'message':  str_message,
-            'keys':     l_keys
+            'keys':     l_keys,
+            'columns':  d_columns if len(l_target) else {}
         }
 
+    def dataFrame_get(self, d_result):
+        """
+        Return the targets of a search result as a pandas DataFrame
+        with a column for each '--for' field, so that downstream tools
+        don't need to parse the result again.
+
+        pandas is an optional dependency and is only imported here.
+        """
+        import  pandas
+
+        return pandas.DataFrame(d_result['columns'],
+                    columns = list(dict.fromkeys(self.d_args['str_for'].split(','))))
+
     def do(self):
         """
         Main entry point to this class.
@@ -0,0 +1,600 @@
+"""
+Stand-in CUBE server for offline, load and scale tests of the client.
+
+It serves realistic Collection+JSON for all the resources discovered by
+Client.set_urls with pagination (next/previous links and total), search endpoints,
+item urls, multipart uploads, plugin instance creation and (ranged) file downloads, and
+it can inject latency and transient errors. Items are generated and encoded once when
+the server starts so resources of 100k items are cheap to page through.
+
+    with StandInCUBE(sizes={'plugin_instances': 100000}, latency=0.005) as cube:
+        cl = Client(cube.url, 'cube', 'cube1234')
+
+It can also be run as a separate process (to keep the server out of the client's
+interpreter when load testing):
+
+    python -m chrisclient.tests.standin --port 8010 --instances 100000
+"""
+
+import re
+import json
+import time
+import random
+import threading
+from collections import Counter, deque
+from argparse import ArgumentParser
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+PATTERN = bytes(range(256))
+STATUSES = ('finishedSuccessfully', 'started', 'scheduled', 'cancelled')
+
+
+def _feed(i, cube):
+    return {'id': i, 'name': f'feed {i}', 'creation_date': '2024-01-01T00:00:00Z',
+            'owner_username': 'cube', 'public': i % 10 == 0}
+
+
+def _plugin(i, cube):
+    return {'id': i, 'name': f'pl-{i}', 'version': '1.0.0',
+            'type': 'fs' if i == 1 else 'ds', 'title': f'Plugin {i}'}
+
+
+def _plugin_instance(i, cube):
+    plugin_id = i % cube.sizes['plugins'] + 1
+    return {'id': i, 'title': f'instance {i}', 'status': STATUSES[i // 7 % 4],
+            'plugin_id': plugin_id, 'plugin_name': f'pl-{plugin_id}',
+            'previous_id': i - 1 or None, 'feed_id': i % cube.sizes['feeds'] + 1,
+            'start_date': '2024-01-01T00:00:00Z', 'compute_resource_name': 'host'}
+
+
+def _user_file(i, cube):
+    return {'id': i, 'fname': f'home/cube/uploads/{i // 100}/file{i}.dat',
+            'fsize': cube.file_size, 'owner_username': 'cube'}
+
+
+def _pacs_file(i, cube):
+    return {'id': i, 'fname': f'SERVICES/PACS/MINICHRISORTHANC/{i // 100}/{i}.dcm',
+            'fsize': cube.file_size, 'PatientID': str(1000 + i // 100)}
+
+
+# relation name in the API root, path, default number of items, data descriptors
+RESOURCES = (
+    ('public_feeds', 'public/', 10, _feed),
+    ('chrisinstance', 'chrisinstance/', 1,
+     lambda i, cube: {'id': i, 'name': 'ChRIS stand-in', 'uuid': '0' * 32}),
+    ('compute_resources', 'computeresources/', 2,
+     lambda i, cube: {'id': i, 'name': 'host' if i == 1 else f'compute{i}'}),
+    ('plugin_metas', 'plugins/metas/', 50,
+     lambda i, cube: {'id': i, 'name': f'pl-{i}', 'category': 'stand-in'}),
+    ('plugins', 'plugins/', 50, _plugin),
+    ('plugin_instances', 'plugins/instances/', 1000, _plugin_instance),
+    ('pipelines', 'pipelines/', 10,
+     lambda i, cube: {'id': i, 'name': f'pipeline {i}', 'locked': False}),
+    ('workflows', 'pipelines/workflows/', 10,
+     lambda i, cube: {'id': i, 'title': f'workflow {i}', 'pipeline_id': 1}),
+    ('tags', 'tags/', 10, lambda i, cube: {'id': i, 'name': f'tag{i}', 'color': 'red'}),
+    ('pipelinesourcefiles', 'pipelines/sourcefiles/', 10,
+     lambda i, cube: {'id': i, 'fname': f'pipelines/p{i}.yml', 'ftype': 'yaml',
+                      'fsize': cube.file_size}),
+    ('userfiles', 'userfiles/', 1000, _user_file),
+    ('pacsfiles', 'pacs/files/', 1000, _pacs_file),
+    ('pacs', 'pacs/', 1, lambda i, cube: {'id': i, 'identifier': 'MINICHRISORTHANC'}),
+    ('pacsqueries', 'pacs/queries/', 10,
+     lambda i, cube: {'id': i, 'title': f'query {i}', 'pacs_id': 1}),
+    ('pacsseries', 'pacs/series/', 10,
+     lambda i, cube: {'id': i, 'SeriesInstanceUID': f'1.2.{i}', 'pacs_id': 1}),
+    ('filebrowser', 'filebrowser/', 10,
+     lambda i, cube: {'id': i, 'path': f'home/cube/folder{i}'}),
+    ('download_tokens', 'downloadtokens/', 0,
+     lambda i, cube: {'id': i, 'token': f'token{i}'}),
+    ('groups', 'groups/', 2, lambda i, cube: {'id': i, 'name': f'group{i}'}),
+    ('user', 'users/', 1,
+     lambda i, cube: {'id': i, 'username': 'cube', 'email': 'cube@example.org'}),
+)
+
+FILE_RESOURCES = ('userfiles', 'pacsfiles', 'pipelinesourcefiles')
+ITEM_RELATIONS = ('chrisinstance', 'user')  # linked from the API root by item url
+
+
+class Resource(object):
+    """
+    Collection of items of the stand-in CUBE. The items' data and their encoded JSON
+    are kept in parallel lists and generated on first use.
+    """
+
+    def __init__(self, relation, path, size, make_data):
+        self.relation = relation
+        self.path = path
+        self.size = size
+        self.make_data = make_data
+        self.data = None
+        self.encoded = None
+        self.index = None  # id -> position
+        self.searches = {}  # search parameters -> positions of the matching items
+        self.lock = threading.Lock()
+
+    def load(self, cube):
+        """
+        Generate the resource's items if they haven't been generated yet.
+        """
+        with self.lock:
+            if self.data is not None:
+                return
+            data = [self.make_data(i, cube) for i in range(1, self.size + 1)]
+            self.encoded = [self.encode(cube, d) for d in data]
+            self.index = {d['id']: pos for pos, d in enumerate(data)}
+            self.data = data
+
+    def encode(self, cube, data):
+        """
+        Encode the Collection+JSON item of an item's data.
+        """
+        item_url = f'{cube.api_url}{self.path}{data["id"]}/'
+        links = []
+        if self.relation == 'plugins':
+            links.append({'rel': 'instances', 'href': f'{item_url}instances/'})
+        elif self.relation == 'plugin_instances':
+            links.append({'rel': 'plugin',
+                          'href': f'{cube.api_url}plugins/{data["plugin_id"]}/'})
+        elif self.relation in FILE_RESOURCES:
+            name = data['fname'].rsplit('/', 1)[-1]
+            links.append({'rel': 'file_resource', 'href': f'{item_url}{name}'})
+        return json.dumps({'href': item_url, 'links': links,
+                           'data': [{'name': k, 'value': v} for k, v in data.items()]
+                           }).encode()
+
+    def add(self, cube, data):
+        """
+        Add a new item given its data (without id) and return its data.
+        """
+        with self.lock:
+            data = dict(data, id=(self.data[-1]['id'] + 1) if self.data else 1)
+            self.index[data['id']] = len(self.data)
+            self.data.append(data)
+            self.encoded.append(self.encode(cube, data))
+            self.searches = {}
+            return data
+
+    def remove(self, id):
+        """
+        Remove an item given its id, return whether it existed.
+        """
+        with self.lock:
+            pos = self.index.get(id)
+            if pos is None:
+                return False
+            del self.data[pos]
+            del self.encoded[pos]
+            self.index = {d['id']: p for p, d in enumerate(self.data)}
+            self.searches = {}
+            return True
+
+    def find(self, id):
+        """
+        Get the position of an item given its id or None.
+        """
+        return self.index.get(id)
+
+    def search(self, params):
+        """
+        Get the positions of the items matching search parameters. Parameters ending
+        in '_exact' and those of non string descriptors match equal values, the
+        others match the values that contain them. The results of the searches that
+        aren't by id are cached until the items change.
+        """
+        with self.lock:
+            if 'id' in params:
+                return self._search(params)
+            key = tuple(sorted(params.items()))
+            positions = self.searches.get(key)
+            if positions is None:
+                positions = self.searches[key] = self._search(params)
+            return positions
+
+    def _search(self, params):
+        if 'id' in params:
+            pos = self.index.get(int(params['id'])) if params['id'].isdigit() else None
+            positions = [] if pos is None else [pos]
+        else:
+            positions = range(len(self.data))
+        filters = [(k[:-6], v, True) if k.endswith('_exact') else (k, v, False)
+                   for k, v in params.items() if k != 'id']
+        if not filters:
+            return list(positions)
+        data = self.data
+        result = []
+        for pos in positions:
+            d = data[pos]
+            for name, value, exact in filters:
+                v = d.get(name)
+                if isinstance(v, str) and not exact:
+                    if value not in v:
+                        break
+                elif str(v) != value:
+                    break
+            else:
+                result.append(pos)
+        return result
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of the stand-in CUBE.
+    """
+    protocol_version = 'HTTP/1.1'  # keep connections alive
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.handle_method(self.get)
+
+    def do_POST(self):
+        self.handle_method(self.post)
+
+    def do_DELETE(self):
+        self.handle_method(self.delete)
+
+    def handle_method(self, handler):
+        cube = self.server
+        parts = urlsplit(self.path)
+        body = self.read_body()
+        cube.record(self.command, self.path, self.headers, body)
+        try:
+            delay = cube.get_delay()
+            if delay:
+                time.sleep(delay)
+            fault = cube.get_fault()
+            if fault == 'drop':
+                self.close_connection = True
+                return
+            if fault is not None:
+                status, retry_after = fault if isinstance(fault, tuple) else (fault, None)
+                headers = {'Retry-After': retry_after} if retry_after else {}
+                return self.answer(status, b'<html>Service Unavailable</html>',
+                                   'text/html', headers)
+            if not parts.path.startswith('/api/v1/'):
+                return self.not_found()
+            params = dict(parse_qsl(parts.query))
+            handler(parts.path[len('/api/v1/'):], params, body)
+        finally:
+            cube.finish()
+
+    def get(self, path, params, body):
+        cube = self.server
+        if path in ('', 'search/'):
+            # the API root is the feeds' collection
+            positions = cube.feeds.search(self.search_params(params)) if path else None
+            return self.answer_page(cube.feeds, path, positions, params,
+                                    links=cube.root_links)
+        resource, rest = cube.route(path)
+        if resource is None:
+            return self.not_found()
+        if rest in ('', 'search/'):
+            positions = resource.search(self.search_params(params)) if rest else None
+            return self.answer_page(resource, path, positions, params)
+
+        m = re.match(r'(\d+)/(.*)$', rest)
+        pos = resource.find(int(m.group(1))) if m else None
+        if pos is None:
+            return self.not_found()
+        if m.group(2) == '':
+            return self.answer_page(resource, path, [pos], {})
+        if m.group(2) == 'instances/' and resource.relation == 'plugins':
+            instances = cube.resources['plugin_instances']
+            positions = instances.search({'plugin_id': m.group(1)})
+            return self.answer_page(instances, path, positions, params)
+        if resource.relation in FILE_RESOURCES and '/' not in m.group(2):
+            return self.answer_file(resource.data[pos]['fsize'])
+        self.not_found()
+
+    def post(self, path, params, body):
+        cube = self.server
+        resource, rest = cube.route(path)
+        if resource is None:
+            return self.not_found()
+        content_type = self.headers.get('Content-Type', '')
+        if content_type.startswith('multipart/form-data'):
+            fields = self.parse_multipart(content_type, body)
+            fname = fields.get('upload_path', b'').decode()
+            data = {'fname': fname, 'fsize': len(fields.get('fname', b'')),
+                    'owner_username': 'cube'}
+        else:
+            template = json.loads(body or b'{}').get('template', {'data': []})
+            data = {d['name']: d['value'] for d in template['data']}
+
+        m = re.match(r'(\d+)/instances/$', rest)
+        if m and resource.relation == 'plugins':
+            pos = resource.find(int(m.group(1)))
+            if pos is None:
+                return self.not_found()
+            plugin = resource.data[pos]
+            resource = cube.resources['plugin_instances']
+            data = dict(data, plugin_id=plugin['id'], plugin_name=plugin['name'],
+                        status='scheduled', feed_id=1, compute_resource_name='host')
+            data.setdefault('title', '')
+            data.setdefault('previous_id', None)
+        elif rest != '':
+            return self.not_found()
+        elif resource.relation == 'download_tokens':
+            data = {'token': f'token{random.getrandbits(64):016x}'}
+        item = resource.add(cube, data)
+        self.answer_page(resource, path, [resource.find(item['id'])], {}, status=201)
+
+    def delete(self, path, params, body):
+        resource, rest = self.server.route(path)
+        m = re.match(r'(\d+)/$', rest or '')
+        if resource is None or m is None or not resource.remove(int(m.group(1))):
+            return self.not_found()
+        self.answer(204, b'')
+
+    def answer_page(self, resource, path, positions, params, links=(), status=200):
+        """
+        Answer with a page of items given their positions (all items if None) and the
+        limit and offset parameters.
+        """
+        cube = self.server
+        total = len(resource.encoded) if positions is None else len(positions)
+        limit = min(int(params.get('limit', cube.page_size)), cube.max_limit)
+        offset = int(params.get('offset', 0))
+        page = range(offset, min(offset + limit, total))
+        if positions is not None:
+            page = [positions[i] for i in page]
+        encoded = resource.encoded
+        links = list(links)
+        url = cube.api_url + path
+        if offset + limit < total:
+            links.append({'rel': 'next', 'href': url + '?' + urlencode(
+                dict(params, limit=limit, offset=offset + limit))})
+        if offset > 0:
+            links.append({'rel': 'previous', 'href': url + '?' + urlencode(
+                dict(params, limit=limit, offset=max(offset - limit, 0)))})
+        body = b''.join((
+            b'{"collection": {"version": "1.0", "href": ', json.dumps(url).encode(),
+            b', "items": [', b', '.join(encoded[pos] for pos in page),
+            b'], "links": ', json.dumps(links).encode(),
+            b', "total": ', str(total).encode(), b'}}'))
+        self.answer(status, body)
+
+    def answer_file(self, size):
+        """
+        Answer with the contents of a file of a given size (or a range of it).
+        """
+        start = 0
+        m = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+        if m:
+            start = int(m.group(1))
+            if start >= size:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{size - 1}/{size}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(size - start))
+        self.end_headers()
+        chunk = PATTERN * 256  # 64 KiB, a multiple of the pattern's length
+        pos = start
+        while pos < size:
+            offset = pos % len(PATTERN)
+            data = chunk[offset:offset + min(len(chunk) - offset, size - pos)]
+            self.wfile.write(data)
+            pos += len(data)
+
+    def answer(self, status, body, content_type='application/vnd.collection+json',
+               headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def not_found(self):
+        self.answer(404, b'{"detail": "Not found."}', 'application/json')
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    @staticmethod
+    def search_params(params):
+        return {k: v for k, v in params.items() if k not in ('limit', 'offset')}
+
+    @staticmethod
+    def parse_multipart(content_type, body):
+        """
+        Get a dictionary of the fields of a multipart body to their contents.
+        """
+        boundary = content_type.split('boundary=', 1)[1].strip('"').encode()
+        fields = {}
+        for part in body.split(b'--' + boundary)[1:-1]:
+            head, _, content = part.partition(b'\r\n\r\n')
+            m = re.search(rb'name="([^"]*)"', head)
+            if m:
+                fields[m.group(1).decode()] = content[:-2]  # without the CRLF
+        return fields
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInCUBE(ThreadingHTTPServer):
+    """
+    Stand-in CUBE server. sizes maps relation names of the API root (e.g.
+    'plugin_instances', 'userfiles') plus 'feeds' to their number of items, file_size
+    is the size of the generated files and page_size the default page size (at most
+    max_limit). Every request is delayed by latency seconds plus a random jitter of up
+    to jitter seconds, and a fraction error_rate of the requests fail with one of the
+    error_statuses. The random choices are made from a generator seeded with seed.
+
+    Faults can also be queued with inject. If keep_log is True then the method, path,
+    headers and body of every request are appended to log. The maximum number of
+    requests handled at the same time is kept in max_active.
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, host='127.0.0.1', port=0, sizes=None, file_size=1024,
+                 page_size=10, max_limit=1000, latency=0, jitter=0, error_rate=0,
+                 error_statuses=(503,), seed=0, keep_log=False):
+        super().__init__((host, port), StandInHandler)
+        self.api_url = f'http://{host}:{self.server_port}/api/v1/'
+        self.sizes = {'feeds': 100, **{r[0]: r[2] for r in RESOURCES},
+                      **(sizes or {})}
+        self.file_size = file_size
+        self.page_size = page_size
+        self.max_limit = max_limit
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.requests = Counter()
+        self.faults = 0
+        self.log = [] if keep_log else None
+        self.active = 0
+        self.max_active = 0
+        self._injected = deque()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.feeds = Resource('feeds', '', self.sizes['feeds'], _feed)
+        self.resources = {relation: Resource(relation, path, self.sizes[relation],
+                                             make_data)
+                          for relation, path, _, make_data in RESOURCES}
+        self._routes = sorted(self.resources.values(), key=lambda r: -len(r.path))
+        self.root_links = [{'rel': r.relation, 'href': self.api_url + r.path + (
+            '1/' if r.relation in ITEM_RELATIONS else '')}
+            for r in self.resources.values()]
+
+    @property
+    def url(self):
+        return self.api_url
+
+    def route(self, path):
+        """
+        Get the resource of a path relative to the API root and the rest of the path
+        (or None and None).
+        """
+        for resource in self._routes:
+            if path.startswith(resource.path):
+                rest = path[len(resource.path):]
+                if rest[:1].isdigit() or rest in ('', 'search/'):
+                    return resource, rest
+        return None, None
+
+    def record(self, method, path, headers, body):
+        with self._lock:
+            self.requests[method] += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            if self.log is not None:
+                self.log.append((method, path, dict(headers), body))
+
+    def finish(self):
+        with self._lock:
+            self.active -= 1
+
+    def inject(self, *faults):
+        """
+        Queue faults to answer the next requests with before answering normally. A
+        fault is an error status, an (error status, Retry-After value) tuple or 'drop'
+        to close the connection without answering.
+        """
+        with self._lock:
+            self._injected.extend(faults)
+
+    def get_delay(self):
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.jitter)
+
+    def get_fault(self):
+        """
+        Get the next queued fault, the error status of a random fault or None.
+        """
+        if not self.error_rate and not self._injected:
+            return None
+        with self._lock:
+            if self._injected:
+                self.faults += 1
+                return self._injected.popleft()
+            if not self.error_rate or self._random.random() >= self.error_rate:
+                return None
+            self.faults += 1
+            return self._random.choice(self.error_statuses)
+
+    def load(self):
+        """
+        Generate the items of all the resources.
+        """
+        self.feeds.load(self)
+        for resource in self.resources.values():
+            resource.load(self)
+
+    def start(self):
+        """
+        Serve requests in a background thread.
+        """
+        self.load()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the server's socket.
+        """
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def main():
+    parser = ArgumentParser(description='Stand-in CUBE server')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8010, help='port to listen on')
+    parser.add_argument('--instances', type=int, default=1000,
+                        help='number of plugin instances')
+    parser.add_argument('--files', type=int, default=1000, help='number of user files')
+    parser.add_argument('--file-size', type=int, default=1024,
+                        help='size in bytes of the generated files')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='seconds every request is delayed')
+    parser.add_argument('--jitter', type=float, default=0,
+                        help='maximum random extra delay in seconds')
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='fraction of requests that fail with a 503')
+    args = parser.parse_args()
+
+    cube = StandInCUBE(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                       error_rate=args.error_rate, file_size=args.file_size,
+                       sizes={'plugin_instances': args.instances,
+                              'userfiles': args.files})
+    print(f'Stand-in CUBE serving at {cube.url}', flush=True)
+    try:
+        cube.load()
+        cube.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cube.server_close()
+
+
+if __name__ == '__main__':
+    main()
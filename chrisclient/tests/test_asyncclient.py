@@ -0,0 +1,128 @@
+import io
+import os
+import asyncio
+import tempfile
+from unittest import TestCase
+
+import pytest
+
+pytest.importorskip('aiohttp')  # the 'async' extra
+
+from chrisclient import asyncclient
+from chrisclient.client import Client
+from chrisclient.urlcache import UrlCache
+from chrisclient.exceptions import ChrisRequestException
+from chrisclient.tests.standin import StandInCUBE
+
+
+class AsyncClientTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cube = StandInCUBE(keep_log=True)
+        cls.cube.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cube.stop()
+
+    def setUp(self):
+        self.chris_url = self.cube.url
+        self.username = "cube"
+        self.password = "cube1234"
+
+    def run_with_client(self, coro_func, **kwargs):
+        async def main():
+            async with asyncclient.AsyncClient(self.chris_url, **kwargs) as cl:
+                return await coro_func(cl)
+        return asyncio.run(main())
+
+    def test_get_plugin_by_id(self):
+        """
+        Test whether the get_plugin_by_id method can get a plugin representation from CUBE.
+        """
+        response = self.run_with_client(lambda cl: cl.get_plugin_by_id(1),
+                                        username=self.username, password=self.password)
+        self.assertEqual(response['id'], 1)
+
+    def test_get_plugins_with_search_args_unauthenticated(self):
+        """
+        Test whether the get_plugins method can get a list of plugin representations
+        from CUBE given query search parameters for unauthenticated users.
+        """
+        response = self.run_with_client(
+            lambda cl: cl.get_plugins({'name_exact': "pl-3"}))
+        self.assertEqual(response['data'][0]['name'], "pl-3")
+
+    def test_gather_by_id(self):
+        """
+        Test whether the gather_by_id method can concurrently get plugin representations
+        from CUBE in the same order as the given ids.
+        """
+        response = self.run_with_client(
+            lambda cl: cl.gather_by_id(cl.get_plugin_by_id, [2, 1, 2]),
+            username=self.username, password=self.password)
+        self.assertEqual([plg['id'] for plg in response], [2, 1, 2])
+
+    def test_gather_by_id_return_exceptions(self):
+        """
+        Test whether the gather_by_id method returns the failed lookups as exceptions
+        when return_exceptions is True.
+        """
+        response = self.run_with_client(
+            lambda cl: cl.gather_by_id(cl.get_plugin_by_id, [1, 10 ** 9],
+                                       return_exceptions=True),
+            username=self.username, password=self.password)
+        self.assertEqual(response[0]['id'], 1)
+        self.assertIsInstance(response[1], ChrisRequestException)
+
+    def test_create_related_missing_link(self):
+        """
+        Test whether creating an item through a link relation that the resource doesn't
+        have raises ChrisRequestException.
+        """
+        with self.assertRaises(ChrisRequestException):
+            self.run_with_client(lambda cl: cl.create_plugin_instance_split(1),
+                                 username=self.username, password=self.password)
+
+    def test_upload_file_name(self):
+        """
+        Test whether the uploaded file is named after the basename of the local file.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fname = os.path.join(tmp_dir, 'a.txt')
+            with open(fname, 'wb') as f:
+                f.write(b'chris')
+            self.cube.log.clear()
+            self.run_with_client(lambda cl: cl.upload_file('cube/a.txt', fname),
+                                 username=self.username, password=self.password)
+        body = [body for method, _, _, body in self.cube.log if method == 'POST'][0]
+        self.assertIn(b'filename="a.txt"', body)
+
+    def test_stale_urls_rediscovered(self):
+        """
+        Test whether the client discovers the urls again from the API root when the
+        cached ones are stale.
+        """
+        async def main(url_cache):
+            async with asyncclient.AsyncClient(self.chris_url, self.username,
+                                               self.password, url_cache=url_cache) as cl:
+                await cl.set_urls()
+                self.assertTrue(cl.plugins_url.endswith('/api/v1/old/plugins/'))
+                self.assertEqual((await cl.get_plugins())['total'], 50)
+                await cl.upload_file('cube/a.txt', io.BytesIO(b'a'))
+                self.assertEqual(cl.plugins_url, self.chris_url + 'plugins/')
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cl = Client(self.chris_url, self.username, self.password)
+            cl.set_urls()
+            # as if CUBE had been redeployed with its resources under other paths
+            urls = {url_attr: url.replace('/api/v1/', '/api/v1/old/')
+                    for url_attr, url in vars(cl).items()
+                    if url_attr.endswith('_url') and url and url != self.chris_url}
+            cl.close()
+            url_cache = UrlCache(os.path.join(tmp_dir, 'urls.json'))
+            url_cache.set(UrlCache.make_key(self.chris_url, {'username': self.username,
+                                                             'password': self.password}),
+                          urls)
+            asyncio.run(main(url_cache))
@@ -0,0 +1,95 @@
+import time
+from unittest import TestCase
+
+from chrisclient.cache import ResponseCache
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        self.plugins_url = 'http://localhost:8000/api/v1/plugins/'
+        self.feeds_url = 'http://localhost:8000/api/v1/'
+
+    def test_ttl_for_longest_fragment(self):
+        """
+        Test whether the TTL of a url is given by its longest matching path fragment.
+        """
+        cache = ResponseCache(ttl=5, ttls={'/plugins/': 60, '/parameters/': 10})
+        self.assertEqual(cache.ttl_for(self.plugins_url), 60)
+        self.assertEqual(cache.ttl_for(self.plugins_url + '1/parameters/'), 10)
+        self.assertEqual(cache.ttl_for(self.feeds_url), 5)
+
+    def test_set_get_fresh_and_stale(self):
+        """
+        Test whether a cached entry is fresh within its TTL and stale afterwards.
+        """
+        cache = ResponseCache(ttl=0.01)
+        cache.set('k', self.plugins_url, b'{}', etag='"1"')
+        self.assertTrue(cache.get('k').is_fresh())
+        time.sleep(0.02)
+        entry = cache.get('k')
+        self.assertFalse(entry.is_fresh())
+        self.assertTrue(entry.has_validators())
+        cache.refresh(entry)
+        self.assertTrue(entry.is_fresh())
+
+    def test_no_ttl_no_validators_is_not_cached(self):
+        """
+        Test whether a response without TTL nor validators is not cached.
+        """
+        cache = ResponseCache(ttl=0)
+        cache.set('k', self.plugins_url, b'{}')
+        self.assertIsNone(cache.get('k'))
+
+    def test_lru_eviction(self):
+        """
+        Test whether the least recently used entry is evicted when the cache is full.
+        """
+        cache = ResponseCache(maxsize=2, ttl=60)
+        cache.set('a', self.plugins_url, b'a')
+        cache.set('b', self.plugins_url, b'b')
+        cache.get('a')
+        cache.set('c', self.plugins_url, b'c')
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_invalidate(self):
+        """
+        Test whether the entries under a written url are invalidated.
+        """
+        cache = ResponseCache(ttl=60)
+        cache.set('a', self.plugins_url + '1/instances/', b'a')
+        cache.set('b', self.feeds_url, b'b')
+        cache.invalidate(self.plugins_url)
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('b'))
+
+    def test_invalidate_search(self):
+        """
+        Test whether a write invalidates the list and search entries of its resource
+        but not the other items.
+        """
+        cache = ResponseCache(ttl=60)
+        instances_url = self.plugins_url + 'instances/'
+        cache.set('a', instances_url + 'search/?plugin_name=pl-dircopy', b'a')
+        cache.set('b', instances_url + '?limit=10&offset=10', b'b')
+        cache.set('c', instances_url + '7/', b'c')
+        cache.set('d', self.plugins_url + 'search/?name=pl-dircopy', b'd')
+        cache.invalidate(self.plugins_url + '3/instances/')
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertIsNotNone(cache.get('d'))
+
+    def test_default_ttl_only_caches_listed_resources(self):
+        """
+        Test whether by default only the resources with an explicit TTL are cached.
+        """
+        cache = ResponseCache(ttls={'/plugins/': 60, '/plugins/instances/': 0})
+        cache.set('a', self.plugins_url, b'a')
+        cache.set('b', self.plugins_url + 'instances/1/', b'b')
+        cache.set('c', self.feeds_url, b'c')
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNone(cache.get('c'))
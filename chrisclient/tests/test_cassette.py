@@ -0,0 +1,90 @@
+import os
+import json
+import tempfile
+from unittest import TestCase
+
+from chrisclient import client
+from chrisclient.request import Request
+from chrisclient.cassette import Cassette
+from chrisclient.exceptions import ChrisRequestException
+from chrisclient.tests.standin import StandInCUBE, PATTERN
+
+
+class CassetteTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cube = StandInCUBE(keep_log=True).start()
+        cls.url = cls.cube.url
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cube.stop()
+
+    def setUp(self):
+        self.cube.log.clear()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'cassette.json')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def record(self, url):
+        cl = client.Client(url, 'cube', 'cube1234', session=Request.create_session(
+            transport=Cassette(self.path, mode='record')))
+        plugins = [cl.get_plugins({'name_exact': 'pl-3'}), cl.get_plugins()]
+        cl.download_file(1, os.path.join(self.tmp_dir.name, 'a.bin'))
+        cl.close()
+        return plugins
+
+    def test_replay(self):
+        """
+        Test whether the recorded exchanges are replayed without reaching the server,
+        whatever the base url and the order of the query parameters.
+        """
+        recorded = self.record(self.url)
+        n_requests = len(self.cube.log)
+
+        cassette = Cassette(self.path)
+        cl = client.Client('http://cube.example.org/api/v1/',
+                           session=Request.create_session(transport=cassette))
+        self.assertEqual([cl.get_plugins({'name_exact': 'pl-3'}), cl.get_plugins()],
+                         recorded)
+        self.assertEqual(recorded[0]['data'][0]['name'], 'pl-3')
+        local_path = os.path.join(self.tmp_dir.name, 'b.bin')
+        cl.download_file(1, local_path)
+        with open(local_path, 'rb') as f:
+            self.assertEqual(f.read(), PATTERN * 4)
+        self.assertEqual(len(self.cube.log), n_requests)
+
+    def test_cassette_has_no_credentials(self):
+        """
+        Test whether the request headers are not recorded and the download tokens are
+        scrubbed from the recorded urls and responses.
+        """
+        self.record(self.url)
+        with open(self.path) as f:
+            content = f.read()
+        self.assertNotIn('Authorization', content)
+        token = [path for _, path, _, _ in self.cube.log if 'download_token=' in path][0]
+        self.assertNotIn(token.split('download_token=')[1], content)
+        self.assertIn('download_token=scrubbed', content)
+        self.assertEqual(len(json.loads(content)['interactions']), 6)
+
+    def test_unrecorded_request(self):
+        """
+        Test whether a request without a recorded response raises an exception.
+        """
+        self.record(self.url)
+        req = Request(session=Request.create_session(transport=Cassette(self.path)))
+        with self.assertRaises(ChrisRequestException):
+            req.get(self.url + 'tags/')
+
+    def test_once_mode(self):
+        """
+        Test whether a cassette in 'once' mode records when the file doesn't exist and
+        replays otherwise.
+        """
+        self.assertEqual(Cassette(self.path, mode='once').mode, 'record')
+        self.record(self.url)
+        self.assertEqual(Cassette(self.path, mode='once').mode, 'replay')
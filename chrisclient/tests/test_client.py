@@ -1,5 +1,7 @@
 
+import os
 import json
+import tempfile
 from random import randint
 from unittest import TestCase
 from unittest import mock
@@ -60,6 +62,18 @@ class ClientTests(TestCase):
         response = cl.get_plugin_parameters(plugin_id, {'limit': 50, 'offset': 0})
         self.assertEqual(response['data'][0]['name'], "dir")
 
+    def test_get_plugin_parameters_of_seen_plugin(self):
+        """
+        Test whether the get_plugin_parameters method can get the plugin parameters of an
+        already seen plugin through its remembered parameters link.
+        """
+        plugin_id = self.fs_plg_id
+        with mock.patch.object(self.client, '_fetch_resource') as fetch_mock:
+            response = self.client.get_plugin_parameters(plugin_id,
+                                                         {'limit': 50, 'offset': 0})
+            fetch_mock.assert_not_called()
+        self.assertEqual(response['data'][0]['name'], "dir")
+
     def test_get_plugins_with_no_args(self):
         """
         Test whether the get_plugins method can get the list of all plugin representations
@@ -85,6 +99,34 @@ class ClientTests(TestCase):
         response = self.client.get_plugins({'name_exact': "pl-dircopy"})
         self.assertEqual(response['data'][0]['name'], "pl-dircopy")
 
+    def test_iter_plugins(self):
+        """
+        Test whether the iter_plugins method can lazily get all the plugin representations
+        from CUBE across several pages.
+        """
+        response = self.client.get_plugins({'limit': 1})
+        plugins = list(self.client.iter_plugins({'limit': 1}, prefetch=True))
+        self.assertEqual(len(plugins), response['total'])
+        self.assertEqual(plugins[0]['id'], response['data'][0]['id'])
+
+    def test_fetch_all(self):
+        """
+        Test whether the fetch_all method can concurrently get all the plugin
+        representations from CUBE in the same order as the sequential listing.
+        """
+        plugins = self.client.fetch_all('plugins', {'limit': 1}, workers=2)
+        self.assertEqual([plg['id'] for plg in plugins],
+                         [plg['id'] for plg in self.client.iter_plugins({'limit': 1})])
+
+    def test_iter_plugin_parameters(self):
+        """
+        Test whether the iter_plugin_parameters method can lazily get all the plugin
+        parameter representations for the given plugin from CUBE.
+        """
+        plugin_id = self.fs_plg_id
+        parameters = list(self.client.iter_plugin_parameters(plugin_id, {'limit': 1}))
+        self.assertEqual(parameters[0]['name'], "dir")
+
     def test_create_plugin_instance(self):
         """
         Test whether create_plugin_instance method can create a new plugin instance
@@ -98,6 +140,19 @@ class ClientTests(TestCase):
         response = self.client.create_plugin_instance(plugin_id, data)
         self.assertEqual(response['title'], data['title'])
 
+    def test_create_plugin_instances(self):
+        """
+        Test whether create_plugin_instances method can create several new plugin
+        instances through the REST API and return them in the input order.
+        """
+        plugin_id = self.fs_plg_id
+        data_list = [{'title': f'Test plugin instance {i}',
+                      'dir': 'home/' + self.username + '/uploads'} for i in range(3)]
+        response = self.client.create_plugin_instances(plugin_id, data_list,
+                                                       concurrency=2)
+        self.assertEqual([plg_inst['title'] for plg_inst in response],
+                         [data['title'] for data in data_list])
+
     def test_get_pipeline_by_id(self):
         """
         Test whether the get_pipeline_by_id method can get a pipeline representation from
@@ -153,6 +208,40 @@ class ClientTests(TestCase):
         response = self.client.get_workflow_plugin_instances(workflow_id, data)
         self.assertEqual(response['total'], 3)
 
+    def test_upload_directory(self):
+        """
+        Test whether the upload_directory method can upload a local directory tree to
+        the user's space in CUBE and skip the already uploaded files when called again.
+        """
+        with tempfile.TemporaryDirectory() as local_dir:
+            os.makedirs(os.path.join(local_dir, 'sub'))
+            for rel_path in ('a.txt', os.path.join('sub', 'b.txt')):
+                with open(os.path.join(local_dir, rel_path), 'w') as f:
+                    f.write(rel_path)
+            upload_path = f'home/{self.username}/uploads/dir{randint(1000, 9000)}'
+            report = self.client.upload_directory(local_dir, upload_path, workers=2)
+            self.assertEqual(len(report['uploaded']), 2)
+            self.assertEqual(report['failed'], {})
+            report = self.client.upload_directory(local_dir, upload_path, workers=2)
+            self.assertEqual(len(report['skipped']), 2)
+            self.assertEqual(report['uploaded'], [])
+
+    def test_download_files(self):
+        """
+        Test whether the download_files method can download the user files matching
+        the search parameters from CUBE to a local directory.
+        """
+        upload_path = f'home/{self.username}/uploads/dl{randint(1000, 9000)}'
+        with tempfile.TemporaryDirectory() as local_dir:
+            local_path = os.path.join(local_dir, 'a.txt')
+            with open(local_path, 'w') as f:
+                f.write('chris')
+            self.client.upload_file(upload_path + '/a.txt', local_path)
+            report = self.client.download_files({'fname': upload_path + '/'}, local_dir)
+            self.assertEqual(report['failed'], {})
+            with open(os.path.join(local_dir, *upload_path.split('/'), 'a.txt')) as f:
+                self.assertEqual(f.read(), 'chris')
+
     def test_get_user(self):
         """
         Test whether the get_user method can get a user representation from CUBE.
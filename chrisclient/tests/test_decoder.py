@@ -0,0 +1,56 @@
+import json
+from unittest import TestCase
+
+from chrisclient import decoder
+from chrisclient.request import Request
+from chrisclient.exceptions import ChrisRequestException
+
+
+class DecoderTests(TestCase):
+
+    def setUp(self):
+        self.body = json.dumps({'collection': {
+            'version': '1.0',
+            'href': 'http://localhost:8000/api/v1/plugins/',
+            'items': [{'href': 'http://localhost:8000/api/v1/plugins/1/',
+                       'data': [{'name': 'id', 'value': 1},
+                                {'name': 'name', 'value': 'pl-dircopy'}],
+                       'links': [{'rel': 'parameters',
+                                  'href': 'http://localhost:8000/api/v1/plugins/1/parameters/'}]}],
+            'links': [{'rel': 'next',
+                       'href': 'http://localhost:8000/api/v1/plugins/?limit=1&offset=1'}],
+            'total': 2}}).encode()
+
+    def test_decode_collection(self):
+        """
+        Test whether the decode_collection function decodes the items' descriptors and
+        links and the collection's total.
+        """
+        coll = decoder.decode_collection(self.body)
+        self.assertEqual(coll.items[0].data, {'id': 1, 'name': 'pl-dircopy'})
+        self.assertEqual(Request.get_link_relation_urls(coll.items[0], 'parameters'),
+                         ['http://localhost:8000/api/v1/plugins/1/parameters/'])
+        self.assertEqual(coll.total, 2)
+
+    def test_decode_collection_error(self):
+        """
+        Test whether the decode_collection function raises ChrisRequestException for a
+        document with an error object.
+        """
+        body = json.dumps({'collection': {'version': '1.0', 'href': '',
+                                          'error': {'message': 'Not found'}}})
+        with self.assertRaises(ChrisRequestException):
+            decoder.decode_collection(body)
+
+    def test_decode_collection_json_backend(self):
+        """
+        Test whether the decode_collection function gives the same result without the
+        orjson backend.
+        """
+        orjson = decoder.orjson
+        decoder.orjson = None
+        try:
+            coll = decoder.decode_collection(self.body.decode())
+        finally:
+            decoder.orjson = orjson
+        self.assertEqual(coll.items[0].data, {'id': 1, 'name': 'pl-dircopy'})
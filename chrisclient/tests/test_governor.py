@@ -0,0 +1,83 @@
+import io
+import time
+import threading
+from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
+
+from chrisclient.request import Request
+from chrisclient.governor import TokenBucket, Limit, Governor
+from chrisclient.tests.standin import StandInCUBE
+
+
+class GovernorTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cube = StandInCUBE(latency=0.02).start()
+        cls.url = cls.cube.url
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cube.stop()
+
+    def setUp(self):
+        self.cube.max_active = 0
+
+    def test_token_bucket_rate(self):
+        """
+        Test whether a token bucket lets through its burst at once and then at most
+        rate acquisitions per second.
+        """
+        bucket = TokenBucket(rate=100, burst=5)
+        start = time.monotonic()
+        for _ in range(15):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_limit_queue_depth(self):
+        """
+        Test whether the requests waiting for a slot are counted as the queue depth.
+        """
+        governor = Governor(write=Limit(max_in_flight=1))
+
+        def write():
+            with governor.slot('write'):
+                pass
+
+        with governor.slot('write'):
+            thread = threading.Thread(target=write)
+            thread.start()
+            time.sleep(0.05)
+            self.assertEqual(governor.queue_depth('write'), 1)
+            self.assertEqual(governor.stats()['write']['in_flight'], 1)
+        thread.join()
+        self.assertEqual(governor.queue_depth(), 0)
+
+    def test_max_in_flight_shared_across_requests(self):
+        """
+        Test whether a governor shared by two Request objects keeps their combined
+        reads within the max in flight limit.
+        """
+        governor = Governor(read=Limit(max_in_flight=3))
+        requests = [Request(governor=governor), Request(governor=governor)]
+        with ThreadPoolExecutor(max_workers=12) as executor:
+            list(executor.map(lambda i: requests[i % 2].get(self.url), range(24)))
+        self.assertLessEqual(self.cube.max_active, 3)
+        self.assertEqual(governor.stats()['read']['in_flight'], 0)
+
+    def test_classes_limited_separately(self):
+        """
+        Test whether uploads are limited separately from reads.
+        """
+        governor = Governor(read=Limit(max_in_flight=8), upload=Limit(max_in_flight=1))
+        req = Request(governor=governor)
+
+        def upload(i):
+            req.post(self.url + 'userfiles/', {'upload_path': f'a/{i}'},
+                     io.BytesIO(b'x' * 100))
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            list(executor.map(upload, range(6)))
+        self.assertEqual(self.cube.max_active, 1)
+        self.assertEqual(Governor.classify('POST', upload=True), 'upload')
+        self.assertEqual(Governor.classify('DELETE'), 'write')
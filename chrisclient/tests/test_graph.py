@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+from chrisclient.graph import FeedGraph
+
+
+class FeedGraphTests(TestCase):
+
+    def setUp(self):
+        self.graph = FeedGraph([
+            {'id': 3, 'previous_id': 1, 'status': 'started',
+             'start_date': '2024-01-01T00:00:00Z', 'end_date': '2024-01-01T00:00:01Z'},
+            {'id': 1, 'previous_id': None, 'status': 'finishedSuccessfully',
+             'start_date': '2024-01-01T00:00:00Z', 'end_date': '2024-01-01T00:00:10Z'},
+            {'id': 2, 'previous_id': 1, 'status': 'finishedSuccessfully',
+             'start_date': '2024-01-01T00:00:00Z', 'end_date': '2024-01-01T00:01:00Z'},
+            {'id': 4, 'previous_id': 3, 'status': 'scheduled'}])
+
+    def test_structure(self):
+        """
+        Test whether the nodes are linked to their parent and children and iterated in
+        topological order.
+        """
+        self.assertEqual([node.id for node in self.graph.roots], [1])
+        self.assertEqual([node.id for node in self.graph[1].children], [2, 3])
+        self.assertEqual([node.id for node in self.graph], [1, 2, 3, 4])
+        self.assertEqual(self.graph[4].depth, 2)
+        self.assertEqual(self.graph.depth(), 3)
+        self.assertEqual([node.id for node in self.graph.leaves()], [2, 4])
+
+    def test_critical_path(self):
+        """
+        Test whether the critical path is the chain with the longest total run time.
+        """
+        self.assertEqual([node.id for node in self.graph.critical_path()], [1, 2])
+
+    def test_status_summary(self):
+        """
+        Test whether the status summary counts the nodes per status.
+        """
+        self.assertEqual(self.graph.status_summary(),
+                         {'finishedSuccessfully': 2, 'started': 1, 'scheduled': 1})
+        self.assertFalse(self.graph.is_finished())
@@ -0,0 +1,100 @@
+from unittest import TestCase
+
+import requests
+
+from chrisclient import client
+from chrisclient.request import Request
+from chrisclient.metrics import RequestMetrics
+from chrisclient.resilience import RetryPolicy
+from chrisclient.tests.standin import StandInCUBE
+
+
+class RecordingHook(object):
+    """
+    Hook that adds a header to every request and keeps the info of the finished ones.
+    """
+
+    def __init__(self):
+        self.finished = []
+
+    def pre_request(self, info):
+        info['headers']['X-Request-Id'] = str(len(self.finished))
+
+    def post_request(self, info):
+        self.finished.append(dict(info))
+
+
+class MetricsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cube = StandInCUBE(keep_log=True).start()
+        cls.url = cls.cube.url
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cube.stop()
+
+    def setUp(self):
+        self.cube.log.clear()
+
+    def test_resource_name(self):
+        """
+        Test whether resources are named after their url's path without the API
+        prefix, ids, 'search' suffix and file names.
+        """
+        name = RequestMetrics.resource_name
+        self.assertEqual(name(self.url + 'plugins/search/?name=pl-dircopy'), 'plugins')
+        self.assertEqual(name(self.url + 'plugins/3/instances/'), 'plugins/instances')
+        self.assertEqual(name(self.url + 'files/157/image.dcm'), 'files')
+        self.assertEqual(name(self.url), 'root')
+
+    def test_hooks_called_around_requests(self):
+        """
+        Test whether the hooks are called around every request and a pre request hook
+        can add headers to it.
+        """
+        hook = RecordingHook()
+        req = Request(hooks=[hook])
+        req.get(self.url + 'plugins/')
+        req.post(self.url + 'plugins/1/instances/', {'title': 'a'})
+        self.assertEqual(self.cube.log[1][2]['X-Request-Id'], '1')
+        self.assertEqual([(i['method'], i['resource'], i['status'])
+                          for i in hook.finished],
+                         [('GET', 'plugins', 200), ('POST', 'plugins/instances', 201)])
+        self.assertGreater(hook.finished[1]['bytes_sent'], 0)
+        self.assertEqual(hook.finished[0]['bytes_received'],
+                         len(requests.get(self.url + 'plugins/').content))
+
+    def test_metrics_recorded(self):
+        """
+        Test whether every try of a request is recorded with its status, error and
+        latency.
+        """
+        metrics = RequestMetrics(buckets=(0.5,))
+        req = Request(retry=RetryPolicy(retries=2, backoff_factor=0.001),
+                      hooks=[metrics])
+        self.cube.inject(503)
+        req.get(self.url + 'tags/')
+        stats = metrics.snapshot()['tags']
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['retries'], 1)
+        self.assertEqual(stats['errors'], 1)
+        self.assertEqual(stats['statuses'], {503: 1, 200: 1})
+        self.assertEqual(sum(stats['histogram'].values()), 2)
+        self.assertEqual(stats['histogram'][0.5], 2)
+
+        metrics.reset()
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_client_stats(self):
+        """
+        Test whether a client's stats include its request metrics.
+        """
+        cl = client.Client(self.url, 'cube', 'cube1234')
+        cl._request.get(self.url + 'pipelines/')
+        stats = cl.stats()
+        self.assertEqual(stats['requests']['pipelines']['methods'], {'GET': 1})
+        self.assertIsNone(stats['cache'])
+        self.assertIsNone(stats['governor'])
+        cl.close()
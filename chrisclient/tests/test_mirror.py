@@ -0,0 +1,96 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from chrisclient.mirror import ObjectStore, Manifest
+
+
+class ObjectStoreTests(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = ObjectStore(os.path.join(self.tmp_dir.name, 'objects'))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def download(self, key, content):
+        path = self.store.incoming_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_add_stores_identical_content_once(self):
+        """
+        Test whether two downloads with identical content are stored as one object.
+        """
+        digest1 = self.store.add(self.download('a', b'chris'))
+        digest2 = self.store.add(self.download('b', b'chris'))
+        self.assertEqual(digest1, digest2)
+        self.assertTrue(self.store.has(digest1))
+        self.assertFalse(os.path.exists(self.store.incoming_path('b')))
+
+    def test_link(self):
+        """
+        Test whether an object can be linked into several local paths that share its
+        content.
+        """
+        digest = self.store.add(self.download('a', b'chris'))
+        path1 = os.path.join(self.tmp_dir.name, 'feed_1', 'a.txt')
+        path2 = os.path.join(self.tmp_dir.name, 'feed_2', 'a.txt')
+        self.store.link(digest, path1)
+        self.store.link(digest, path2)
+        with open(path2, 'rb') as f:
+            self.assertEqual(f.read(), b'chris')
+        self.assertTrue(os.path.samefile(path1, path2))
+
+    def test_copy(self):
+        """
+        Test whether an object can be copied into several local paths that can be
+        edited independently of each other and of the store.
+        """
+        digest = self.store.add(self.download('a', b'chris'))
+        path1 = os.path.join(self.tmp_dir.name, 'feed_1', 'a.txt')
+        path2 = os.path.join(self.tmp_dir.name, 'feed_2', 'a.txt')
+        self.store.copy(digest, path1)
+        self.store.copy(digest, path2)
+        with open(path1, 'ab') as f:
+            f.write(b' edited')
+        with open(path2, 'rb') as f:
+            self.assertEqual(f.read(), b'chris')
+        with open(self.store.object_path(digest), 'rb') as f:
+            self.assertEqual(f.read(), b'chris')
+        self.assertFalse(os.path.samefile(path1, path2))
+
+
+class ManifestTests(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'manifest.json')
+        self.descriptors = {'id': 1, 'fname': 'home/cube/a.txt', 'fsize': 5,
+                            'creation_date': '2024-01-01T00:00:00Z'}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_save_load(self):
+        """
+        Test whether the saved entries can be read back by another manifest object.
+        """
+        manifest = Manifest(self.path)
+        manifest.entries['home/cube/a.txt'] = dict(self.descriptors, sha256='ab')
+        manifest.save()
+        self.assertTrue(Manifest(self.path).is_current('home/cube/a.txt',
+                                                       self.descriptors))
+
+    def test_is_current_changed_file(self):
+        """
+        Test whether an entry is not current when the remote file has changed.
+        """
+        manifest = Manifest(self.path)
+        manifest.entries['home/cube/a.txt'] = dict(self.descriptors, sha256='ab')
+        self.assertFalse(manifest.is_current('home/cube/a.txt',
+                                             dict(self.descriptors, fsize=6)))
+        self.assertFalse(manifest.is_current('home/cube/b.txt', self.descriptors))
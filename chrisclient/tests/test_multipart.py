@@ -0,0 +1,55 @@
+import io
+import email
+from unittest import TestCase
+
+from chrisclient.multipart import MultipartEncoder
+
+
+class MultipartEncoderTests(TestCase):
+
+    def setUp(self):
+        self.contents = b'0123456789' * 1000
+        self.fields = {'upload_path': 'home/cube/uploads/file.bin'}
+
+    def read_all(self, encoder, size):
+        body = b''
+        while True:
+            chunk = encoder.read(size)
+            if not chunk:
+                return body
+            body += chunk
+
+    def test_body_is_valid_multipart(self):
+        """
+        Test whether the encoded body can be parsed back into the fields and the file.
+        """
+        encoder = MultipartEncoder(self.fields, 'fname', io.BytesIO(self.contents))
+        body = self.read_all(encoder, 100)
+        self.assertEqual(len(body), len(encoder))
+
+        msg = email.message_from_bytes(
+            f'Content-Type: {encoder.content_type}\r\n\r\n'.encode() + body)
+        parts = {p.get_param('name', header='content-disposition'):
+                     p.get_payload(decode=True) for p in msg.get_payload()}
+        self.assertEqual(parts['upload_path'], b'home/cube/uploads/file.bin')
+        self.assertEqual(parts['fname'], self.contents)
+
+    def test_read_is_bounded_by_chunk_size(self):
+        """
+        Test whether a read never returns more than chunk_size bytes.
+        """
+        encoder = MultipartEncoder(self.fields, 'fname', io.BytesIO(self.contents),
+                                   chunk_size=512)
+        self.assertEqual(len(encoder.read()), 512)
+        self.assertEqual(len(encoder.read(10 ** 6)), 512)
+
+    def test_progress_callback(self):
+        """
+        Test whether the progress callback is called up to the total length.
+        """
+        progress = []
+        encoder = MultipartEncoder(self.fields, 'fname', io.BytesIO(self.contents),
+                                   progress_callback=lambda sent, total:
+                                   progress.append((sent, total)))
+        self.read_all(encoder, 1000)
+        self.assertEqual(progress[-1], (len(encoder), len(encoder)))
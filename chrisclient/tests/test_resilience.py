@@ -0,0 +1,151 @@
+import io
+import time
+from unittest import TestCase
+
+import requests
+
+from chrisclient.request import Request
+from chrisclient.resilience import RetryPolicy, CircuitBreaker
+from chrisclient.exceptions import ChrisRequestException, ChrisCircuitOpenException
+from chrisclient.tests.standin import StandInCUBE
+
+
+class ResilienceTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cube = StandInCUBE(keep_log=True).start()
+        cls.url = cls.cube.url + 'chrisinstance/'  # a single item collection
+        cls.post_url = cls.cube.url + 'tags/'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cube.stop()
+
+    def setUp(self):
+        self.cube.log.clear()
+        self.retry = RetryPolicy(retries=3, backoff_factor=0.001)
+
+    def test_get_retried_on_transient_status(self):
+        """
+        Test whether a GET request is retried until it succeeds on 502 and 503 errors.
+        """
+        self.cube.inject(502, 503)
+        coll = Request(retry=self.retry).get(self.url)
+        self.assertEqual(coll.items[0].data['id'], 1)
+        self.assertEqual(len(self.cube.log), 3)
+
+    def test_get_retried_on_dropped_connection(self):
+        """
+        Test whether a GET request is retried when the connection is dropped.
+        """
+        self.cube.inject('drop')
+        coll = Request(retry=self.retry).get(self.url)
+        self.assertEqual(coll.total, 1)
+        self.assertEqual(len(self.cube.log), 2)
+
+    def test_retries_exhausted(self):
+        """
+        Test whether the connection error is raised once the retries are exhausted.
+        """
+        self.cube.inject(*['drop'] * 4)
+        with self.assertRaises(ChrisRequestException):
+            Request(retry=self.retry).get(self.url)
+        self.assertEqual(len(self.cube.log), 4)
+
+    def test_post_without_key_not_retried(self):
+        """
+        Test whether a POST request without an idempotency key is not retried.
+        """
+        self.cube.inject(502)
+        with self.assertRaises(ValueError):
+            Request(retry=self.retry).post(self.post_url, {'title': 'a'})
+        self.assertEqual(len(self.cube.log), 1)
+
+    def test_post_with_key_retried(self):
+        """
+        Test whether a POST request with an idempotency key is retried and sends the
+        key and the same body every time.
+        """
+        self.cube.inject(503, 'drop')
+        Request(retry=self.retry).post(self.post_url, {'title': 'a'},
+                                       idempotency_key='k1')
+        self.assertEqual(len(self.cube.log), 3)
+        self.assertEqual({(headers.get('Idempotency-Key'), body)
+                          for _, _, headers, body in self.cube.log},
+                         {('k1', self.cube.log[0][3])})
+
+    def test_streamed_upload_rewound_on_retry(self):
+        """
+        Test whether a streamed multipart upload is sent whole again when retried.
+        """
+        self.cube.inject(502)
+        contents = io.BytesIO(b'x' * 100000)
+        Request(retry=self.retry).post(self.post_url, {'upload_path': 'a/b'}, contents,
+                                       chunk_size=4096, idempotency_key='k2')
+        bodies = [body for _, _, _, body in self.cube.log]
+        self.assertEqual(len(bodies), 2)
+        self.assertEqual(bodies[0], bodies[1])
+        self.assertIn(b'x' * 100000, bodies[1])
+
+    def test_retry_after_honoured(self):
+        """
+        Test whether the Retry-After header is the minimum delay and a Retry-After
+        longer than max_retry_after stops the retries.
+        """
+        response = requests.Response()
+        response.status_code = 503
+        response.headers['Retry-After'] = '2'
+        self.assertGreaterEqual(self.retry.get_delay(0, response), 2)
+        response.headers['Retry-After'] = 'Wed, 21 Oct 2015 07:28:00 GMT'
+        self.assertEqual(RetryPolicy.get_retry_after(response), 0)
+
+        self.cube.inject((503, '3600'))
+        with self.assertRaises(ValueError):
+            Request(retry=self.retry).get(self.url)
+        self.assertEqual(len(self.cube.log), 1)
+
+    def test_circuit_breaker(self):
+        """
+        Test whether the circuit opens after consecutive failures, fails fast while
+        open and closes again after a successful trial request.
+        """
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        req = Request(breaker=breaker)
+        host = self.url.split('/')[2]
+        self.cube.inject(502, 502)
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                req.get(self.url)
+        self.assertEqual(breaker.state(host), 'open')
+        with self.assertRaises(ChrisCircuitOpenException):
+            req.get(self.url)
+        self.assertEqual(len(self.cube.log), 2)
+
+        time.sleep(0.06)
+        self.assertEqual(breaker.state(host), 'half-open')
+        req.get(self.url)
+        self.assertEqual(breaker.state(host), 'closed')
+
+    def test_circuit_breaker_trial_raising(self):
+        """
+        Test whether a half-open trial request that raises an unexpected exception
+        reopens the circuit instead of leaving the trial in flight.
+        """
+        class FailingHook(object):
+            def pre_request(self, info):
+                raise RuntimeError('hook failed')
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        host = self.url.split('/')[2]
+        self.cube.inject(502)
+        with self.assertRaises(ValueError):
+            Request(breaker=breaker).get(self.url)
+        time.sleep(0.06)
+        with self.assertRaises(RuntimeError):
+            Request(breaker=breaker, hooks=[FailingHook()]).get(self.url)
+        self.assertEqual(breaker.state(host), 'open')
+
+        time.sleep(0.06)
+        Request(breaker=breaker).get(self.url)
+        self.assertEqual(breaker.state(host), 'closed')
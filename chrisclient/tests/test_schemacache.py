@@ -0,0 +1,39 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from chrisclient.schemacache import PluginSchemaCache
+
+
+class PluginSchemaCacheTests(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = PluginSchemaCache(os.path.join(self.tmp_dir.name, 'plugins'))
+        self.url = 'http://localhost:8000/api/v1/'
+        self.parameters = [{'name': 'dir', 'flag': '--dir', 'short_flag': '-d'},
+                           {'name': 'iname', 'flag': '--in_name', 'short_flag': ''}]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_set_get(self):
+        """
+        Test whether a cached schema can be read back by another cache object only for
+        the same CUBE url, plugin name and version.
+        """
+        self.cache.set(self.url, 'pl-dircopy', '2.1.1', self.parameters)
+        cache = PluginSchemaCache(self.cache.path)
+        self.assertEqual(cache.get(self.url, 'pl-dircopy', '2.1.1'), self.parameters)
+        self.assertIsNone(cache.get(self.url, 'pl-dircopy', '2.1.2'))
+        self.assertIsNone(cache.get('http://other:8000/api/v1/', 'pl-dircopy', '2.1.1'))
+
+    def test_index(self):
+        """
+        Test whether the parameters are indexed by flag, short flag and name.
+        """
+        index = PluginSchemaCache.index(self.parameters)
+        self.assertEqual(index['--in_name']['name'], 'iname')
+        self.assertEqual(index['-d']['name'], 'dir')
+        self.assertEqual(index['iname']['flag'], '--in_name')
+        self.assertNotIn('', index)
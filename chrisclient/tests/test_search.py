@@ -0,0 +1,144 @@
+from argparse import Namespace
+from unittest import TestCase
+
+import pytest
+
+from chrisclient.client import Client
+from chrisclient.search import CUBEConfig, PluginSearch
+from chrisclient.tests.standin import StandInCUBE
+
+
+class CUBEConfigTests(TestCase):
+
+    def test_fromArgs_defaults_and_overrides(self):
+        """
+        Test whether fromArgs applies the address and port overrides over the defaults.
+        """
+        config = CUBEConfig.fromArgs({'str_CUBE': '', 'str_CUBEaddress': 'cube.local',
+                                      'str_CUBEport': '8333'})
+        self.assertEqual(config.URL(), 'http://cube.local:8333/api/v1/')
+        self.assertEqual((config.user, config.password), ('chris', 'chris1234'))
+
+    def test_fromArgs_json_spec(self):
+        """
+        Test whether fromArgs parses the '--onCUBE' JSON spec and resolves %HOSTIP with
+        the given default IP.
+        """
+        spec = '{"protocol": "https", "port": "443", "address": "%HOSTIP", ' \
+               '"user": "cube", "password": "cube1234",}'
+        config = CUBEConfig.fromArgs({'str_CUBE': spec}, '10.0.0.5')
+        self.assertEqual(config.URL(), 'https://10.0.0.5:443/api/v1/')
+        self.assertEqual(config.user, 'cube')
+
+    def test_config_is_shared(self):
+        """
+        Test whether searches built with a config object share it instead of parsing
+        the CLI args again.
+        """
+        config = CUBEConfig(address='localhost')
+        args = Namespace(str_CUBE='{bad', verbosity=0, str_for='id', str_using='')
+        query = PluginSearch({'name': 'chrispl-search'}, args, config=config)
+        self.assertIs(query.config, config)
+        query.S('/CUBE/port', '8333')
+        self.assertEqual(config.port, '8333')
+        self.assertFalse(hasattr(config, '__dict__'))
+
+
+class PluginSearchResultTests(TestCase):
+
+    def setUp(self):
+        rows = []
+        for i in range(1, 6):
+            row = {'id': i, 'status': 'started' if i % 2 else 'cancelled'}
+            if i != 3:
+                row['flag'] = f'--f{i}'
+            rows.append(row)
+        # two result pages to check that the targets are collected across pages
+        self.pages = [{'data': rows[:2], 'links': [{}, {}], 'total': 5},
+                      {'data': rows[2:], 'links': [{}, {}, {}], 'total': 5}]
+
+    def find(self, str_for, str_filterFor=''):
+        args = Namespace(str_for=str_for, str_filterFor=str_filterFor,
+                         str_across='plugininstances', str_using='', verbosity=0)
+        self.query = PluginSearch({'name': 'chrispl-search'}, args,
+                                  config=CUBEConfig(address='localhost'))
+        search = {'status': True,
+                  'response': {'collection': {'total': 5, 'pages': iter(self.pages)}}}
+        return self.query.search_desiredReturnFind(search)
+
+    def test_search_desiredReturnFind_projection(self):
+        """
+        Test whether search_desiredReturnFind returns the requested fields of every
+        item together with their columns.
+        """
+        result = self.find('id,flag')
+        self.assertTrue(result['status'])
+        self.assertEqual(len(result['target']), 5)
+        self.assertEqual(result['target'][2], [{'name': 'id', 'value': 3}])
+        self.assertEqual(result['keys'], ['id', 'status', 'flag'])
+        self.assertEqual(result['columns'], {'id': [1, 2, 3, 4, 5],
+                                             'flag': ['--f1', '--f2', None, '--f4',
+                                                      '--f5']})
+
+    def test_search_desiredReturnFind_filter(self):
+        """
+        Test whether search_desiredReturnFind only keeps the items with a requested
+        field value in the '--filterFor' list.
+        """
+        result = self.find('flag,status', ' --f2, --f5')
+        self.assertEqual(result['columns'], {'flag': ['--f2', '--f5'],
+                                             'status': ['cancelled', 'started']})
+        self.assertEqual(result['message'], '2 target(s) found')
+
+    def test_search_desiredReturnFind_no_targets(self):
+        """
+        Test whether search_desiredReturnFind reports no targets when the requested
+        fields don't exist.
+        """
+        result = self.find('nofield')
+        self.assertFalse(result['status'])
+        self.assertEqual(result['target'], [])
+        self.assertEqual(result['columns'], {})
+
+    def test_dataFrame_get(self):
+        """
+        Test whether dataFrame_get returns the columns and rows of the columnar result
+        of search_desiredReturnFind as a pandas DataFrame.
+        """
+        pytest.importorskip('pandas')
+        for str_for, str_filterFor in (('id,flag', ''),
+                                       ('flag,status,flag', '--f2,--f5')):
+            result = self.find(str_for, str_filterFor)
+            df = self.query.dataFrame_get(result)
+            self.assertEqual(list(df.columns), list(result['columns']))
+            # pandas may represent the missing values as NaN
+            df_none = df.astype(object).where(df.notna(), None)
+            self.assertEqual({field: df_none[field].tolist() for field in df.columns},
+                             result['columns'])
+        self.assertEqual(df.values.tolist(), [['--f2', 'cancelled'], ['--f5', 'started']])
+
+
+class PluginSearchStreamTests(TestCase):
+
+    def test_do_streams_pages(self):
+        """
+        Test whether a search follows the result pages of a CUBE through the client and
+        only keeps the filtered targets.
+        """
+        with StandInCUBE(sizes={'plugin_instances': 2500}) as cube:
+            cl = Client(cube.url, 'cube', 'cube1234')
+            args = Namespace(str_for='id,plugin_name', str_filterFor='pl-3',
+                             str_across='plugininstances', str_using='status=started',
+                             verbosity=0)
+            query = PluginSearch({'name': 'chrispl-search'}, args,
+                                 config=CUBEConfig(address='localhost'), client=cl)
+            result = query.do()
+            expected = [d['id'] for d in cl.iter_plugin_instances(
+                {'status': 'started', 'plugin_name_exact': 'pl-3'})]
+            total = cl.get_plugin_instances({'status': 'started'})['total']
+            cl.close()
+        self.assertTrue(result['status'])
+        self.assertEqual(result['columns']['id'], expected)
+        self.assertEqual(result['search']['response']['collection']['total'], total)
+        self.assertNotIn('pages', result['search']['response']['collection'])
+        self.assertIn('plugin_name', result['keys'])
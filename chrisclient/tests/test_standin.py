@@ -0,0 +1,169 @@
+import io
+import os
+import tempfile
+from unittest import TestCase
+
+from chrisclient import client
+from chrisclient.resilience import RetryPolicy
+from chrisclient.exceptions import ChrisRequestException
+from chrisclient.tests.standin import StandInCUBE, PATTERN
+
+
+class StandInCUBETests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cube = StandInCUBE(sizes={'plugin_instances': 25000}, file_size=200000)
+        cls.cube.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cube.stop()
+
+    def setUp(self):
+        self.client = client.Client(self.cube.url, 'cube', 'cube1234')
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_pagination(self):
+        """
+        Test whether pages have next and previous links and the total number of items.
+        """
+        result = self.client.get_plugin_instances({'limit': 50, 'offset': 24975})
+        self.assertEqual(result['total'], 25000)
+        self.assertEqual([d['id'] for d in result['data']], list(range(24976, 25001)))
+        self.assertFalse(result['hasNextPage'])
+        self.assertTrue(result['hasPreviousPage'])
+        self.assertEqual(sum(1 for _ in self.client.iter_plugin_instances(
+            {'limit': 1000})), 25000)
+
+    def test_search(self):
+        """
+        Test whether search endpoints filter items by exact and partial values.
+        """
+        result = self.client.get_plugin_instances({'plugin_name_exact': 'pl-3',
+                                                   'status': 'started'})
+        self.assertGreater(result['total'], 0)
+        self.assertEqual({(d['plugin_name'], d['status']) for d in result['data']},
+                         {('pl-3', 'started')})
+        self.assertEqual(self.client.get_plugin_instance_by_id(4242)['id'], 4242)
+        self.assertEqual(self.client.get_feeds({'name': 'feed 7'})['total'], 11)
+        self.assertEqual(self.client.get_feeds({'name_exact': 'feed 7'})['total'], 1)
+        with self.assertRaises(ChrisRequestException):
+            self.client.get_plugin_by_id(1000)
+
+    def test_create_and_upload(self):
+        """
+        Test whether plugin instances are created and files uploaded and deleted.
+        """
+        with StandInCUBE() as cube:
+            cl = client.Client(cube.url, 'cube', 'cube1234')
+            plg_inst = cl.create_plugin_instance(2, {'title': 'run'})
+            self.assertEqual((plg_inst['id'], plg_inst['plugin_name'],
+                              plg_inst['status']), (1001, 'pl-2', 'scheduled'))
+            self.assertEqual(cl.get_plugin_instance_by_id(1001)['title'], 'run')
+            user_file = cl.upload_file('cube/uploads/a.bin', io.BytesIO(b'x' * 70000))
+            self.assertEqual((user_file['fname'], user_file['fsize']),
+                             ('cube/uploads/a.bin', 70000))
+            self.assertEqual(cl.get_user_files()['total'], 1001)
+            cl.delete_user_file(user_file['id'])
+            self.assertEqual(cl.get_user_files()['total'], 1000)
+            cl.close()
+
+    def test_create_related_missing_link(self):
+        """
+        Test whether creating an item through a link relation that the resource doesn't
+        have raises ChrisRequestException.
+        """
+        with self.assertRaises(ChrisRequestException):
+            self.client.create_plugin_instance_split(1)
+
+    def test_download_resumed(self):
+        """
+        Test whether files are downloaded and an interrupted download is resumed.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            local_path = os.path.join(tmp_dir, 'f.dat')
+            with open(local_path + '.part', 'wb') as f:
+                f.write(PATTERN * 100)
+            size = self.client.download_file(3, local_path)
+            with open(local_path, 'rb') as f:
+                contents = f.read()
+        self.assertEqual(size, 200000)
+        self.assertEqual(contents, (PATTERN * 800)[:200000])
+
+    def test_injected_errors(self):
+        """
+        Test whether injected errors are answered and retried by a retry policy.
+        """
+        with StandInCUBE(error_rate=0.3, latency=0.001, seed=1) as cube:
+            cl = client.Client(cube.url, 'cube', 'cube1234',
+                               retry=RetryPolicy(retries=10, backoff_factor=0.001))
+            for offset in range(0, 50, 10):
+                self.assertEqual(len(cl.get_plugins({'offset': offset})['data']), 10)
+            cl.close()
+        self.assertGreater(cube.faults, 0)
+        self.assertEqual(cube.requests['GET'], 5 + 1 + cube.faults)
+
+    def test_watch_batches_polls(self):
+        """
+        Test whether watching plugin instances polls them with a search per feed and
+        stops watching the instances that don't exist.
+        """
+        instances = [{'id': 1, 'feed_id': 2, 'status': 'scheduled'},
+                     {'id': 201, 'feed_id': 2, 'status': 'scheduled'}, 10 ** 6]
+        self.client.set_urls()
+        before = self.cube.requests['GET']
+        events = list(self.client.watch(instances, interval=0))
+        self.assertEqual(sorted((plg_inst['id'], plg_inst['status'])
+                                for plg_inst, _ in events),
+                         [(1, 'finishedSuccessfully'), (201, 'finishedSuccessfully')])
+        # a lookup of the missing instance and the 3 pages of the feed's search
+        self.assertEqual(self.cube.requests['GET'] - before, 4)
+        self.assertEqual(list(self.client.watch([], max_wait=None)), [])
+
+    def test_download_token_reused(self):
+        """
+        Test whether downloads share a download token and a new one is created when
+        CUBE rejects it.
+        """
+        with StandInCUBE(keep_log=True) as cube, tempfile.TemporaryDirectory() as tmp_dir:
+            cl = client.Client(cube.url, 'cube', 'cube1234')
+            report = cl.download_files({'fname': 'home/cube/uploads/0/'}, tmp_dir,
+                                       workers=4)
+            self.assertEqual(len(report['downloaded']), 99)
+            local_path = os.path.join(tmp_dir, 'f.dat')
+            cl.download_file(1, local_path)
+            cube.inject(401)  # answers the next file request with the shared token
+            cl.download_file(1, local_path, resume=False)
+            cl.close()
+            tokens = [path for method, path, _, _ in cube.log
+                      if method == 'POST' and path.startswith('/api/v1/downloadtokens/')]
+        self.assertEqual(len(tokens), 2)
+
+    def test_fetch_all_streamed_in_order(self):
+        """
+        Test whether a streamed fetch_all yields the items in order while fetching a
+        bounded number of pages ahead.
+        """
+        before = self.cube.requests['GET']
+        items = self.client.fetch_all('plugin_instances', {'limit': 100}, workers=4,
+                                      stream=True)
+        first = [next(items)['id'] for _ in range(150)]
+        self.assertEqual(first, list(range(1, 151)))
+        # the API root, the first page and at most workers pages ahead
+        self.assertLessEqual(self.cube.requests['GET'] - before, 2 + 5)
+        self.assertEqual([d['id'] for d in items], list(range(151, 25001)))
+        items.close()
+
+    def test_fetch_all_capped_page_size(self):
+        """
+        Test whether fetch_all gets every item when the server caps the page size below
+        the requested limit.
+        """
+        with StandInCUBE(max_limit=30) as cube:
+            cl = client.Client(cube.url, 'cube', 'cube1234')
+            items = cl.fetch_all('plugin_instances', {'limit': 100}, workers=4)
+            self.assertEqual([d['id'] for d in items], list(range(1, 1001)))
+            cl.close()
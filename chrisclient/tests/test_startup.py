@@ -0,0 +1,89 @@
+import os
+import re
+import sys
+import subprocess
+from unittest import TestCase
+
+
+BIN_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'bin')
+
+# heavy optional dependencies that must not be loaded at startup
+HEAVY_MODULES = ('pudb', 'urwid', 'pfmisc', 'pfstate', 'webob', 'requests')
+
+# cold-start budget (in microseconds) for the imports of a CLI entry point answering
+# --help/--version, without the interpreter's own site initialization
+STARTUP_BUDGET_US = 100000
+
+# budget (in microseconds) for importing the search/run modules themselves
+IMPORT_BUDGET_US = 400000
+
+
+def import_times(*args):
+    """
+    Run python -X importtime with the given arguments and return a dictionary of
+    top-level imported module names to their cumulative import time in microseconds
+    and the set of all imported module names.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + list(args),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+    top_level = {}
+    modules = set()
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)', line)
+        if match:
+            modules.add(match.group(3))
+            if len(match.group(2)) == 1:
+                top_level[match.group(3)] = int(match.group(1))
+    return top_level, modules
+
+
+class TestStartup(TestCase):
+
+    def assertNoHeavyImports(self, modules):
+        loaded = {m.split('.')[0] for m in modules} & set(HEAVY_MODULES)
+        self.assertEqual(loaded, set())
+
+    def test_chrispl_search_version_startup(self):
+        """
+        Test whether chrispl-search --version starts within budget without loading the
+        heavy dependencies.
+        """
+        top_level, modules = import_times(os.path.join(BIN_DIR, 'chrispl-search'),
+                                          '--version')
+        self.assertNoHeavyImports(modules)
+        top_level.pop('site', None)
+        self.assertLess(sum(top_level.values()), STARTUP_BUDGET_US)
+
+    def test_chrispl_run_help_startup(self):
+        """
+        Test whether chrispl-run --help starts within budget without loading the heavy
+        dependencies.
+        """
+        top_level, modules = import_times(os.path.join(BIN_DIR, 'chrispl-run'),
+                                          '--help')
+        self.assertNoHeavyImports(modules)
+        top_level.pop('site', None)
+        self.assertLess(sum(top_level.values()), STARTUP_BUDGET_US)
+
+    def test_chrisclient_help_startup(self):
+        """
+        Test whether chrisclient --help starts within budget without loading the heavy
+        dependencies.
+        """
+        top_level, modules = import_times(os.path.join(BIN_DIR, 'chrisclient'), '--help')
+        self.assertNoHeavyImports(modules)
+        top_level.pop('site', None)
+        self.assertLess(sum(top_level.values()), STARTUP_BUDGET_US)
+
+    def test_run_module_import(self):
+        """
+        Test whether importing the run (and search) module doesn't load the debugger
+        or the state dependencies.
+        """
+        top_level, modules = import_times('-c', 'import chrisclient.run')
+        self.assertNotIn('pudb', modules)
+        self.assertNotIn('pfstate', modules)
+        self.assertNotIn('pfmisc', modules)
+        top_level.pop('site', None)
+        self.assertLess(sum(top_level.values()), IMPORT_BUDGET_US)
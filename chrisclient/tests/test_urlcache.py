@@ -0,0 +1,93 @@
+import io
+import os
+import time
+import tempfile
+from unittest import TestCase
+
+from chrisclient.client import Client
+from chrisclient.urlcache import UrlCache
+from chrisclient.tests.standin import StandInCUBE
+
+
+class UrlCacheTests(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'chrisclient', 'urls.json')
+        self.key = UrlCache.make_key('http://localhost:8000/api/v1/',
+                                     {'username': 'cube', 'password': 'cube1234'})
+        self.urls = {'plugins_url': 'http://localhost:8000/api/v1/plugins/'}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_set_get(self):
+        """
+        Test whether the cached urls can be read back by another cache object.
+        """
+        UrlCache(self.path).set(self.key, self.urls)
+        self.assertEqual(UrlCache(self.path).get(self.key), self.urls)
+
+    def test_get_expired(self):
+        """
+        Test whether an expired entry is a cache miss.
+        """
+        cache = UrlCache(self.path, ttl=0.01)
+        cache.set(self.key, self.urls)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get(self.key))
+
+    def test_delete(self):
+        """
+        Test whether a deleted entry is a cache miss.
+        """
+        cache = UrlCache(self.path)
+        cache.set(self.key, self.urls)
+        cache.delete(self.key)
+        self.assertIsNone(cache.get(self.key))
+
+    def test_make_key_hashes_token(self):
+        """
+        Test whether the cache key for a token auth does not contain the token.
+        """
+        key = UrlCache.make_key('http://localhost:8000/api/v1/', {'token': 'secret'})
+        self.assertNotIn('secret', key)
+        self.assertNotEqual(key, self.key)
+
+    def test_corrupt_file_is_a_miss(self):
+        """
+        Test whether a corrupt cache file is a cache miss.
+        """
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as f:
+            f.write('{not json')
+        self.assertIsNone(UrlCache(self.path).get(self.key))
+
+
+class StaleUrlsTests(TestCase):
+
+    def test_stale_urls_rediscovered(self):
+        """
+        Test whether reads, listings and writes to stale cached urls discover the urls
+        again from the API root and are retried once.
+        """
+        with StandInCUBE() as cube, tempfile.TemporaryDirectory() as tmp_dir:
+            cl = Client(cube.url, 'cube', 'cube1234')
+            cl.set_urls()
+            # as if CUBE had been redeployed with its resources under other paths
+            urls = {url_attr: url.replace('/api/v1/', '/api/v1/old/')
+                    for url_attr, url in vars(cl).items()
+                    if url_attr.endswith('_url') and url and url != cube.url}
+            cl.close()
+            url_cache = UrlCache(os.path.join(tmp_dir, 'urls.json'))
+            key = UrlCache.make_key(cube.url, {'username': 'cube', 'password': 'cube1234'})
+
+            for call in (lambda cl: sum(1 for _ in cl.iter_plugin_instances()),
+                         lambda cl: len(cl.fetch_all('plugins', {'limit': 20})),
+                         lambda cl: cl.upload_file('cube/a.txt', io.BytesIO(b'a'))['id'],
+                         lambda cl: cl.create_download_token()):
+                url_cache.set(key, urls)
+                cl = Client(cube.url, 'cube', 'cube1234', url_cache=url_cache)
+                self.assertTrue(call(cl))
+                self.assertEqual(cl.plugins_url, cube.url + 'plugins/')
+                cl.close()
@@ -0,0 +1,66 @@
+from unittest import TestCase
+
+from chrisclient.watch import StatusTracker
+
+
+class StatusTrackerTests(TestCase):
+
+    def setUp(self):
+        self.tracker = StatusTracker([1, {'id': 2, 'feed_id': 1, 'status': 'created'}],
+                                     interval=1, max_interval=4, backoff=2)
+
+    def test_update_emits_status_changes(self):
+        """
+        Test whether only the status changes of the watched instances are emitted.
+        """
+        events = self.tracker.update([{'id': 1, 'feed_id': 1, 'status': 'started'},
+                                      {'id': 2, 'feed_id': 1, 'status': 'created'},
+                                      {'id': 3, 'feed_id': 1, 'status': 'started'}])
+        self.assertEqual([(plg_inst['id'], previous) for plg_inst, previous in events],
+                         [(1, None)])
+
+    def test_adaptive_delay(self):
+        """
+        Test whether the polling delay backs off while nothing changes and is reset
+        after a change.
+        """
+        plg_inst = {'id': 2, 'feed_id': 1, 'status': 'created'}
+        self.tracker.update([plg_inst])
+        self.tracker.update([plg_inst])
+        self.tracker.update([plg_inst])
+        self.assertEqual(self.tracker.delay, 4)
+        self.tracker.update([dict(plg_inst, status='started')])
+        self.assertEqual(self.tracker.delay, 1)
+
+    def test_done(self):
+        """
+        Test whether the tracker is done only when every watched instance finished.
+        """
+        self.assertEqual(self.tracker.unknown_ids(), [1])
+        self.assertEqual(self.tracker.pending_feeds(), {1: [2]})
+        self.tracker.update([{'id': 1, 'feed_id': 1, 'status': 'finishedWithError'}])
+        self.assertFalse(self.tracker.done())
+        self.assertEqual(self.tracker.unknown_ids(), [])
+        self.assertEqual(self.tracker.pending_feeds(), {1: [2]})
+        self.tracker.update([{'id': 2, 'feed_id': 1, 'status': 'cancelled'}])
+        self.assertTrue(self.tracker.done())
+
+    def test_missing_instance_is_gone(self):
+        """
+        Test whether a watched instance that a poll covered but didn't return stops
+        being watched.
+        """
+        self.tracker.update([{'id': 2, 'feed_id': 1, 'status': 'cancelled'}], [1, 2])
+        self.assertEqual(self.tracker.gone, {1})
+        self.assertEqual(self.tracker.unknown_ids(), [])
+        self.assertTrue(self.tracker.done())
+
+    def test_done_without_instances(self):
+        """
+        Test whether a tracker without instances to watch is done.
+        """
+        self.assertTrue(StatusTracker([]).done())
+        tracker = StatusTracker(None)
+        tracker.update([])
+        self.assertTrue(tracker.done())
+
@@ -0,0 +1,100 @@
+"""
+ChRIS API root url cache module.
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+
+
+class UrlCache(object):
+    """
+    On-disk, TTL-bounded cache of the urls of the high level API resources discovered
+    from a CUBE's API root, keyed by the CUBE url and the user.
+    """
+
+    def __init__(self, path=None, ttl=3600):
+        if path is None:
+            cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+                os.path.expanduser('~'), '.cache')
+            path = os.path.join(cache_dir, 'chrisclient', 'urls.json')
+        self.path = path
+        self.ttl = ttl
+
+    def get(self, key):
+        """
+        Get the cached urls dictionary for a key or None if there is no fresh entry.
+        """
+        entry = self._load().get(key)
+        if entry and time.time() - entry['timestamp'] < self.ttl:
+            return entry['urls']
+        return None
+
+    def set(self, key, urls):
+        """
+        Cache the urls dictionary for a key.
+        """
+        entries = self._fresh_entries()
+        entries[key] = {'timestamp': time.time(), 'urls': urls}
+        self._save(entries)
+
+    def delete(self, key):
+        """
+        Remove the cached urls for a key.
+        """
+        entries = self._fresh_entries()
+        if entries.pop(key, None) is not None:
+            self._save(entries)
+
+    @staticmethod
+    def make_key(url, auth=None):
+        """
+        Static method to make the cache key for a CUBE url and the client's auth
+        dictionary. Tokens are hashed so that they are never written to disk.
+        """
+        user = ''
+        if auth and auth.get('username'):
+            user = auth['username']
+        elif auth and auth.get('token'):
+            user = 'token:' + hashlib.sha256(auth['token'].encode()).hexdigest()[:16]
+        return f'{url}|{user}'
+
+    def _fresh_entries(self):
+        """
+        Internal method to get the cache entries that have not expired.
+        """
+        now = time.time()
+        return {key: entry for key, entry in self._load().items()
+                if now - entry['timestamp'] < self.ttl}
+
+    def _load(self):
+        """
+        Internal method to load the cache entries from disk. A missing or corrupt
+        cache file is just a cache miss.
+        """
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _save(self, entries):
+        """
+        Internal method to atomically write the cache entries to disk so that
+        concurrent processes never read a partially written file.
+        """
+        cache_dir = os.path.dirname(self.path)
+        tmp_path = None
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.urls-')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # the cache is an optimization, failing to write it is not an error
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
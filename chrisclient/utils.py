@@ -20,3 +20,59 @@ def b64zipstr2json(encoded_data):
 
     # Step 3: Parse the JSON string back to a Python object
     return json.loads(json_string)
+
+
+def get_host_ip():
+    """
+    Get the (non loopback) IP address of the host system. It may need a DNS lookup, so
+    it's only meant to be called when the address is actually needed.
+    """
+    import socket
+
+    # first try the addresses the host name resolves to
+    for ip in socket.gethostbyname_ex(socket.gethostname())[2]:
+        if not ip.startswith('127.'):
+            return ip
+
+    # otherwise get the address of the interface that routes to the internet (no
+    # packet is actually sent by connecting a UDP socket)
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(('8.8.8.8', 53))
+        return s.getsockname()[0]
+    finally:
+        s.close()
+
+
+def create_debug(verbosity=1, within='', syslog=False, colorize=False):
+    """
+    Create the debug/print object used by the CLI scripts. pfmisc's debug object (which
+    imports pudb and urwid) is only loaded when syslog prepending or colorizing is
+    requested, otherwise a lightweight equivalent is returned.
+    """
+    if syslog or colorize:
+        import pfmisc
+
+        return pfmisc.debug(verbosity=verbosity, within=within, syslog=syslog,
+                            colorize=colorize)
+    return PlainDebug(verbosity)
+
+
+class PlainDebug(object):
+    """
+    Minimal stand-in for pfmisc's debug object that prints messages with enough
+    verbosity without any syslog prefix or colors.
+    """
+
+    def __init__(self, verbosity=1):
+        self.verbosity = verbosity
+
+    def __call__(self, *args, **kwargs):
+        self.qprint(*args, **kwargs)
+
+    def qprint(self, msg, **kwargs):
+        """
+        Print a message if its level is not above the verbosity.
+        """
+        if kwargs.get('level', 1) <= self.verbosity:
+            print(msg, end=kwargs.get('end', '\n'), flush=True)
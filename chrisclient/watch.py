@@ -0,0 +1,105 @@
+"""
+ChRIS plugin instance status tracking module.
+"""
+
+
+class StatusTracker(object):
+    """
+    Bookkeeping of the statuses of a set of plugin instances watched by polling CUBE.
+    It turns the polled plugin instances (data descriptors) into status change events
+    and adapts the polling delay: the delay is reset to interval after a poll that
+    saw a change and otherwise multiplied by backoff up to max_interval. A watched
+    instance that a poll covered but didn't return (e.g. it was deleted or isn't
+    visible to the user) is gone and stops being watched.
+    """
+
+    TERMINAL_STATUSES = ('finishedSuccessfully', 'finishedWithError', 'cancelled')
+
+    def __init__(self, instances=None, interval=1, max_interval=30, backoff=1.5):
+        """
+        The instances argument is a list of plugin instance ids or data dictionaries
+        (e.g. as returned by create_plugin_instance). If it's None then every polled
+        plugin instance is watched.
+        """
+        self.interval = interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.delay = interval
+        self.watch_all = instances is None
+        self.instances = {}  # id -> last seen data descriptors or None
+        self.gone = set()  # ids of the watched instances that no longer exist
+
+        for plg_inst in instances or []:
+            if isinstance(plg_inst, dict):
+                known = 'status' in plg_inst
+                self.instances[plg_inst['id']] = plg_inst if known else None
+            else:
+                self.instances[int(plg_inst)] = None
+
+    def update(self, plg_insts, polled_ids=()):
+        """
+        Record the polled plugin instances and return the list of status change events
+        as (plugin instance data, previous status) tuples. The previous status is None
+        the first time an instance is seen. polled_ids are the ids of the watched
+        instances that the poll covered, those of them that are not in plg_insts are
+        gone.
+        """
+        events = []
+        seen_ids = set()
+        for plg_inst in plg_insts:
+            id = plg_inst['id']
+            if id not in self.instances and not self.watch_all:
+                continue
+            seen_ids.add(id)
+            previous = self.instances.get(id)
+            previous_status = previous['status'] if previous else None
+            self.instances[id] = plg_inst
+            if plg_inst['status'] != previous_status:
+                events.append((plg_inst, previous_status))
+
+        for id in polled_ids:
+            if id not in seen_ids and id in self.instances:
+                del self.instances[id]
+                self.gone.add(id)
+
+        if events:
+            self.delay = self.interval
+        else:
+            self.delay = min(self.delay * self.backoff, self.max_interval)
+        return events
+
+    def unknown_ids(self):
+        """
+        Get the sorted ids of the watched instances that haven't been seen yet or are
+        not finished yet and whose feed is not known.
+        """
+        return sorted(id for id, plg_inst in self.instances.items()
+                      if plg_inst is None or (plg_inst.get('feed_id') is None and
+                                              not self.is_terminal(plg_inst)))
+
+    def pending_feeds(self):
+        """
+        Get a dictionary of the feed ids of the watched instances that are known but
+        not finished yet to the sorted ids of those instances.
+        """
+        feeds = {}
+        for id, plg_inst in sorted(self.instances.items()):
+            if plg_inst is not None and plg_inst.get('feed_id') is not None and (
+                    not self.is_terminal(plg_inst)):
+                feeds.setdefault(plg_inst['feed_id'], []).append(id)
+        return feeds
+
+    def done(self):
+        """
+        Whether every watched instance has been seen in a terminal status (which is
+        trivially the case when there are no instances to watch).
+        """
+        return all(plg_inst is not None and self.is_terminal(plg_inst)
+                   for plg_inst in self.instances.values())
+
+    @staticmethod
+    def is_terminal(plg_inst):
+        """
+        Static method to check whether a plugin instance has finished running.
+        """
+        return plg_inst['status'] in StatusTracker.TERMINAL_STATUSES
@@ -14,7 +14,9 @@ setup(
       author_email     =   'dev@babymri.org',
       url              =   'https://github.com/FNNDSC/python-chrisclient',
       packages         =   ['chrisclient'],
-      install_requires =   ['requests>=2.21.0', 'collection-json>=0.1.1', 'pfstate', 'pfmisc', 'webob'],
+      install_requires =   ['requests>=2.21.0', 'pfmisc'],
+      extras_require   =   {'async': ['aiohttp>=3.8'], 'fast': ['orjson'],
+                            'pandas': ['pandas'], 'otel': ['opentelemetry-api']},
       test_suite       =   'nose.collector',
       tests_require    =   ['nose', 'pynose'],
       scripts          =   ['bin/chrisclient', 'bin/chrispl-run', 'bin/chrispl-search'],